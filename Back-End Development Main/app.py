@@ -1,7 +1,8 @@
-from satellitor_backend import *
+from satellitor_backend import app, worker_startup
 
 
 
 
 if __name__ == '__main__':
+    worker_startup.start()
     app.run(host="0.0.0.0", port=5000)
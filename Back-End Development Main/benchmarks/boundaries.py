@@ -0,0 +1,61 @@
+"""
+Benchmark of the class boundary extraction (landcover.class_boundaries) against the
+original blur + Canny chain of detect_edges.
+
+Usage (from the backend root):
+    python -m benchmarks.boundaries [size ...]
+
+For synthetic class maps of each size (default 1024, 2048 and 4096) the script reports
+the time of both, and how many of the exact boundary pixels the Canny edges come within
+one pixel of (recall) and how many Canny edge pixels are not within one pixel of a
+boundary (spurious).
+"""
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from satellitor_backend.landcover import class_colors, class_boundaries, to_gray
+
+
+def legacy_edges(class_map):
+    """The original filter chain of detect_edges, kept as the reference."""
+    blurred = cv2.GaussianBlur(to_gray(class_map), (5, 5), 0)
+    return cv2.Canny(blurred, 50, 150)
+
+
+def synthetic_class_map(size, seed=0):
+    """Random ellipses of every class on a background."""
+    rng = np.random.default_rng(seed)
+    class_map = np.zeros((size, size), dtype=np.uint8)
+    for _ in range(size // 8):
+        center = tuple(int(v) for v in rng.integers(0, size, 2))
+        axes = tuple(int(v) for v in rng.integers(4, size // 16, 2))
+        cv2.ellipse(class_map, center, axes, float(rng.uniform(0, 180)), 0, 360,
+                    int(rng.integers(1, len(class_colors))), -1)
+    return class_map
+
+
+def timed(fn, repeat=5):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main(sizes):
+    kernel = np.ones((3, 3), dtype=np.uint8)
+    print(f"{'size':>6} {'canny ms':>9} {'exact ms':>9} {'speedup':>8} {'recall':>7} {'spurious':>9}")
+    for size in sizes:
+        class_map = synthetic_class_map(size)
+        canny_ms, canny = timed(lambda: legacy_edges(class_map))
+        exact_ms, exact = timed(lambda: class_boundaries(class_map))
+        recall = float((cv2.dilate(canny, kernel)[exact > 0] > 0).mean())
+        spurious = float((cv2.dilate(exact, kernel)[canny > 0] == 0).mean())
+        print(f"{size:>6} {canny_ms:>9.1f} {exact_ms:>9.1f} {canny_ms / exact_ms:>7.1f}x {recall:>7.3f} {spurious:>9.3f}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1024, 2048, 4096])
@@ -0,0 +1,59 @@
+"""
+Accuracy-vs-latency comparison of the inference backends against PyTorch.
+
+Usage (from the backend root):
+    python -m benchmarks.inference_backends [image_dir] [--backends onnx openvino] [--int8] [--repeat N]
+
+Every backend (exported on first use, see inference_backends.load_model) segments the
+captures of `image_dir` (default: INFERENCE_CALIBRATION_DIR, plus outputs/img.png).
+For each one the script prints the mean latency per image, the speedup over best.pt run
+with PyTorch, the drift of the get_Percentage class fractions from the PyTorch ones and
+the share of pixels labelled like PyTorch. INT8 variants are calibrated on `image_dir`.
+"""
+import argparse
+import os
+import sys
+
+import cv2
+
+from satellitor_backend import app, model_path
+from satellitor_backend.inference_backends import BACKENDS, calibration_images, compare_backends, load_model
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_IMAGE = os.path.join(BASE_DIR, 'satellitor_backend', 'outputs', 'img.png')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("image_dir", nargs="?", default=app.config['INFERENCE_CALIBRATION_DIR'])
+    parser.add_argument("--backends", nargs="+", default=["onnx", "openvino"], choices=BACKENDS[1:])
+    parser.add_argument("--int8", action="store_true", help="also compare the INT8 exports")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per image (default 3)")
+    args = parser.parse_args()
+
+    paths = calibration_images(args.image_dir) if os.path.isdir(args.image_dir) else []
+    if os.path.exists(SAMPLE_IMAGE):
+        paths.append(SAMPLE_IMAGE)
+    images = [img for img in (cv2.imread(path) for path in paths) if img is not None]
+    if not images:
+        print(f"No images found in {args.image_dir}")
+        return 1
+
+    models = {"pytorch": load_model(model_path)}
+    for backend in args.backends:
+        models[backend] = load_model(model_path, backend)
+        if args.int8:
+            models[f"{backend}-int8"] = load_model(model_path, backend, int8=True, calibration_dir=args.image_dir)
+
+    report = compare_backends(images, models, repeat=args.repeat)
+    print(f"{len(images)} images")
+    print(f"{'backend':<16}{'latency ms':>12}{'speedup':>9}{'mean drift':>12}{'max drift':>11}{'pixels':>9}")
+    for label, row in report.items():
+        print(f"{label:<16}{row['latency_ms']:>12}{row['speedup']:>9}{row['mean_drift']:>12}"
+              f"{row['max_drift']:>11}{row['pixel_agreement']:>9}")
+        print(f"{'':<16}class drift: {row['class_drift']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
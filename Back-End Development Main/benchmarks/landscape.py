@@ -0,0 +1,98 @@
+"""
+Benchmark of the landscape metrics against the original get_fragmentation.
+
+Usage (from the backend root):
+    python -m benchmarks.landscape [size ...]
+
+Synthetic class maps (blocky regions plus speckle, so every class has many patches) of each
+size (default 1024, 2048 and 4096) are measured with the original get_fragmentation, which
+decoded the colored mask with rgb_to_class_index and ran one cv2.connectedComponents per
+class, and with landscape_metrics, which labels every class of the class index map in one
+pass and also returns the patch size distribution, largest patch index and edge density.
+The per-class labelling alone (without the decode) is shown for reference. The script
+exits with status 1 if the patch counts differ or landscape_metrics is slower than the
+original get_fragmentation.
+"""
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from satellitor_backend.landcover import class_colors, class_names, colorize
+from satellitor_backend.landscape import landscape_metrics
+
+
+def legacy_rgb_to_class_index(img_mask, color_map, tolerance=10):
+    """The original color decoding of get_fragmentation, kept as the reference."""
+    h, w, _ = img_mask.shape
+    class_mask = np.zeros((h, w), dtype=np.uint8)
+    img_mask = img_mask.astype(np.int16)
+    for class_idx, (r_ref, g_ref, b_ref) in color_map.items():
+        lower_bound = np.array([max(0, r_ref - tolerance), max(0, g_ref - tolerance), max(0, b_ref - tolerance)])
+        upper_bound = np.array([min(255, r_ref + tolerance), min(255, g_ref + tolerance), min(255, b_ref + tolerance)])
+        class_range = (
+                (img_mask[:, :, 0] >= lower_bound[0]) & (img_mask[:, :, 0] <= upper_bound[0]) &
+                (img_mask[:, :, 1] >= lower_bound[1]) & (img_mask[:, :, 1] <= upper_bound[1]) &
+                (img_mask[:, :, 2] >= lower_bound[2]) & (img_mask[:, :, 2] <= upper_bound[2])
+        )
+        class_mask[class_range] = class_idx
+    return class_mask
+
+
+def legacy_fragmentation(class_mask):
+    """The original per-class loop of get_fragmentation, kept as the reference."""
+    fragmentation_index = {}
+    for class_idx in class_colors.keys():
+        if class_idx == 0:
+            continue
+        binary_mask = (class_mask == class_idx).astype(np.uint8)
+        if np.sum(binary_mask) == 0:
+            fragmentation_index[class_idx] = 0
+            continue
+        num_labels, _ = cv2.connectedComponents(binary_mask)
+        fragmentation_index[class_idx] = num_labels - 1
+    return fragmentation_index
+
+
+def legacy_get_fragmentation(mask_img):
+    """The original get_fragmentation: colored mask in, patch counts out."""
+    return legacy_fragmentation(legacy_rgb_to_class_index(mask_img, class_colors))
+
+
+def synthetic_class_map(size, blocks=48, speckle=0.01, seed=0):
+    rng = np.random.default_rng(seed)
+    classes = rng.integers(0, len(class_colors), size=(blocks, blocks), dtype=np.uint8)
+    class_map = cv2.resize(classes, (size, size), interpolation=cv2.INTER_NEAREST)
+    noisy = rng.random((size, size)) < speckle
+    class_map[noisy] = rng.integers(0, len(class_colors), size=int(noisy.sum()), dtype=np.uint8)
+    return class_map
+
+
+def timed(fn, repeat=3):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main(sizes):
+    failed = False
+    print(f"{'size':>6} {'legacy ms':>10} {'loop only ms':>13} {'metrics ms':>11} {'patches':>8}")
+    for size in sizes:
+        class_map = synthetic_class_map(size)
+        mask_img = colorize(class_map)
+        legacy_ms, expected = timed(lambda: legacy_get_fragmentation(mask_img))
+        loop_ms, _ = timed(lambda: legacy_fragmentation(class_map))
+        metrics_ms, metrics = timed(lambda: landscape_metrics(class_map))
+        actual = {class_idx: metrics[class_names[class_idx]]["patches"] for class_idx in expected}
+        ok = actual == expected and metrics_ms <= legacy_ms
+        failed |= not ok
+        print(f"{size:>6} {legacy_ms:>10.1f} {loop_ms:>13.1f} {metrics_ms:>11.1f} {sum(actual.values()):>8}"
+              f"{'' if actual == expected else '  MISMATCH'}{'' if metrics_ms <= legacy_ms else '  SLOWER'}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main([int(arg) for arg in sys.argv[1:]] or [1024, 2048, 4096]))
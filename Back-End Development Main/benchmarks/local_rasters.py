@@ -0,0 +1,74 @@
+"""
+Checks and times the offline soil/climate backend on a synthetic raster set.
+
+Usage (from the backend root, no network, Earth Engine credentials or model needed):
+    python -m benchmarks.local_rasters [n_points]
+
+Synthetic GeoTIFF tiles are written to a temporary folder with
+data_sources.write_synthetic_rasters, then random points are sampled through
+LocalRasterSource and compared with the values that were written. The script exits
+with status 1 on any mismatch.
+"""
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from satellitor_backend.data_sources import LocalRasterSource, ALL_SOURCES, write_synthetic_rasters
+from satellitor_backend.soil_query import SOURCE_BANDS, DECODERS
+
+BOUNDS = (24.0, 22.0, 37.0, 32.0)
+SIZE = (200, 260)
+
+
+def expected_values(rasters, lat, lon):
+    min_lon, min_lat, max_lon, max_lat = BOUNDS
+    height, width = SIZE
+    row = int((max_lat - lat) / (max_lat - min_lat) * height)
+    col = int((lon - min_lon) / (max_lon - min_lon) * width)
+
+    values = {}
+    for source in ALL_SOURCES:
+        bands = [rasters[source][band, row, col].item() for band in range(rasters[source].shape[0])]
+        if source == "climate":
+            values[source] = bands
+        else:
+            values[source] = DECODERS[source](dict(zip(SOURCE_BANDS[source], bands)))
+    return values
+
+
+def main(n_points):
+    rng = np.random.default_rng(0)
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        rasters = write_synthetic_rasters(directory, BOUNDS, SIZE)
+        source = LocalRasterSource(directory)
+
+        # keep away from pixel edges so float rounding cannot pick the neighbour pixel
+        min_lon, min_lat, max_lon, max_lat = BOUNDS
+        lats = min_lat + (rng.integers(0, SIZE[0], n_points) + 0.5) * (max_lat - min_lat) / SIZE[0]
+        lons = min_lon + (rng.integers(0, SIZE[1], n_points) + 0.5) * (max_lon - min_lon) / SIZE[1]
+
+        start = time.perf_counter()
+        samples = [source.sample(lat, lon, ALL_SOURCES) for lat, lon in zip(lats, lons)]
+        elapsed = time.perf_counter() - start
+
+        for lat, lon, sample in zip(lats, lons, samples):
+            expected = expected_values(rasters, lat, lon)
+            if sample != expected:
+                failures += 1
+                print(f"MISMATCH at ({lat}, {lon}): {sample} != {expected}")
+
+        outside = source.sample(0.0, 0.0, ALL_SOURCES[1:])
+        if any(value is not None for value in outside.values()):
+            failures += 1
+            print(f"MISMATCH outside the rasters: {outside}")
+
+    print(f"{n_points} points x {len(ALL_SOURCES)} sources: "
+          f"{elapsed / n_points * 1e6:.1f} us per point, {failures} mismatches")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,105 @@
+"""
+Benchmark of the vectorized get_Percentage against the original per-pixel loop.
+
+The real yolov11_model.get_Percentage is timed. It is imported when the benchmark runs,
+not when this module is imported, since yolov11_model brings up the app and the model.
+
+Usage (from the backend root):
+    python -m benchmarks.percentage [mask.png ...]
+
+With no arguments every *_mask.png in satellitor_backend/outputs is used, plus a few
+synthetic masks painted with class_colors. The script exits with status 1 if any
+class percentage differs from the original implementation at the third decimal.
+"""
+from collections import defaultdict
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from satellitor_backend.landcover import class_colors
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUTS_FOLDER = os.path.join(BASE_DIR, 'satellitor_backend', 'outputs')
+
+
+def legacy_get_percentage(mask_img):
+    """The original per-pixel implementation of get_Percentage, kept as the reference."""
+    px = mask_img.reshape(-1, 3)
+    class_count = defaultdict(int)
+
+    for pixel in px:
+        if pixel[0] < 10 and pixel[1] < 10 and pixel[2] < 10:
+            class_count["Background"] += 1
+        elif pixel[0] < 10 and pixel[1] > 240 and pixel[2] < 10:
+            class_count["Agriculture"] += 1
+        elif pixel[0] > 240 and pixel[1] > 240 and pixel[2] > 240:
+            class_count["Barren"] += 1
+        elif pixel[0] < 10 and pixel[1] < 10 and pixel[2] > 240:
+            class_count["Urban"] += 1
+        elif pixel[0] > 240 and pixel[1] < 10 and pixel[2] < 10:
+            class_count["Water"] += 1
+
+    class_percentage = {"Background":0.0,"Agriculture":0.0,"Barren":0.0,"Urban":0.0,"Water":0.0}
+    for class_name, count in class_count.items():
+        class_percentage[class_name] = round(count / px.shape[0],3)
+    return class_percentage
+
+
+def synthetic_mask(size, blocks=64, noise=0.02, seed=0):
+    """Blocky mask painted with class_colors, with a fraction of noisy (unmatched) pixels."""
+    rng = np.random.default_rng(seed)
+    palette = np.array(list(class_colors.values()), dtype=np.uint8)
+    classes = rng.integers(0, len(palette), size=(blocks, blocks), dtype=np.uint8)
+    classes = cv2.resize(classes, (size, size), interpolation=cv2.INTER_NEAREST)
+    mask_img = palette[classes]
+    noisy = rng.random((size, size)) < noise
+    mask_img[noisy] = rng.integers(0, 256, size=(int(noisy.sum()), 3), dtype=np.uint8)
+    return mask_img
+
+
+def load_masks(paths):
+    masks = []
+    for path in paths or sorted(glob.glob(os.path.join(OUTPUTS_FOLDER, '*_mask.png'))):
+        mask_img = cv2.imread(path)
+        if mask_img is None:
+            print(f"Skipping unreadable mask: {path}")
+            continue
+        masks.append((os.path.basename(path), mask_img))
+    for size in (256, 512, 1024):
+        masks.append((f"synthetic_{size}", synthetic_mask(size, seed=size)))
+    return masks
+
+
+def main(paths):
+    # the app first: it imports yolov11_model through its routes
+    from satellitor_backend import app
+    from satellitor_backend.yolov11_model import get_Percentage
+
+    failures = 0
+    for name, mask_img in load_masks(paths):
+        start = time.perf_counter()
+        expected = legacy_get_percentage(mask_img)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = get_Percentage(mask_img, False)
+        vectorized_time = time.perf_counter() - start
+
+        match = expected.keys() == actual.keys() and all(
+            abs(expected[k] - actual[k]) < 1e-3 for k in expected
+        )
+        failures += not match
+        print(f"{name} {mask_img.shape[1]}x{mask_img.shape[0]}: "
+              f"loop {legacy_time * 1000:.1f} ms, vectorized {vectorized_time * 1000:.2f} ms, "
+              f"speedup x{legacy_time / max(vectorized_time, 1e-9):.0f}, "
+              f"{'match' if match else f'MISMATCH {expected} != {actual}'}")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,126 @@
+"""
+Benchmark of the fused instance rasterization (landcover.rasterize_instances) against the
+original per-instance loop of result_to_class_map.
+
+Usage (from the backend root):
+    python -m benchmarks.rasterization [height width]
+
+Synthetic predictions of 1 to 500 elliptical instances at model resolution (640x640) are
+rasterized to a full resolution capture (default 4096x4096). For every instance count the
+script reports the time of both implementations and the share of pixels on which they
+agree. The original loop paints in detection order, so for the agreement it is given the
+instances sorted by confidence: what remains are the edge pixels of the single
+nearest-neighbour upsampling.
+
+It then checks batches of frames with mixed shapes, which ultralytics letterboxes to a
+square input: the class maps rasterized from the padded masks must match the ground truth
+of each capture. The second batch is made of uploads as ingest.decode_upload gives them to
+the model (longer side 640, class map at the size of the capture, as in /process_batch).
+The script exits with status 1 if they do not match.
+"""
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from satellitor_backend.landcover import class_colors, rasterize_instances
+
+MODEL_SIZE = 640
+INSTANCE_COUNTS = [1, 10, 50, 100, 250, 500]
+# (height, width) of the frames of a mixed batch and of the captures they come from
+BATCH_SHAPES = [((300, 900), (600, 1800)), ((900, 300), (1800, 600)),
+                ((500, 800), (1000, 1600)), ((640, 640), (1280, 1280))]
+UPLOAD_SHAPES = [((213, 640), (1200, 3600)), ((640, 213), (3600, 1200)),
+                 ((400, 640), (2000, 3200)), ((640, 640), (4000, 4000))]
+
+
+def legacy_rasterize(masks, class_ids, shape):
+    """The original per-instance loop of result_to_class_map, kept as the reference."""
+    class_map = np.zeros(shape, dtype=np.uint8)
+    for i, mask in enumerate(masks):
+        mask = cv2.resize(mask, (shape[1], shape[0]))
+        class_idx = class_ids[i] if class_ids[i] in class_colors else 0
+        class_map[mask > 0.5] = class_idx
+    return class_map
+
+
+def synthetic_instances(count, size=MODEL_SIZE, seed=0):
+    """(N, size, size) float32 masks of random ellipses (like ultralytics masks.data), classes and confidences."""
+    rng = np.random.default_rng(seed)
+    masks = np.zeros((count, size, size), dtype=np.float32)
+    for mask in masks:
+        center = tuple(int(v) for v in rng.integers(0, size, 2))
+        axes = tuple(int(v) for v in rng.integers(8, size // 6, 2))
+        cv2.ellipse(mask, center, axes, float(rng.uniform(0, 180)), 0, 360, 1.0, -1)
+    class_ids = rng.integers(1, len(class_colors), count)
+    confidences = rng.uniform(0.25, 1.0, count).astype(np.float32)
+    return masks, class_ids, confidences
+
+
+def letterbox_masks(class_map, size=MODEL_SIZE):
+    """
+    One instance mask per class of a frame's class map, letterboxed to a square model input
+    (scaled to fit and centered, padding around) like ultralytics does for mixed-shape batches.
+    """
+    height, width = class_map.shape
+    gain = min(size / height, size / width)
+    new_height, new_width = round(height * gain), round(width * gain)
+    top, left = round((size - new_height) / 2 - 0.1), round((size - new_width) / 2 - 0.1)
+    padded = np.zeros((size, size), dtype=np.uint8)
+    padded[top:top + new_height, left:left + new_width] = cv2.resize(class_map, (new_width, new_height),
+                                                                     interpolation=cv2.INTER_NEAREST)
+    class_ids = np.array([class_idx for class_idx in np.unique(class_map) if class_idx != 0])
+    return padded[None] == class_ids[:, None, None], class_ids
+
+
+def check_mixed_batch(shapes, min_agreement=0.98):
+    """Rasterizes a letterboxed mixed-shape batch, returns True if every class map matches its capture."""
+    ok = True
+    print(f"\n{'frame':>9} {'capture':>10} {'agreement':>10}")
+    for i, ((height, width), capture) in enumerate(shapes):
+        rng = np.random.default_rng(i)
+        frame_map = np.zeros((height, width), dtype=np.uint8)
+        for _ in range(12):
+            center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+            axes = (int(rng.integers(20, width // 3)), int(rng.integers(20, height // 3)))
+            cv2.ellipse(frame_map, center, axes, 0, 0, 360, int(rng.integers(1, len(class_colors))), -1)
+        expected = cv2.resize(frame_map, (capture[1], capture[0]), interpolation=cv2.INTER_NEAREST)
+
+        masks, class_ids = letterbox_masks(frame_map)
+        actual = rasterize_instances(masks, class_ids, np.ones(len(class_ids)), capture, frame_shape=(height, width))
+        agreement = float((expected == actual).mean())
+        ok &= agreement >= min_agreement
+        print(f"{height:>4}x{width:<4} {capture[0]:>4}x{capture[1]:<5} {agreement:>10.4f}"
+              f"{'' if agreement >= min_agreement else '  MISMATCH'}")
+    return ok
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main(height=4096, width=4096):
+    shape = (height, width)
+    print(f"{'instances':>9} {'legacy ms':>10} {'fused ms':>9} {'speedup':>8} {'agreement':>10}")
+    for count in INSTANCE_COUNTS:
+        masks, class_ids, confidences = synthetic_instances(count)
+        order = np.argsort(confidences, kind="stable")
+        repeat = 3 if count <= 100 else 1
+
+        legacy_ms, expected = timed(lambda: legacy_rasterize(masks[order], class_ids[order], shape), repeat)
+        fused_ms, actual = timed(lambda: rasterize_instances(masks > 0.5, class_ids, confidences, shape), repeat)
+        agreement = float((expected == actual).mean())
+        print(f"{count:>9} {legacy_ms:>10.1f} {fused_ms:>9.1f} {legacy_ms / fused_ms:>7.1f}x {agreement:>10.4f}")
+
+    ok = check_mixed_batch(BATCH_SHAPES)
+    ok &= check_mixed_batch(UPLOAD_SHAPES)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:3])))
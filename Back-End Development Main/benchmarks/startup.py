@@ -0,0 +1,62 @@
+"""
+Measures the cold start and memory of gunicorn workers, with and without preload_app.
+
+Usage (from the backend root, needs gunicorn and the full backend environment):
+    python -m benchmarks.startup [workers]
+
+For each mode gunicorn is started with gunicorn.conf.py, /ready is polled until every
+worker has answered 200, and the time since launch is reported together with the
+RSS, USS (private) and PSS (proportional) memory of each worker.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import psutil
+
+BIND = "127.0.0.1:5055"
+
+
+def ready_workers(deadline, workers):
+    ready = set()
+    while time.time() < deadline and len(ready) < workers:
+        try:
+            with urllib.request.urlopen(f"http://{BIND}/ready", timeout=5) as response:
+                ready.add(json.load(response)["pid"])
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.2)
+    return ready
+
+
+def measure(preload, workers):
+    env = dict(os.environ, GUNICORN_BIND=BIND, GUNICORN_WORKERS=str(workers), GUNICORN_PRELOAD=str(int(preload)))
+    start = time.time()
+    master = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready = ready_workers(start + 600, workers)
+        elapsed = time.time() - start
+        memory = [psutil.Process(pid).memory_full_info() for pid in sorted(ready)]
+    finally:
+        master.terminate()
+        master.wait()
+
+    mib = 1024 * 1024
+    print(f"preload={preload}: {len(ready)}/{workers} workers ready in {elapsed:.1f}s")
+    for pid, info in zip(sorted(ready), memory):
+        print(f"  worker {pid}: rss {info.rss / mib:.0f} MiB, uss {info.uss / mib:.0f} MiB, pss {info.pss / mib:.0f} MiB")
+    return elapsed, memory
+
+
+def main(workers=2):
+    for preload in (False, True):
+        measure(preload, workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*(int(arg) for arg in sys.argv[1:2])))
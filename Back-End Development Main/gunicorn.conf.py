@@ -0,0 +1,46 @@
+"""
+Gunicorn settings of the main backend:
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is preloaded in the master, so the YOLO weights, crops.json and the fertilizer
+model are loaded once and shared copy-on-write by the workers. Each worker then runs the
+per-process startup steps (Earth Engine session, warm-up inference) and answers 200 on
+/ready once they are done. Environment: GUNICORN_BIND, GUNICORN_WORKERS,
+GUNICORN_THREADS, GUNICORN_PRELOAD (1/0).
+
+Workers do not share memory, so an artifact stored by one worker must be downloadable from
+another: with more than one worker the artifact store defaults to "disk" and the
+in-memory store is refused. Job states are shared the same way, through the SQLite file
+of JOB_STATE_PATH.
+
+To keep a single copy of the model whatever the number of workers, start the model server
+first and point the workers at it:
+    SATELLITOR_MODEL_SERVER_SOCKET=/tmp/satellitor-model.sock python -m satellitor_backend.model_server
+    SATELLITOR_MODEL_SERVER_SOCKET=/tmp/satellitor-model.sock gunicorn -c gunicorn.conf.py app:app
+"""
+import gc
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = 300
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+if workers > 1:
+    # read by the app's from_prefixed_env, the app is loaded after this file
+    os.environ.setdefault("SATELLITOR_ARTIFACT_STORE", "disk")
+    if os.environ["SATELLITOR_ARTIFACT_STORE"] == "memory":
+        raise SystemExit("SATELLITOR_ARTIFACT_STORE=memory keeps artifacts in one worker, "
+                         "use the disk store or GUNICORN_WORKERS=1")
+
+
+def when_ready(server):
+    # moves everything the preloaded app allocated out of the garbage collector's reach,
+    # so collections in the workers do not write to those pages and un-share them
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    from satellitor_backend import worker_startup
+    worker_startup.start()
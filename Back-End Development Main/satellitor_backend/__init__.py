@@ -1,27 +1,21 @@
-from flask import Flask
-from flask_cors import CORS
-from ultralytics import YOLO
-import os
-import ee
-import json
+"""
+Satellitor backend.
 
+The Flask app and the state its routes share (model, scheduler, caches, pools...) are
+built by satellitor_backend.application. The entry points (app.py, gunicorn.conf.py, the
+model server, the benchmarks) import the names of _APPLICATION_NAMES from the package,
+e.g. `from satellitor_backend import app`, which builds the app on first use; the modules
+of the package import the shared state from satellitor_backend.application, since several
+of its names (scheduler, geo_cache, result_cache, suitability_map) are also submodules.
+The library modules (landcover, data_sources, geotiff, ...) import without Flask, the
+model or best.pt, so the benchmarks and CI checks that only need them do not load the app.
+"""
+import importlib
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-model_path = os.path.join(BASE_DIR, 'best.pt')
-model = YOLO(model_path)
-app = Flask(__name__)
-CORS(app)
-crops = json.load(open(os.path.join(BASE_DIR, 'crops.json'), 'r'))
+_APPLICATION_NAMES = {"app", "model_path", "worker_startup"}
 
 
-
-# Initialize EE with the service account email and the temporary credentials file
-credentials = ee.ServiceAccountCredentials(
-    "earth-engine-access@premium-buckeye-310022.iam.gserviceaccount.com",
-    "/home/ubuntu/keys/google-service-account.json"
-)
-ee.Initialize(credentials)
-print("done 7")
-
-from satellitor_backend import routes
-
+def __getattr__(name):
+    if name not in _APPLICATION_NAMES:
+        raise AttributeError(f"module 'satellitor_backend' has no attribute '{name}'")
+    return getattr(importlib.import_module("satellitor_backend.application"), name)
@@ -0,0 +1,153 @@
+from flask import Flask
+from flask_cors import CORS
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from satellitor_backend.scheduler import InferenceScheduler
+from satellitor_backend.geo_cache import GeoCache
+from satellitor_backend.data_sources import create_data_source, EarthEngineSource
+from satellitor_backend.fertilizer import FertilizerModel
+from satellitor_backend.crop_suitability import CropTable
+from satellitor_backend.suitability_map import SuitabilityMap
+from satellitor_backend.jobs import JobQueue
+from satellitor_backend.artifacts import create_artifact_store
+from satellitor_backend.result_cache import ResultCache
+from satellitor_backend.inference_backends import load_model
+from satellitor_backend.model_server import ModelServerClient
+from satellitor_backend.ingest import UploadRequest
+from satellitor_backend.startup import Startup, init_earth_engine, warm_up
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+model_path = os.path.join(BASE_DIR, 'best.pt')
+app = Flask(__package__)
+# uploads are received in memory, not spooled to temporary files
+app.request_class = UploadRequest
+CORS(app)
+app.config.from_mapping(
+    # how best.pt is run: "pytorch", "onnx" (ONNX Runtime) or "openvino"; exports are
+    # made next to best.pt on first start. INFERENCE_INT8 quantizes the export,
+    # calibrated on the captures in INFERENCE_CALIBRATION_DIR. The onnx and openvino
+    # backends need the packages of requirements-backends.txt
+    INFERENCE_BACKEND="pytorch",
+    INFERENCE_INT8=False,
+    INFERENCE_CALIBRATION_DIR=os.path.join(BASE_DIR, 'calibration'),
+    # maximum number of images sent to YOLO in one forward pass
+    INFERENCE_BATCH_SIZE=8,
+    # how long the inference scheduler waits to fill a batch once a frame is queued
+    INFERENCE_BATCH_WINDOW_MS=10,
+    # images whose longer side exceeds INFERENCE_TILE_THRESHOLD pixels are segmented
+    # as overlapping tiles of INFERENCE_TILE_SIZE (0 disables tiling)
+    INFERENCE_TILE_SIZE=640,
+    INFERENCE_TILE_OVERLAP=128,
+    INFERENCE_TILE_THRESHOLD=2048,
+    # uploads are decoded straight to a frame whose longer side is INFERENCE_IMAGE_SIZE (the
+    # model input size), the class map keeps the size of the capture (0 decodes at full size)
+    INFERENCE_IMAGE_SIZE=640,
+    # Unix socket of the model server (python -m satellitor_backend.model_server). When set,
+    # workers send their frames to it instead of loading best.pt themselves ("" disables it)
+    MODEL_SERVER_SOCKET="",
+    # model processes of the server, and the intra-op threads (pinned cores) of each one
+    # (0 keeps the PyTorch default and does not pin)
+    MODEL_SERVER_PROCESSES=1,
+    MODEL_SERVER_THREADS=0,
+    # soil/climate lookups cache: SQLite file of the disk tier ("" keeps it in memory only)
+    GEO_CACHE_PATH=os.path.join(BASE_DIR, 'geo_cache.sqlite3'),
+    GEO_CACHE_SIZE=4096,
+    # maximum number of Earth Engine / NASA POWER lookups in flight at once
+    LOOKUP_WORKERS=8,
+    # where soil and climate values come from: "earthengine" (live) or "local"
+    # (pre-downloaded GeoTIFFs in LOCAL_RASTER_DIR, see data_sources.LocalRasterSource)
+    SOIL_DATA_SOURCE="earthengine",
+    LOCAL_RASTER_DIR=os.path.join(BASE_DIR, 'rasters'),
+    # tiles of the precomputed crop-suitability map served by /suitability
+    # (built with `python -m satellitor_backend.suitability_map`)
+    SUITABILITY_MAP_DIR=os.path.join(BASE_DIR, 'suitability'),
+    # job API (/jobs): pipelines running at once, queued jobs accepted before
+    # answering 503, and how long finished jobs can be polled; job states are kept in
+    # JOB_STATE_PATH so any gunicorn worker can answer a poll ("" keeps them in process)
+    JOB_WORKERS=2,
+    JOB_QUEUE_SIZE=64,
+    JOB_TTL_SECONDS=900,
+    JOB_STATE_PATH=os.path.join(BASE_DIR, 'jobs.sqlite3'),
+    # uploads, masks and boundaries served by /download: "memory" (LRU within
+    # ARTIFACT_MAX_BYTES, single process only) or "disk" (files in ARTIFACT_DIR, shared
+    # by all the workers, the default under gunicorn, no byte budget), kept ARTIFACT_TTL_SECONDS
+    ARTIFACT_STORE="memory",
+    ARTIFACT_MAX_BYTES=512 * 1024 * 1024,
+    ARTIFACT_DIR=os.path.join(BASE_DIR, 'artifact_store'),
+    ARTIFACT_TTL_SECONDS=900,
+    # keep every upload as its "<id>_input.png" artifact (normal_image in the responses),
+    # written in the background while the capture is analysed
+    ARCHIVE_INPUTS=True,
+    # requests over MAX_CONTENT_LENGTH are refused (413) before they are read; each image
+    # must be at most UPLOAD_MAX_BYTES, and UPLOAD_MAX_PIXELS as read from its header
+    MAX_CONTENT_LENGTH=256 * 1024 * 1024,
+    UPLOAD_MAX_BYTES=64 * 1024 * 1024,
+    UPLOAD_MAX_PIXELS=150_000_000,
+    # /process responses reused for identical uploads at the same (rounded)
+    # coordinates; RESULT_CACHE_SIZE=0 disables it, the TTL should not exceed
+    # ARTIFACT_TTL_SECONDS
+    RESULT_CACHE_SIZE=1024,
+    RESULT_CACHE_TTL_SECONDS=900,
+    RESULT_CACHE_DECIMALS=4,
+    # mask download encoding (see encoding.MASK_FORMATS): "indexed" 1-channel palette
+    # PNG, "webp" lossless WebP or "png" 3-channel color PNG, zlib level / WebP effort
+    # 0-9; MASK_VECTOR "polygons" or "rle" also embeds the mask in the JSON response.
+    # Requests can override them with the mask_format / mask_vector / mask_compression fields.
+    MASK_FORMAT="indexed",
+    MASK_COMPRESSION=6,
+    MASK_VECTOR="",
+    MASK_SIMPLIFY_TOLERANCE=1.5,
+    # also return the class boundaries as simplified contours ("boundary_contours"),
+    # per request with the boundary_vector form field
+    BOUNDARY_VECTOR=False,
+    # Earth Engine service account, initialized in every worker after the fork
+    EE_SERVICE_ACCOUNT="earth-engine-access@premium-buckeye-310022.iam.gserviceaccount.com",
+    EE_KEY_FILE="/home/ubuntu/keys/google-service-account.json",
+    # size of the blank frame each worker runs through the model before /ready is OK (0 skips it)
+    WARMUP_IMAGE_SIZE=640,
+)
+# e.g. SATELLITOR_INFERENCE_BATCH_SIZE=16
+app.config.from_prefixed_env("SATELLITOR")
+if app.config['MODEL_SERVER_SOCKET']:
+    model = ModelServerClient(app.config['MODEL_SERVER_SOCKET'])
+else:
+    model = load_model(model_path, app.config['INFERENCE_BACKEND'], app.config['INFERENCE_INT8'],
+                       app.config['INFERENCE_CALIBRATION_DIR'])
+scheduler = InferenceScheduler(model, app.config['INFERENCE_BATCH_SIZE'], app.config['INFERENCE_BATCH_WINDOW_MS'])
+geo_cache = GeoCache(app.config['GEO_CACHE_PATH'], app.config['GEO_CACHE_SIZE'])
+lookup_pool = ThreadPoolExecutor(max_workers=app.config['LOOKUP_WORKERS'], thread_name_prefix="lookup")
+data_source = create_data_source(app.config['SOIL_DATA_SOURCE'], app.config['LOCAL_RASTER_DIR'])
+fertilizer_model = FertilizerModel(os.path.join(BASE_DIR, 'artifacts', 'fertilizer.pkl'))
+crops = json.load(open(os.path.join(BASE_DIR, 'crops.json'), 'r'))
+crop_table = CropTable(crops)
+suitability_map = SuitabilityMap(app.config['SUITABILITY_MAP_DIR'])
+job_queue = JobQueue(app.config['JOB_WORKERS'], app.config['JOB_QUEUE_SIZE'], app.config['JOB_TTL_SECONDS'],
+                     app.config['JOB_STATE_PATH'] or None)
+artifact_store = create_artifact_store(app.config['ARTIFACT_STORE'], app.config['ARTIFACT_DIR'],
+                                       app.config['ARTIFACT_MAX_BYTES'], app.config['ARTIFACT_TTL_SECONDS'])
+result_cache = ResultCache(app.config['RESULT_CACHE_SIZE'], app.config['RESULT_CACHE_TTL_SECONDS'],
+                           app.config['RESULT_CACHE_DECIMALS'])
+
+# loaded here so that a gunicorn master started with preload_app (see gunicorn.conf.py)
+# shares them with its workers
+fertilizer_model.load()
+
+# per-process steps, run in the background when a worker starts (or on the first request)
+worker_startup = Startup()
+# (not needed when running air-gapped on local rasters)
+if isinstance(data_source, EarthEngineSource):
+    worker_startup.add_step("earth_engine", lambda: init_earth_engine(app.config['EE_SERVICE_ACCOUNT'],
+                                                                      app.config['EE_KEY_FILE']))
+if app.config['WARMUP_IMAGE_SIZE']:
+    worker_startup.add_step("warm_up", lambda: warm_up(scheduler, app.config['WARMUP_IMAGE_SIZE']))
+
+
+@app.before_request
+def start_worker():
+    worker_startup.start()
+
+
+from satellitor_backend import routes
+
@@ -0,0 +1,300 @@
+from collections import OrderedDict
+import hashlib
+import heapq
+import json
+import os
+import threading
+import time
+
+# files of the disk store that are not artifacts: metadata sidecars and unfinished writes
+RESERVED_SUFFIXES = (".meta", ".tmp")
+
+
+class Artifact:
+    """
+    One stored file (upload, mask, boundaries...): its bytes in memory or its path on disk.
+    `etag` is a digest of the content, None for files found on disk without their metadata.
+    """
+
+    __slots__ = ("name", "content_type", "size", "created", "expires", "data", "path", "etag")
+
+    def __init__(self, name, content_type, size, expires, data=None, path=None, etag=None):
+        self.name = name
+        self.content_type = content_type
+        self.size = size
+        self.created = time.time()
+        self.expires = expires
+        self.data = data
+        self.path = path
+        self.etag = etag
+
+    def read(self):
+        """Returns the artifact bytes."""
+        if self.data is not None:
+            return self.data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class ArtifactStore:
+    """
+    Named artifacts served by /download, expiring `ttl` seconds after they were stored.
+
+    Expiry times are kept in a heap, so expired artifacts are dropped by popping its head
+    (O(log n) each) whenever the store is used, instead of periodically listing and
+    stat-ing a folder. Subclasses decide where the bytes live (`_write` / `_remove`).
+
+    Parameters
+    ----------
+    ttl : float, optional
+        Seconds an artifact stays available, default is 900.
+    """
+
+    name = None
+
+    def __init__(self, ttl=900):
+        self.ttl = ttl
+        self._index = OrderedDict()
+        self._expiry = []
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evicted = 0
+
+    # ------------------------------------------------------------
+
+    def put(self, name, data, content_type="application/octet-stream"):
+        """
+        Stores `data` (bytes) under `name`, replacing any artifact of that name.
+
+        Returns
+        -------
+        Artifact
+        """
+        data = bytes(data)
+        expires = time.time() + self.ttl
+        etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+        artifact = self._write(name, data, content_type, expires, etag)
+        with self._lock:
+            replaced = self._index.pop(name, None)
+            if replaced is not None:
+                self._bytes -= replaced.size
+                if replaced.path != artifact.path:
+                    self._remove(replaced)
+            self._add(artifact)
+            self._expire(time.time())
+            self._evict()
+        return artifact
+
+    def get(self, name):
+        """Returns the Artifact stored under `name`, or None if it is unknown or expired."""
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            # a hit is trusted without touching the disk, artifacts are only removed when
+            # they expire, at the same time in every process sharing the store
+            artifact = self._index.get(name)
+            if artifact is None:
+                artifact = self._load(name)
+                if artifact is not None and artifact.expires <= now:
+                    self._remove(artifact)
+                    self._expired += 1
+                    artifact = None
+                if artifact is None:
+                    self._misses += 1
+                    return None
+                self._add(artifact)
+            self._index.move_to_end(name)
+            self._hits += 1
+            return artifact
+
+    def delete(self, name):
+        with self._lock:
+            self._drop(self._index.pop(name, None))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.name,
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "evicted": self._evicted,
+            }
+
+    # ------------------------------------------------------------
+
+    def _write(self, name, data, content_type, expires, etag):
+        raise NotImplementedError
+
+    def _load(self, name):
+        """Artifact stored under `name` by another process (possibly expired), None if there is none."""
+        return None
+
+    def _remove(self, artifact):
+        pass
+
+    def _add(self, artifact):
+        self._index[artifact.name] = artifact
+        self._bytes += artifact.size
+        heapq.heappush(self._expiry, (artifact.expires, artifact.name))
+
+    def _evict(self):
+        pass
+
+    def _drop(self, artifact):
+        if artifact is not None:
+            self._bytes -= artifact.size
+            self._remove(artifact)
+
+    def _expire(self, now):
+        while self._expiry and self._expiry[0][0] <= now:
+            expires, name = heapq.heappop(self._expiry)
+            artifact = self._index.get(name)
+            # skip heap entries left behind by a replaced or evicted artifact
+            if artifact is not None and artifact.expires == expires:
+                del self._index[name]
+                self._drop(artifact)
+                self._expired += 1
+
+
+class MemoryArtifactStore(ArtifactStore):
+    """
+    Artifacts kept in memory within a byte budget, least recently downloaded evicted first.
+    The budget is per process: every gunicorn worker would hold its own store.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Total size of the stored artifacts, default is 512 MiB.
+
+    ttl : float, optional
+        Seconds an artifact stays available, default is 900.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, ttl=900):
+        super().__init__(ttl)
+        self.max_bytes = max_bytes
+
+    def stats(self):
+        stats = super().stats()
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+    def _write(self, name, data, content_type, expires, etag):
+        return Artifact(name, content_type, len(data), expires, data=data, etag=etag)
+
+    def _evict(self):
+        # keeps at least the artifact just stored
+        while self._bytes > self.max_bytes and len(self._index) > 1:
+            _, artifact = self._index.popitem(last=False)
+            self._drop(artifact)
+            self._evicted += 1
+
+
+class DiskArtifactStore(ArtifactStore):
+    """
+    Artifacts written as files of `directory`, for payloads that should not sit in memory,
+    must survive a restart, or are shared by several worker processes.
+
+    Each file has a `.meta` sidecar holding its content type, digest and expiry time. The
+    index is only a cache of the folder: a name missing from it is looked up on disk, so an
+    artifact stored by one gunicorn worker can be downloaded from any other, and files
+    already in the folder are found after a restart.
+
+    There is no byte budget: the folder is bounded by the TTL alone, the same in every
+    worker, and any worker may remove an expired file. A file can therefore disappear
+    between `get` and the moment it is sent, which /download answers with a 404.
+
+    Parameters
+    ----------
+    directory : str
+        Folder of the artifact files.
+
+    ttl : float, optional
+        Seconds an artifact stays available, default is 900.
+    """
+
+    name = "disk"
+
+    def __init__(self, directory, ttl=900):
+        super().__init__(ttl)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        now = time.time()
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.endswith(RESERVED_SUFFIXES):
+                artifact = self._load(entry.name)
+                if artifact is not None:
+                    self._add(artifact)
+        self._expire(now)
+
+    def _path(self, name):
+        return os.path.join(self.directory, os.path.basename(name))
+
+    def _write(self, name, data, content_type, expires, etag):
+        path = self._path(name)
+        # the metadata is in place before the file, so a process finding the file finds both
+        _write_atomic(f"{path}.meta", json.dumps({"content_type": content_type, "etag": etag,
+                                                  "expires": expires}).encode())
+        _write_atomic(path, data)
+        return Artifact(name, content_type, len(data), expires, path=path, etag=etag)
+
+    def _load(self, name):
+        if name.endswith(RESERVED_SUFFIXES):
+            return None
+        path = self._path(name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        try:
+            with open(f"{path}.meta", "rb") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            # file written by an older version, it expires `ttl` after it was written
+            meta = {"content_type": _guess_type(name), "etag": None, "expires": stat.st_mtime + self.ttl}
+        artifact = Artifact(name, meta["content_type"], stat.st_size, meta["expires"], path=path, etag=meta["etag"])
+        artifact.created = stat.st_mtime
+        return artifact
+
+    def _remove(self, artifact):
+        for path in (artifact.path, f"{artifact.path}.meta"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # already removed by another process sharing the store
+                pass
+            except OSError as e:
+                print(f"Error deleting {path}: {e}")
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _guess_type(name):
+    return {"png": "image/png", "webp": "image/webp", "json": "application/json"}.get(
+        name.rsplit(".", 1)[-1].lower(), "application/octet-stream")
+
+
+def create_artifact_store(name, directory=None, max_bytes=512 * 1024 * 1024, ttl=900):
+    """
+    Builds the artifact store selected by the ARTIFACT_STORE setting ("memory" or "disk").
+    """
+    if name == MemoryArtifactStore.name:
+        return MemoryArtifactStore(max_bytes, ttl)
+    if name == DiskArtifactStore.name:
+        return DiskArtifactStore(directory, ttl)
+    raise ValueError(f"Unknown artifact store: {name}")
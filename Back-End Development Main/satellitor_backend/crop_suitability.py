@@ -0,0 +1,146 @@
+import numpy as np
+
+
+# the three conditions checked for every crop, as named in crops.json
+CONDITIONS = ["temp", "ph", "rainfall"]
+
+
+class CropTable:
+    """
+    crops.json compiled into NumPy range arrays, scoring every crop for many locations at once.
+
+    A crop is "best" at a location when at least two of temperature, pH and rainfall are in
+    its optimal range (`*_opt_min` .. `*_opt_max`), and "normal" when it is not best but at
+    least two of them are in its tolerated range (`*_min` .. `*_max`). A pH of -1 means the
+    pH is unknown, the pH condition is then never met. These are the rules of
+    get_best_crops and get_crops, evaluated as (locations x crops) boolean arrays instead of
+    Python loops, so the cost grows with the array size, not with interpreter work.
+
+    Parameters
+    ----------
+    crops : dict
+        Crop name -> properties, as loaded from crops.json.
+
+    Example
+    -------
+    >>> table = CropTable(crops)
+    >>> table.evaluate(ph=[7.2, 6.5], temp=[22.0, 27.5], rainfall=[30.0, 450.0])
+    [{"best_crops": [...], "normal_crops": [...]}, {...}]
+    """
+
+    def __init__(self, crops):
+        self.names = list(crops)
+        self.props = [crops[name] for name in self.names]
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+        def column(key):
+            return np.array([prop[key] for prop in self.props], dtype=float)
+
+        self.optimal = {c: (column(f"{c}_opt_min"), column(f"{c}_opt_max")) for c in CONDITIONS}
+        self.tolerated = {c: (column(f"{c}_min"), column(f"{c}_max")) for c in CONDITIONS}
+        self._irrigation_notes = [
+            f" Needs attention to irrigation. Optimal rainfall: {prop['rainfall_opt_min']} mm/year to {prop['rainfall_opt_max']} mm/year. "
+            for prop in self.props
+        ]
+
+    # ------------------------------------------------------------
+
+    def conditions(self, ph, temp, rainfall, ranges):
+        """
+        Checks every condition for every (location, crop) pair.
+
+        Parameters
+        ----------
+        ph, temp, rainfall : float or array-like
+            Values of the locations (same length). None/NaN never meet a condition.
+
+        ranges : dict
+            `self.optimal` or `self.tolerated`.
+
+        Returns
+        -------
+        dict
+            Condition name -> (locations, crops) boolean array.
+        """
+        values = {"temp": temp, "ph": ph, "rainfall": rainfall}
+        met = {}
+        for condition in CONDITIONS:
+            value = np.asarray(values[condition], dtype=float).reshape(-1, 1)
+            low, high = ranges[condition]
+            met[condition] = (low <= value) & (value <= high)
+        met["ph"] &= np.asarray(ph, dtype=float).reshape(-1, 1) != -1
+        return met
+
+    def classify(self, ph, temp, rainfall):
+        """
+        Returns the (locations, crops) boolean arrays of best and normal crops, plus the
+        per-condition arrays used to build their flags and notes.
+        """
+        optimal = self.conditions(ph, temp, rainfall, self.optimal)
+        tolerated = self.conditions(ph, temp, rainfall, self.tolerated)
+        best = sum(optimal[c].astype(np.uint8) for c in CONDITIONS) >= 2
+        normal = (sum(tolerated[c].astype(np.uint8) for c in CONDITIONS) >= 2) & ~best
+        return best, normal, optimal, tolerated
+
+    def evaluate(self, ph, temp, rainfall):
+        """
+        Best and normal crops for many locations in one vectorized pass.
+
+        Returns
+        -------
+        list of dict
+            {"best_crops": [...], "normal_crops": [...]} per location, with the same
+            entries get_best_crops / get_crops return.
+        """
+        best, normal, optimal, tolerated = self.classify(ph, temp, rainfall)
+        ph = np.asarray(ph, dtype=float).reshape(-1)
+        return [
+            {
+                "best_crops": self._entries(np.flatnonzero(best[i]), optimal, i, ph[i] != -1),
+                "normal_crops": self._entries(np.flatnonzero(normal[i]), tolerated, i, ph[i] != -1),
+            }
+            for i in range(best.shape[0])
+        ]
+
+    def best_crops(self, ph, temp, rainfall):
+        """get_best_crops for one location."""
+        best, _, optimal, _ = self.classify(ph, temp, rainfall)
+        return self._entries(np.flatnonzero(best[0]), optimal, 0, ph != -1)
+
+    def normal_crops(self, ph, temp, rainfall, exclude=()):
+        """get_crops for one location: crops meeting two tolerated ranges, minus the `exclude` names."""
+        tolerated = self.conditions(ph, temp, rainfall, self.tolerated)
+        suitable = sum(tolerated[c].astype(np.uint8) for c in CONDITIONS)[0] >= 2
+        excluded = [self._index[name] for name in exclude if name in self._index]
+        suitable[excluded] = False
+        return self._entries(np.flatnonzero(suitable), tolerated, 0, ph != -1)
+
+    # ------------------------------------------------------------
+
+    def _entries(self, crop_ids, met, location, has_ph):
+        entries = []
+        for c in crop_ids:
+            is_temp = bool(met["temp"][location, c])
+            is_ph = bool(met["ph"][location, c])
+            is_rainfall = bool(met["rainfall"][location, c])
+
+            crop_notes = ""
+            if not is_temp:
+                crop_notes += "Needs attention to Temperature."
+            if has_ph:
+                if not is_ph:
+                    crop_notes += "Needs attention to soil pH."
+            else:
+                crop_notes += " pH not provided in this land. "
+            if not is_rainfall:
+                crop_notes += self._irrigation_notes[c]
+
+            entries.append({
+                "crop_name": self.names[c],
+                "isTemp": is_temp,
+                "isPh": is_ph,
+                "isRainfall": is_rainfall,
+                "crop_notes": crop_notes.strip(),
+                "crop_data": self.props[c]
+            })
+        return entries
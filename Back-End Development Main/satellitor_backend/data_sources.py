@@ -0,0 +1,186 @@
+import glob
+import os
+import threading
+
+import numpy as np
+
+from satellitor_backend.geotiff import GeoTiff, write_geotiff
+from satellitor_backend.soil_query import SOURCE_BANDS, DECODERS, query_soil_climate, query_climate
+
+
+# bands of the local "climate" rasters: NASA POWER annual T2M (°C) and RH2M (%)
+CLIMATE_BANDS = ["T2M_ANN", "RH2M_ANN"]
+
+# every value fetch_site_data asks a data source for
+ALL_SOURCES = ["climate", *SOURCE_BANDS]
+
+
+class DataSource:
+    """
+    Where get_land_properties and get_soil_data read their soil and climate values from.
+
+    A data source answers point queries for any of ALL_SOURCES ("climate", "ph",
+    "precipitation", "phosphorus", "potassium", "nitrogen", "texture", "moisture") and
+    returns the same values as the original Earth Engine / NASA POWER getters.
+
+    Attributes
+    ----------
+    name : str
+        Name used in the SOIL_DATA_SOURCE setting.
+
+    remote : bool
+        True if queries do network I/O, in which case fetch_site_data runs them on the
+        lookup pool and caches them in geo_cache.
+    """
+
+    name = None
+    remote = True
+
+    def sample(self, lat, long, sources):
+        """
+        Returns {source: value} for the requested sources at (lat, long).
+        "climate" is [temperature, humidity], the others are as in soil_query.DECODERS.
+        """
+        raise NotImplementedError
+
+
+class EarthEngineSource(DataSource):
+    """
+    Live backend: one composite Earth Engine query for the soil sources, NASA POWER for "climate".
+    """
+
+    name = "earthengine"
+    remote = True
+
+    def sample(self, lat, long, sources):
+        values = {}
+        soil_sources = [source for source in sources if source != "climate"]
+        if "climate" in sources:
+            values["climate"] = query_climate(lat, long)
+        if soil_sources:
+            values.update(query_soil_climate(lat, long, soil_sources))
+        return values
+
+
+class LocalRasterSource(DataSource):
+    """
+    Offline backend sampling pre-downloaded rasters through memory-mapped windows.
+
+    `directory` holds, for every source, either `<source>.tif` or a `<source>/` folder of
+    GeoTIFF tiles. Each raster has the bands of SOURCE_BANDS[source] (CLIMATE_BANDS for
+    "climate"), in that order and in the units of the Earth Engine datasets, so the same
+    decoders apply. Rasters are opened lazily and kept mapped, a query only reads the
+    bytes of one pixel per raster and does no network I/O.
+
+    Parameters
+    ----------
+    directory : str
+        Root folder of the rasters (LOCAL_RASTER_DIR setting).
+    """
+
+    name = "local"
+    remote = False
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._rasters = {}
+        self._lock = threading.Lock()
+
+    def sample(self, lat, long, sources):
+        values = {}
+        for source in sources:
+            bands = self._sample_bands(source, lat, long)
+            if source == "climate":
+                if bands is None or None in bands:
+                    raise ValueError(f"No local climate data at ({lat}, {long})")
+                values[source] = bands
+            else:
+                values[source] = DECODERS[source](dict(zip(SOURCE_BANDS[source], bands or [])))
+        return values
+
+    def _sample_bands(self, source, lat, long):
+        for raster in self._open(source):
+            if raster.contains(lat, long):
+                return raster.sample(lat, long)
+        return None
+
+    def _open(self, source):
+        with self._lock:
+            rasters = self._rasters.get(source)
+            if rasters is None:
+                paths = sorted(glob.glob(os.path.join(self.directory, source, "*.tif")))
+                single = os.path.join(self.directory, f"{source}.tif")
+                if os.path.isfile(single):
+                    paths.append(single)
+                rasters = self._rasters[source] = [GeoTiff(path) for path in paths]
+            return rasters
+
+
+def create_data_source(name, raster_dir=None):
+    """
+    Builds the data source selected by the SOIL_DATA_SOURCE setting ("earthengine" or "local").
+    """
+    if name == EarthEngineSource.name:
+        return EarthEngineSource()
+    if name == LocalRasterSource.name:
+        return LocalRasterSource(raster_dir)
+    raise ValueError(f"Unknown soil data source: {name}")
+
+# ============================================================
+
+def write_synthetic_rasters(directory, bounds=(24.0, 22.0, 37.0, 32.0), size=(200, 260), tiles=2):
+    """
+    Writes a synthetic raster set for LocalRasterSource, for CI and load tests.
+
+    Every band is a smooth, deterministic function of the pixel position within realistic
+    ranges (pH x10 around 60-85, precipitation 0-300 mm, texture classes 1-12, ...).
+    Each source is split into `tiles` vertical GeoTIFF tiles under `<directory>/<source>/`,
+    so tile lookup is exercised as well.
+
+    Parameters
+    ----------
+    directory : str
+        Output folder.
+
+    bounds : tuple, optional
+        (min_lon, min_lat, max_lon, max_lat), default roughly covers Egypt.
+
+    size : tuple, optional
+        (height, width) in pixels of the whole raster, default is (200, 260).
+
+    tiles : int, optional
+        Number of tiles per source, default is 2.
+
+    Returns
+    -------
+    dict
+        Source name -> (bands, height, width) array of the values written, to compare samples against.
+    """
+    height, width = size
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    u, v = xx / max(width - 1, 1), yy / max(height - 1, 1)
+
+    def smooth(low, high, phase=0.0):
+        return (low + (high - low) * (0.5 + 0.5 * np.sin(3 * u + 2 * v + phase))).astype(np.float32)
+
+    rasters = {
+        "climate": (np.stack([smooth(14, 30), smooth(30, 75, 1.0)]), None),
+        "ph": (np.stack([smooth(60, 85, k) for k in range(len(SOURCE_BANDS["ph"]))]), None),
+        "precipitation": (smooth(0, 300, 2.0)[None], None),
+        "phosphorus": (np.stack([smooth(5, 40, 0.3), smooth(4, 30, 0.6)]), None),
+        "potassium": (np.stack([smooth(50, 300, 0.9), smooth(40, 250, 1.2)]), None),
+        "nitrogen": (np.stack([smooth(0.5, 2.0, 1.5), smooth(0.3, 1.5, 1.8)]), None),
+        "texture": (np.round(smooth(1, 12, 2.5))[None].astype(np.uint8), 0),
+        "moisture": (np.stack([smooth(0.05, 0.4, 2.7), smooth(0.05, 0.4, 3.0)]), None),
+    }
+
+    min_lon, min_lat, max_lon, max_lat = bounds
+    lon_step = (max_lon - min_lon) / width
+    edges = np.linspace(0, width, tiles + 1).astype(int)
+    for source, (data, nodata) in rasters.items():
+        os.makedirs(os.path.join(directory, source), exist_ok=True)
+        for n, (x0, x1) in enumerate(zip(edges[:-1], edges[1:])):
+            tile_bounds = (min_lon + x0 * lon_step, min_lat, min_lon + x1 * lon_step, max_lat)
+            write_geotiff(os.path.join(directory, source, f"tile_{n}.tif"), data[:, :, x0:x1], tile_bounds, nodata)
+
+    return {source: data for source, (data, _) in rasters.items()}
@@ -0,0 +1,168 @@
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from satellitor_backend.landcover import class_names, colorize, _PALETTE
+
+
+# mask encodings: format -> (content type, file extension)
+#   "png"     3-channel color PNG, as written by get_mask
+#   "indexed" 1-channel palette PNG, class index per pixel, colors in the PLTE chunk
+#   "webp"    lossless WebP of the colored mask
+MASK_FORMATS = {
+    "png": ("image/png", "png"),
+    "indexed": ("image/png", "png"),
+    "webp": ("image/webp", "webp"),
+}
+
+# vector representations that can be embedded in the JSON response
+VECTOR_FORMATS = ["polygons", "rle"]
+
+
+def _rgb_palette():
+    # _PALETTE is BGR, PIL palettes are RGB
+    return _PALETTE[:, ::-1].astype(np.uint8).ravel().tolist()
+
+
+def encode_mask(class_map, fmt="png", compression=6):
+    """
+    Encodes a class map for download.
+
+    Parameters
+    ----------
+    class_map : numpy.ndarray
+        The (H, W) uint8 class index map returned by get_mask.
+
+    fmt : str, optional
+        One of MASK_FORMATS, default is "png".
+
+    compression : int, optional
+        0 (fastest) to 9 (smallest), default is 6. It is the zlib level for PNG and the
+        effort (method 0-6) for lossless WebP, output pixels are identical either way.
+
+    Returns
+    -------
+    bytes
+    """
+    if fmt == "png":
+        ok, buffer = cv2.imencode(".png", colorize(class_map), [cv2.IMWRITE_PNG_COMPRESSION, compression])
+        if not ok:
+            raise ValueError("Could not encode the mask")
+        return buffer.tobytes()
+
+    image = Image.fromarray(np.ascontiguousarray(class_map))
+    image.putpalette(_rgb_palette())
+    output = io.BytesIO()
+    if fmt == "indexed":
+        # 5 classes fit in 4 bits per pixel
+        image.save(output, format="PNG", compress_level=compression, bits=4)
+    elif fmt == "webp":
+        image.convert("RGB").save(output, format="WEBP", lossless=True, method=min(compression, 6))
+    else:
+        raise ValueError(f"Unknown mask format: {fmt}")
+    return output.getvalue()
+
+
+def encode_edges(edges, compression=6):
+    """
+    Encodes the binary edges image of detect_edges as a 1-bit PNG.
+    """
+    image = Image.fromarray(np.ascontiguousarray(edges > 0))
+    output = io.BytesIO()
+    image.save(output, format="PNG", compress_level=compression)
+    return output.getvalue()
+
+# ============================================================
+
+def mask_polygons(class_map, tolerance=1.5, min_area=4.0):
+    """
+    Traces the regions of every class as simplified polygons, in pixel coordinates.
+
+    Parameters
+    ----------
+    class_map : numpy.ndarray
+        The (H, W) uint8 class index map.
+
+    tolerance : float, optional
+        Douglas-Peucker tolerance in pixels, default is 1.5 (0 keeps every contour vertex).
+
+    min_area : float, optional
+        Regions smaller than this many pixels are dropped, default is 4.
+
+    Returns
+    -------
+    dict
+        Class name -> list of {"exterior": [[x, y], ...], "holes": [[[x, y], ...], ...]},
+        background excluded.
+    """
+    polygons = {}
+    for class_id in np.unique(class_map).tolist():
+        if class_id == 0 or class_id not in class_names:
+            continue
+        binary = (class_map == class_id).astype(np.uint8)
+        contours, hierarchy = cv2.findContours(binary, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+        if hierarchy is None:
+            continue
+
+        def simplify(contour):
+            if tolerance > 0:
+                contour = cv2.approxPolyDP(contour, tolerance, True)
+            return contour.reshape(-1, 2).tolist()
+
+        regions = []
+        for i, contour in enumerate(contours):
+            # with RETR_CCOMP, top level contours are outer borders and their children are holes
+            if hierarchy[0][i][3] != -1 or cv2.contourArea(contour) < min_area:
+                continue
+            exterior = simplify(contour)
+            if len(exterior) < 3:
+                continue
+            holes = []
+            child = hierarchy[0][i][2]
+            while child != -1:
+                if cv2.contourArea(contours[child]) >= min_area:
+                    hole = simplify(contours[child])
+                    if len(hole) >= 3:
+                        holes.append(hole)
+                child = hierarchy[0][child][0]
+            regions.append({"exterior": exterior, "holes": holes})
+        polygons[class_names[class_id]] = regions
+    return polygons
+
+
+def boundary_contours(class_map, tolerance=1.5, min_area=4.0):
+    """
+    The boundaries of every class as simplified closed contours, in pixel coordinates:
+    the outer border and the holes of each region of mask_polygons, as plain lines.
+
+    Returns
+    -------
+    dict
+        Class name -> list of contours ([[x, y], ...]), background excluded.
+    """
+    return {
+        name: [line for region in regions for line in [region["exterior"], *region["holes"]]]
+        for name, regions in mask_polygons(class_map, tolerance, min_area).items()
+    }
+
+
+def mask_rle(class_map):
+    """
+    Run-length encodes a class map in row-major order.
+
+    Returns
+    -------
+    dict
+        {"size": [H, W], "values": [...], "counts": [...]}, run i is counts[i] pixels of class values[i].
+    """
+    flat = class_map.ravel()
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    counts = np.diff(np.append(starts, flat.size))
+    return {"size": list(class_map.shape), "values": flat[starts].tolist(), "counts": counts.tolist()}
+
+
+def decode_rle(rle):
+    """Inverse of mask_rle."""
+    return np.repeat(np.array(rle["values"], dtype=np.uint8), rle["counts"]).reshape(rle["size"])
@@ -0,0 +1,84 @@
+import pickle
+import threading
+
+import numpy as np
+
+
+class FertilizerModel:
+    """
+    The fertilizer classifier and its label encoders, unpickled once and shared by all requests.
+
+    `artifacts/fertilizer.pkl` holds three pickles in a row: the classifier, the fertilizer
+    label encoder and the soil type encoder. They are loaded on first use (or by calling
+    `load()` at startup) under a lock, after which `predict` / `predict_many` only run the
+    classifier. Prediction does not modify the model, so concurrent calls are safe.
+
+    Parameters
+    ----------
+    path : str
+        Path of the pickle file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._model = None
+        self._encode_ferti = None
+        self._encode_soil = None
+
+    def load(self):
+        """Unpickles the artifacts if that was not done yet."""
+        if self._model is not None:
+            return
+        with self._lock:
+            if self._model is not None:
+                return
+            with open(self.path, "rb") as f:
+                model = pickle.load(f)
+                encode_ferti = pickle.load(f)
+                encode_soil = pickle.load(f)
+            self._encode_ferti = encode_ferti
+            self._encode_soil = encode_soil
+            self._model = model
+            print(f"Fertilizer model loaded from: {self.path}")
+
+    def predict(self, temperature, humidity, moisture, soil_type, nitrogen, phosphorus, potassium):
+        """
+        Recommends a fertilizer for one location, or returns None if an input is missing.
+        """
+        return self.predict_many([(temperature, humidity, moisture, soil_type, nitrogen, phosphorus, potassium)])[0]
+
+    def predict_many(self, rows):
+        """
+        Recommends fertilizers for many locations with a single classifier call.
+
+        Parameters
+        ----------
+        rows : list of tuple
+            (temperature, humidity, moisture, soil_type, nitrogen, phosphorus, potassium) per location.
+
+        Returns
+        -------
+        list
+            The fertilizer name of every row, None for rows with a missing value, soil type
+            "Other" or a soil type unknown to the encoder.
+        """
+        self.load()
+
+        soil_classes = set(self._encode_soil.classes_)
+        valid = [
+            i for i, row in enumerate(rows)
+            if row[3] != "Other" and row[3] in soil_classes and all(value is not None for value in row)
+        ]
+        labels = [None] * len(rows)
+        if not valid:
+            return labels
+
+        soil_encoded = self._encode_soil.transform([rows[i][3] for i in valid])
+        features = np.array([list(rows[i][:3]) + [0] + list(rows[i][4:]) for i in valid], dtype=float)
+        features[:, 3] = soil_encoded
+
+        predictions = self._encode_ferti.inverse_transform(self._model.predict(features))
+        for i, label in zip(valid, predictions):
+            labels[i] = label.item() if hasattr(label, "item") else label
+        return labels
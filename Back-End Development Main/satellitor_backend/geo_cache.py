@@ -0,0 +1,232 @@
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+
+DAY = 24 * 60 * 60
+
+# native grid of every remote data source as (lat step, lon step) in degrees,
+# and how long a looked-up value stays valid (seconds)
+GEO_SOURCES = {
+    "ph": ((1 / 480, 1 / 480), 30 * DAY),              # OpenLandMap soil pH, 250 m
+    "precipitation": ((1 / 120, 1 / 120), 30 * DAY),   # OpenLandMap precipitation, sampled at 1 km
+    "climate": ((0.5, 0.625), 7 * DAY),                # NASA POWER climatology, MERRA-2 grid
+    "phosphorus": ((1 / 3600, 1 / 3600), 30 * DAY),    # iSDA soil, 30 m
+    "potassium": ((1 / 3600, 1 / 3600), 30 * DAY),
+    "nitrogen": ((1 / 3600, 1 / 3600), 30 * DAY),
+    "texture": ((1 / 3600, 1 / 3600), 30 * DAY),
+    "moisture": ((0.09, 0.09), 30 * DAY),              # SMAP L3 enhanced, 9 km
+}
+
+
+class GeoCache:
+    """
+    Two-tier cache for point lookups of remote soil and climate datasets.
+
+    Coordinates are snapped to the native grid of each source (see GEO_SOURCES), so every
+    point falling in the same dataset cell shares one entry. Entries live in an in-memory
+    LRU and, when `path` is given, in a SQLite file that survives restarts and is shared
+    by all worker processes. Values must be JSON-serializable. Lookups of a cell already in
+    flight are shared (see get_or_submit), so concurrent requests for one place fetch it once.
+
+    Parameters
+    ----------
+    path : str, optional
+        SQLite file of the disk tier. Default is None (memory only).
+
+    max_entries : int, optional
+        Size of the in-memory LRU, default is 4096.
+
+    sources : dict, optional
+        source name -> ((lat step, lon step), ttl seconds), default is GEO_SOURCES.
+
+    negative_ttl : float, optional
+        TTL of None results (no data, or a failed lookup that returned None), default is one hour.
+
+    Example
+    -------
+    >>> cache = GeoCache("geo_cache.sqlite3")
+    >>> ph = cache.get_or_compute("ph", 30.04, 31.23, lambda: get_ph_level(point))
+    """
+
+    def __init__(self, path=None, max_entries=4096, sources=GEO_SOURCES, negative_ttl=3600):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.sources = sources
+        self.negative_ttl = negative_ttl
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        # reentrant: a future that is already done runs its callback in add_done_callback
+        self._flight_lock = threading.RLock()
+        self._local = threading.local()
+        self._stats = defaultdict(lambda: {"memory_hits": 0, "disk_hits": 0, "misses": 0, "shared": 0})
+
+    # ------------------------------------------------------------
+
+    def key(self, source, lat, lon):
+        """Returns the cache key of (lat, lon): the grid cell of `source` holding the point."""
+        (lat_step, lon_step), _ = self.sources[source]
+        return f"{source}:{math.floor(lat / lat_step)}:{math.floor(lon / lon_step)}"
+
+    def lookup(self, source, lat, lon):
+        """
+        Returns (True, value) if `source` has a valid entry at (lat, lon), (False, None) otherwise.
+        """
+        key = self.key(source, lat, lon)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                self._stats[source]["memory_hits"] += 1
+                return True, entry[1]
+
+        # the lock only guards the memory tier, disk reads of different threads run concurrently
+        entry = self._disk_get(key, now)
+        with self._lock:
+            if entry is not None:
+                self._memory_put(key, entry)
+                self._stats[source]["disk_hits"] += 1
+                return True, entry[1]
+
+            self._stats[source]["misses"] += 1
+            return False, None
+
+    def put(self, source, lat, lon, value):
+        """Stores `value` for `source` at (lat, lon) in both tiers."""
+        ttl = self.sources[source][1] if value is not None else self.negative_ttl
+        entry = (time.time() + ttl, value)
+        key = self.key(source, lat, lon)
+
+        with self._lock:
+            self._memory_put(key, entry)
+        self._disk_put(key, entry)
+
+    def get_or_compute(self, source, lat, lon, compute):
+        """
+        Returns the cached value of `source` at (lat, lon), calling `compute()` on a miss.
+
+        Exceptions raised by `compute` are not cached and propagate to the caller.
+        """
+        found, value = self.lookup(source, lat, lon)
+        if found:
+            return value
+
+        # computed outside the lock so slow lookups for different keys do not serialize
+        value = compute()
+        self.put(source, lat, lon, value)
+        return value
+
+    def get_or_submit(self, sources, lat, lon, submit):
+        """
+        Returns {source: concurrent.futures.Future} of the values of `sources` at (lat, lon).
+
+        Cached values come back as completed futures. A source whose cell (snapped key) is
+        already being fetched, for this point or any other point of the same cell, gets the
+        future of that lookup. The others are passed to `submit(missing)`, which must start
+        their lookups and return {source: Future}; its futures are shared until they complete,
+        so the lookups should put their values in the cache before completing.
+
+        Example
+        -------
+        >>> site = cache.get_or_submit(["ph", "climate"], lat, lon,
+        ...                            lambda missing: {name: pool.submit(fetch, name) for name in missing})
+        """
+        futures, missing = {}, []
+        for source in sources:
+            found, value = self.lookup(source, lat, lon)
+            if found:
+                futures[source] = Future()
+                futures[source].set_result(value)
+            else:
+                missing.append(source)
+        if not missing:
+            return futures
+
+        with self._flight_lock:
+            new = []
+            for source in missing:
+                shared = self._in_flight.get(self.key(source, lat, lon))
+                if shared is not None:
+                    futures[source] = shared
+                    with self._lock:
+                        self._stats[source]["shared"] += 1
+                else:
+                    new.append(source)
+            if new:
+                for source, future in submit(new).items():
+                    key = self.key(source, lat, lon)
+                    self._in_flight[key] = futures[source] = future
+                    future.add_done_callback(lambda done, key=key: self._landed(key, done))
+        return futures
+
+    def stats(self):
+        """Returns the hit/miss counters of every source and the size of the memory tier."""
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk": self.path,
+                "sources": {source: dict(counters) for source, counters in self._stats.items()},
+            }
+
+    # ------------------------------------------------------------
+
+    def _landed(self, key, future):
+        with self._flight_lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def _memory_put(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _connection(self):
+        # one connection per thread and process, opened lazily so it is never shared across
+        # a fork and threads do not wait for each other's queries
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=5)
+            with db:
+                # geo_cache held keys snapped to the nearest grid node, not to the cell holding the point
+                db.execute("DROP TABLE IF EXISTS geo_cache")
+                db.execute("CREATE TABLE IF NOT EXISTS geo_cells (key TEXT PRIMARY KEY, expires REAL, value TEXT)")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def _disk_get(self, key, now):
+        if not self.path:
+            return None
+        try:
+            row = self._connection().execute(
+                "SELECT expires, value FROM geo_cells WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Geo cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _disk_put(self, key, entry):
+        if not self.path:
+            return
+        try:
+            db = self._connection()
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO geo_cells (key, expires, value) VALUES (?, ?, ?)",
+                    (key, entry[0], json.dumps(entry[1])),
+                )
+        except (sqlite3.Error, TypeError) as e:
+            print(f"Geo cache write failed: {e}")
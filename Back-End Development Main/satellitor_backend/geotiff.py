@@ -0,0 +1,292 @@
+import struct
+
+import numpy as np
+
+
+# Minimal reader/writer for the uncompressed, north-up GeoTIFFs used by the local soil
+# and climate backend (see data_sources.LocalRasterSource). Only what is needed for point
+# sampling is supported: classic (not Big) TIFF, no compression, strips or tiles, chunky
+# or planar bands, and georeferencing through ModelPixelScale + ModelTiepoint.
+# Export rasters with e.g. `gdal_translate -co COMPRESS=NONE -co TILED=YES in.tif out.tif`.
+# rasterio would bring GDAL's native libraries into the backend image, and tifffile only
+# memory-maps contiguous (untiled) images; a point query here reads a few bytes of one
+# strip or tile of a mapped file, whatever its layout.
+
+TAG_WIDTH = 256
+TAG_HEIGHT = 257
+TAG_BITS_PER_SAMPLE = 258
+TAG_COMPRESSION = 259
+TAG_PHOTOMETRIC = 262
+TAG_STRIP_OFFSETS = 273
+TAG_SAMPLES_PER_PIXEL = 277
+TAG_ROWS_PER_STRIP = 278
+TAG_STRIP_BYTE_COUNTS = 279
+TAG_PLANAR_CONFIG = 284
+TAG_TILE_WIDTH = 322
+TAG_TILE_LENGTH = 323
+TAG_TILE_OFFSETS = 324
+TAG_TILE_BYTE_COUNTS = 325
+TAG_EXTRA_SAMPLES = 338
+TAG_SAMPLE_FORMAT = 339
+TAG_PIXEL_SCALE = 33550
+TAG_TIEPOINT = 33922
+TAG_GEO_KEYS = 34735
+TAG_GDAL_NODATA = 42113
+
+# TIFF field type -> (struct code, size)
+FIELD_TYPES = {1: ("B", 1), 2: ("s", 1), 3: ("H", 2), 4: ("I", 4), 5: ("II", 8),
+               6: ("b", 1), 8: ("h", 2), 9: ("i", 4), 11: ("f", 4), 12: ("d", 8)}
+
+SAMPLE_KINDS = {1: "u", 2: "i", 3: "f"}
+
+
+class GeoTiff:
+    """
+    A memory-mapped GeoTIFF answering point queries without reading the whole raster.
+
+    The file is mapped with numpy.memmap and only the bytes of the requested pixel are
+    touched, so opening and sampling cost the same whatever the raster size.
+
+    Parameters
+    ----------
+    path : str
+        Path of an uncompressed GeoTIFF in geographic (lat/lon) coordinates.
+
+    Attributes
+    ----------
+    bounds : tuple
+        (min_lon, min_lat, max_lon, max_lat) covered by the raster.
+
+    bands : int
+        Number of bands.
+
+    nodata : float or None
+        The GDAL nodata value, if set.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = np.memmap(path, dtype=np.uint8, mode="r")
+
+        order = bytes(self._data[:2])
+        if order not in (b"II", b"MM"):
+            raise ValueError(f"{path} is not a TIFF file")
+        self._endian = "<" if order == b"II" else ">"
+        magic, ifd_offset = struct.unpack(self._endian + "HI", bytes(self._data[2:8]))
+        if magic != 42:
+            raise ValueError(f"{path}: only classic TIFF is supported (not BigTIFF)")
+
+        tags = self._read_ifd(ifd_offset)
+        if tags.get(TAG_COMPRESSION, [1])[0] != 1:
+            raise ValueError(f"{path}: compressed GeoTIFFs are not supported, export with COMPRESS=NONE")
+
+        self.width = tags[TAG_WIDTH][0]
+        self.height = tags[TAG_HEIGHT][0]
+        self.bands = tags.get(TAG_SAMPLES_PER_PIXEL, [1])[0]
+        self._planar = tags.get(TAG_PLANAR_CONFIG, [1])[0] == 2
+
+        bits = tags[TAG_BITS_PER_SAMPLE][0]
+        kind = SAMPLE_KINDS[tags.get(TAG_SAMPLE_FORMAT, [1])[0]]
+        self.dtype = np.dtype(f"{self._endian}{kind}{bits // 8}")
+
+        self._tiled = TAG_TILE_OFFSETS in tags
+        if self._tiled:
+            self._block_width = tags[TAG_TILE_WIDTH][0]
+            self._block_height = tags[TAG_TILE_LENGTH][0]
+            self._offsets = tags[TAG_TILE_OFFSETS]
+        else:
+            self._block_width = self.width
+            self._block_height = min(tags.get(TAG_ROWS_PER_STRIP, [self.height])[0], self.height)
+            self._offsets = tags[TAG_STRIP_OFFSETS]
+        self._blocks_across = -(-self.width // self._block_width)
+        self._blocks_per_band = self._blocks_across * -(-self.height // self._block_height)
+
+        if TAG_PIXEL_SCALE not in tags or TAG_TIEPOINT not in tags:
+            raise ValueError(f"{path}: missing ModelPixelScale/ModelTiepoint georeferencing")
+        scale_x, scale_y = tags[TAG_PIXEL_SCALE][:2]
+        i, j, _, x, y, _ = tags[TAG_TIEPOINT][:6]
+        self._origin_lon = x - i * scale_x
+        self._origin_lat = y + j * scale_y
+        self._scale_x = scale_x
+        self._scale_y = scale_y
+        self.bounds = (self._origin_lon, self._origin_lat - self.height * scale_y,
+                       self._origin_lon + self.width * scale_x, self._origin_lat)
+
+        nodata = tags.get(TAG_GDAL_NODATA)
+        self.nodata = float(nodata.strip("\x00 ")) if nodata else None
+
+    # ------------------------------------------------------------
+
+    def contains(self, lat, lon):
+        min_lon, min_lat, max_lon, max_lat = self.bounds
+        return min_lon <= lon < max_lon and min_lat < lat <= max_lat
+
+    def sample(self, lat, lon):
+        """
+        Returns the values of every band at (lat, lon) as a list, None for nodata/NaN
+        values, or None if the point is outside the raster.
+        """
+        if not self.contains(lat, lon):
+            return None
+        col = min(int((lon - self._origin_lon) / self._scale_x), self.width - 1)
+        row = min(int((self._origin_lat - lat) / self._scale_y), self.height - 1)
+        return [self._value(row, col, band) for band in range(self.bands)]
+
+    def read(self, row0, row1, col0, col1):
+        """
+        Returns the raw (rows, cols, bands) values of a pixel window, nodata included.
+        Only the blocks overlapping the window are touched.
+        """
+        row0, col0 = max(row0, 0), max(col0, 0)
+        row1, col1 = min(row1, self.height), min(col1, self.width)
+        window = np.zeros((max(row1 - row0, 0), max(col1 - col0, 0), self.bands), dtype=self.dtype.newbyteorder("="))
+        if window.size == 0:
+            return window
+
+        for block_row in range(row0 // self._block_height, (row1 - 1) // self._block_height + 1):
+            for block_col in range(col0 // self._block_width, (col1 - 1) // self._block_width + 1):
+                y0, x0 = block_row * self._block_height, block_col * self._block_width
+                block = self._block(block_row * self._blocks_across + block_col, y0)
+                ys = slice(max(row0, y0), min(row1, y0 + block.shape[0]))
+                xs = slice(max(col0, x0), min(col1, x0 + block.shape[1]))
+                window[ys.start - row0:ys.stop - row0, xs.start - col0:xs.stop - col0] = \
+                    block[ys.start - y0:ys.stop - y0, xs.start - x0:xs.stop - x0]
+        return window
+
+    # ------------------------------------------------------------
+
+    def _value(self, row, col, band):
+        block = (row // self._block_height) * self._blocks_across + col // self._block_width
+        pixel = (row % self._block_height) * self._block_width + col % self._block_width
+        if self._planar:
+            offset = self._offsets[band * self._blocks_per_band + block] + pixel * self.dtype.itemsize
+        else:
+            offset = self._offsets[block] + (pixel * self.bands + band) * self.dtype.itemsize
+
+        value = self._data[offset:offset + self.dtype.itemsize].view(self.dtype)[0].item()
+        if value != value or (self.nodata is not None and value == self.nodata):
+            return None
+        return value
+
+    def _block(self, block, y0):
+        # tiles are always stored full size, the last strip only has the remaining rows
+        rows = self._block_height if self._tiled else min(self._block_height, self.height - y0)
+        count = rows * self._block_width
+        if self._planar:
+            planes = [self._block_values(self._offsets[band * self._blocks_per_band + block], count)
+                      for band in range(self.bands)]
+            return np.stack(planes, axis=-1).reshape(rows, self._block_width, self.bands)
+        return self._block_values(self._offsets[block], count * self.bands).reshape(rows, self._block_width, self.bands)
+
+    def _block_values(self, offset, count):
+        return self._data[offset:offset + count * self.dtype.itemsize].view(self.dtype)
+
+    def _read_ifd(self, offset):
+        endian = self._endian
+        (count,) = struct.unpack(endian + "H", bytes(self._data[offset:offset + 2]))
+        tags = {}
+        for n in range(count):
+            entry = offset + 2 + n * 12
+            tag, field_type, values = struct.unpack(endian + "HHI", bytes(self._data[entry:entry + 8]))
+            if field_type not in FIELD_TYPES:
+                continue
+            code, size = FIELD_TYPES[field_type]
+            length = size * values
+            start = entry + 8
+            if length > 4:
+                (start,) = struct.unpack(endian + "I", bytes(self._data[entry + 8:entry + 12]))
+            raw = bytes(self._data[start:start + length])
+            if field_type == 2:
+                tags[tag] = raw.decode("ascii", errors="ignore")
+            elif field_type == 5:
+                parts = struct.unpack(f"{endian}{2 * values}I", raw)
+                tags[tag] = [parts[k] / parts[k + 1] for k in range(0, len(parts), 2)]
+            else:
+                tags[tag] = list(struct.unpack(f"{endian}{values}{code}", raw))
+        return tags
+
+
+# ============================================================
+
+def write_geotiff(path, data, bounds, nodata=None):
+    """
+    Writes a (bands, height, width) or (height, width) array as an uncompressed, north-up GeoTIFF.
+
+    Parameters
+    ----------
+    path : str
+        Output file.
+
+    data : numpy.ndarray
+        Raster values, any unsigned/signed integer or float dtype.
+
+    bounds : tuple
+        (min_lon, min_lat, max_lon, max_lat) covered by the raster (WGS84).
+
+    nodata : float, optional
+        Value written as the GDAL nodata tag.
+    """
+    data = np.asarray(data)
+    if data.ndim == 2:
+        data = data[None]
+    bands, height, width = data.shape
+    pixels = np.ascontiguousarray(np.moveaxis(data, 0, -1)).astype(data.dtype.newbyteorder("<"))
+
+    min_lon, min_lat, max_lon, max_lat = bounds
+    scale = ((max_lon - min_lon) / width, (max_lat - min_lat) / height, 0.0)
+    sample_format = {"u": 1, "i": 2, "f": 3}[data.dtype.kind]
+    # GeoKeyDirectory: version 1.1.0, 3 keys: model type geographic, raster pixel-is-area, WGS84
+    geo_keys = [1, 1, 0, 3, 1024, 0, 1, 2, 1025, 0, 1, 1, 2048, 0, 1, 4326]
+
+    entries = [
+        (TAG_WIDTH, 4, [width]),
+        (TAG_HEIGHT, 4, [height]),
+        (TAG_BITS_PER_SAMPLE, 3, [data.dtype.itemsize * 8] * bands),
+        (TAG_COMPRESSION, 3, [1]),
+        (TAG_PHOTOMETRIC, 3, [1]),
+        (TAG_STRIP_OFFSETS, 4, [0]),
+        (TAG_SAMPLES_PER_PIXEL, 3, [bands]),
+        (TAG_ROWS_PER_STRIP, 4, [height]),
+        (TAG_STRIP_BYTE_COUNTS, 4, [pixels.nbytes]),
+        (TAG_PLANAR_CONFIG, 3, [1]),
+        (TAG_SAMPLE_FORMAT, 3, [sample_format] * bands),
+        (TAG_PIXEL_SCALE, 12, list(scale)),
+        (TAG_TIEPOINT, 12, [0.0, 0.0, 0.0, min_lon, max_lat, 0.0]),
+        (TAG_GEO_KEYS, 3, geo_keys),
+    ]
+    if bands > 1:
+        entries.append((TAG_EXTRA_SAMPLES, 3, [0] * (bands - 1)))
+    if nodata is not None:
+        entries.append((TAG_GDAL_NODATA, 2, f"{nodata:g}\x00"))
+    entries.sort()
+
+    # layout: header, IFD, out-of-line tag values, pixel data
+    ifd_offset = 8
+    extra_offset = ifd_offset + 2 + 12 * len(entries) + 4
+    packed = []
+    for tag, field_type, values in entries:
+        code, _ = FIELD_TYPES[field_type]
+        if field_type == 2:
+            raw = values.encode("ascii")
+        else:
+            raw = struct.pack(f"<{len(values)}{code}", *values)
+        packed.append((tag, field_type, len(values), raw))
+
+    pixel_offset = extra_offset + sum(len(raw) + len(raw) % 2 for _, _, _, raw in packed if len(raw) > 4)
+    ifd = struct.pack("<H", len(entries))
+    extra = b""
+    for tag, field_type, count, raw in packed:
+        if tag == TAG_STRIP_OFFSETS:
+            raw = struct.pack("<I", pixel_offset)
+        if len(raw) > 4:
+            ifd += struct.pack("<HHII", tag, field_type, count, extra_offset + len(extra))
+            extra += raw + b"\x00" * (len(raw) % 2)
+        else:
+            ifd += struct.pack("<HHI", tag, field_type, count) + raw.ljust(4, b"\x00")
+    ifd += struct.pack("<I", 0)
+
+    with open(path, "wb") as f:
+        f.write(b"II" + struct.pack("<HI", 42, ifd_offset))
+        f.write(ifd)
+        f.write(extra)
+        f.write(pixels.tobytes())
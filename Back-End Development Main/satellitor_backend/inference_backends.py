@@ -0,0 +1,230 @@
+import glob
+import importlib.util
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from satellitor_backend.landcover import class_names, class_histogram, class_percentages
+
+
+# INFERENCE_BACKEND values. "pytorch" runs best.pt as is, "onnx" (ONNX Runtime) and
+# "openvino" run an export of it. Exported models are loaded back through ultralytics.YOLO,
+# so every backend returns the same Results objects and result_to_class_map / get_mask
+# work unchanged.
+BACKENDS = ["pytorch", "onnx", "openvino"]
+
+# packages the backends need to run, export and quantize a model, from requirements-backends.txt
+# (ultralytics would otherwise try to pip install them on first use)
+RUNTIME_PACKAGES = {"pytorch": [], "onnx": ["onnxruntime"], "openvino": ["openvino"]}
+EXPORT_PACKAGES = {"pytorch": [], "onnx": ["onnx", "onnxslim"], "openvino": []}
+INT8_PACKAGES = {"pytorch": [], "onnx": ["onnx"], "openvino": ["nncf"]}
+
+IMAGE_EXTENSIONS = ("*.png", "*.jpg", "*.jpeg", "*.tif", "*.tiff")
+
+
+def calibration_images(directory, limit=None):
+    """Paths of the calibration images in `directory`, sorted."""
+    paths = sorted(path for pattern in IMAGE_EXTENSIONS for path in glob.glob(os.path.join(directory, pattern)))
+    return paths[:limit] if limit else paths
+
+
+def load_model(weights, backend="pytorch", int8=False, calibration_dir=None, imgsz=640):
+    """
+    Loads the segmentation model with the selected inference backend.
+
+    The export of `weights` is made on first use next to it and reused afterwards:
+    `best.onnx` / `best_int8.onnx` for ONNX Runtime, `best_openvino_model/` /
+    `best_int8_openvino_model/` for OpenVINO. Exports have a dynamic batch and input size,
+    so the InferenceScheduler batches and tiled inference keep working.
+
+    Parameters
+    ----------
+    weights : str
+        Path of the PyTorch weights (best.pt).
+
+    backend : str, optional
+        One of BACKENDS, default is "pytorch".
+
+    int8 : bool, optional
+        Quantize the exported model to INT8 (static, calibrated on `calibration_dir`).
+
+    calibration_dir : str, optional
+        Folder of representative satellite captures, required when `int8` is set.
+
+    imgsz : int, optional
+        Inference size of the export, default is 640.
+
+    Returns
+    -------
+    ultralytics.YOLO
+
+    Raises
+    ------
+    RuntimeError
+        If a package the backend needs is not installed (see requirements-backends.txt).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    if backend == "pytorch":
+        return YOLO(weights)
+    if int8 and not (calibration_dir and calibration_images(calibration_dir)):
+        raise ValueError("INT8 quantization needs a folder of calibration images (INFERENCE_CALIBRATION_DIR)")
+
+    stem = os.path.splitext(weights)[0]
+    _require_packages(backend, RUNTIME_PACKAGES[backend])
+    if backend == "onnx":
+        path = f"{stem}.onnx"
+        if not os.path.exists(path):
+            _require_packages(backend, EXPORT_PACKAGES[backend])
+            path = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            int8_path = f"{stem}_int8.onnx"
+            if not os.path.exists(int8_path):
+                _require_packages(backend, INT8_PACKAGES[backend])
+                quantize_onnx(path, int8_path, calibration_images(calibration_dir), imgsz)
+            path = int8_path
+    else:
+        path = f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+        if not os.path.exists(path):
+            _require_packages(backend, EXPORT_PACKAGES[backend] + (INT8_PACKAGES[backend] if int8 else []))
+            path = _export_openvino(weights, imgsz, calibration_dir if int8 else None)
+
+    print(f"Inference backend: {backend}{' INT8' if int8 else ''} ({path})")
+    return YOLO(path, task="segment")
+
+
+def _require_packages(backend, packages):
+    missing = [package for package in packages if importlib.util.find_spec(package) is None]
+    if missing:
+        raise RuntimeError(f"The {backend} inference backend needs {', '.join(missing)}, "
+                           "see requirements-backends.txt")
+
+
+def _export_openvino(weights, imgsz, calibration_dir=None):
+    model = YOLO(weights)
+    if calibration_dir is None:
+        return model.export(format="openvino", imgsz=imgsz, dynamic=True)
+
+    # ultralytics calibrates OpenVINO INT8 exports on the "val" images of a dataset YAML
+    with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+        f.write(f"path: {os.path.abspath(calibration_dir)}\ntrain: .\nval: .\nnames:\n")
+        for class_id, name in sorted(model.names.items()):
+            f.write(f"  {class_id}: {name}\n")
+    try:
+        return model.export(format="openvino", imgsz=imgsz, dynamic=True, int8=True, data=f.name)
+    finally:
+        os.remove(f.name)
+
+# ============================================================
+
+def letterbox(img, imgsz=640):
+    """
+    Resizes and pads a BGR image to (imgsz, imgsz) like the ultralytics preprocessing,
+    returned as a (1, 3, imgsz, imgsz) float32 RGB tensor in [0, 1].
+    """
+    height, width = img.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_height, new_width = round(height * scale), round(width * scale)
+    resized = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, left = (imgsz - new_height) // 2, (imgsz - new_width) // 2
+    padded = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    padded[top:top + new_height, left:left + new_width] = resized
+    return (padded[:, :, ::-1].transpose(2, 0, 1)[None] / 255.0).astype(np.float32)
+
+
+def quantize_onnx(model_path, output_path, image_paths, imgsz=640):
+    """
+    Statically quantizes an ONNX export to INT8 (QDQ, per-channel weights), calibrating
+    the activation ranges on `image_paths`.
+    """
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    input_name = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(image_paths)
+
+        def get_next(self):
+            for path in self._paths:
+                img = cv2.imread(path)
+                if img is not None:
+                    return {input_name: letterbox(img, imgsz)}
+            return None
+
+    quantize_static(model_path, output_path, Reader(), quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True)
+    print(f"INT8 model written to: {output_path}")
+    return output_path
+
+# ============================================================
+
+def compare_backends(images, models, baseline="pytorch", repeat=1):
+    """
+    Accuracy-vs-latency comparison of inference backends against a baseline.
+
+    Every model segments every image (through result_to_class_map, like get_mask). Latency
+    is the mean wall time per image; accuracy is the drift of the class percentages of
+    get_Percentage from the baseline, and the share of pixels labelled like the baseline.
+
+    Parameters
+    ----------
+    images : list of numpy.ndarray
+        BGR captures.
+
+    models : dict
+        Backend label -> loaded model, must include `baseline`.
+
+    baseline : str, optional
+        Label of the reference model, default is "pytorch".
+
+    repeat : int, optional
+        Timed runs per image (after one warm-up run), default is 1.
+
+    Returns
+    -------
+    dict
+        Label -> {"latency_ms", "speedup", "mean_drift", "max_drift", "pixel_agreement",
+        "class_drift": {class name: mean absolute drift}}.
+    """
+    from satellitor_backend.yolov11_model import result_to_class_map
+
+    class_maps = {}
+    latency = {}
+    for label, model in models.items():
+        model.predict(images[0], verbose=False)
+        maps, elapsed = [], 0.0
+        for img in images:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = model.predict(img, verbose=False)[0]
+                elapsed += time.perf_counter() - start
+            maps.append(result_to_class_map(result, img.shape[:2], frame_shape=img.shape[:2]))
+        class_maps[label] = maps
+        latency[label] = elapsed / (len(images) * repeat) * 1000
+
+    names = [class_names[i] for i in sorted(class_names)]
+    report = {}
+    for label in models:
+        drifts = []
+        agreement = []
+        for reference, class_map in zip(class_maps[baseline], class_maps[label]):
+            expected = class_percentages(class_histogram(reference, len(names)), reference.size)
+            actual = class_percentages(class_histogram(class_map, len(names)), class_map.size)
+            drifts.append([abs(actual[name] - expected[name]) for name in names])
+            agreement.append(float((reference == class_map).mean()))
+        drifts = np.array(drifts)
+        report[label] = {
+            "latency_ms": round(latency[label], 1),
+            "speedup": round(latency[baseline] / max(latency[label], 1e-9), 2),
+            "mean_drift": round(float(drifts.mean()), 4),
+            "max_drift": round(float(drifts.max()), 4),
+            "pixel_agreement": round(float(np.mean(agreement)), 4),
+            "class_drift": {name: round(float(value), 4) for name, value in zip(names, drifts.mean(axis=0))},
+        }
+    return report
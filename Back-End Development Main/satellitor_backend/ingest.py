@@ -0,0 +1,130 @@
+import io
+
+import cv2
+import numpy as np
+from flask import Request
+from PIL import Image, UnidentifiedImageError
+
+
+class UploadRequest(Request):
+    """
+    Request class of the app: uploaded files are received into memory instead of the
+    temporary files werkzeug spools uploads larger than 500 KB to. The request size is
+    bounded by the MAX_CONTENT_LENGTH setting.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
+class UploadRejected(ValueError):
+    """An upload that is not an image or exceeds the upload limits, `status` is the HTTP code to answer."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class Frame:
+    """
+    A decoded upload.
+
+    `image` is the BGR frame to run inference on: downscaled so its longer side is the
+    model input size, or at full resolution when it is large enough to be segmented tile
+    by tile. `shape` is the (height, width) of the original image, the size of the class map.
+    """
+
+    __slots__ = ("image", "shape")
+
+    def __init__(self, image, shape):
+        self.image = image
+        self.shape = shape
+
+# ============================================================
+
+def check_upload(data, max_bytes, max_pixels):
+    """
+    Checks an upload against the limits before anything is decoded: its size in bytes, then
+    its dimensions as read from the image header.
+
+    Returns
+    -------
+    tuple
+        (height, width) of the image.
+
+    Raises
+    ------
+    UploadRejected
+        413 if a limit is exceeded, 400 if the data are not an image.
+    """
+    if max_bytes and len(data) > max_bytes:
+        raise UploadRejected(f"Image too large: {len(data)} bytes (limit {max_bytes})", 413)
+    try:
+        # only the header is read, the pixels are decoded by decode_upload
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+    except Image.DecompressionBombError:
+        # refused by PIL before the size is even returned
+        raise UploadRejected(f"Image too large: over {2 * Image.MAX_IMAGE_PIXELS} pixels", 413)
+    except (UnidentifiedImageError, OSError):
+        raise UploadRejected("Could not read image")
+    if max_pixels and width * height > max_pixels:
+        raise UploadRejected(f"Image too large: {width}x{height} pixels (limit {max_pixels})", 413)
+    return height, width
+
+
+def decode_upload(data, model_size=640, tile_threshold=None):
+    """
+    Decodes an upload in memory into a Frame.
+
+    Images that are tiled (longer side above `tile_threshold`) are decoded at full
+    resolution. Others are decoded straight to a reduced size where the format allows it
+    (JPEG decodes 1/2, 1/4 or 1/8 of the size at a fraction of the cost) and downscaled so
+    their longer side is `model_size`, since YOLO would resize them to it anyway.
+
+    Parameters
+    ----------
+    data : bytes
+        The uploaded file.
+
+    model_size : int, optional
+        Inference size of the model, default is 640 (0 keeps the full resolution).
+
+    tile_threshold : int, optional
+        Longer side above which the image is segmented by tiles, None if tiling is disabled.
+
+    Returns
+    -------
+    Frame or None
+        None if the data could not be decoded, or are not in a format PIL identifies (the
+        formats check_upload accepts).
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return None
+    longer = max(height, width)
+
+    if not model_size or longer <= model_size or (tile_threshold and longer > tile_threshold):
+        img = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        return None if img is None else Frame(img, img.shape[:2])
+
+    flag = cv2.IMREAD_COLOR
+    for factor, reduced in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                            (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if longer // factor >= model_size:
+            flag = reduced
+            break
+    img = cv2.imdecode(buffer, flag)
+    if img is None:
+        return None
+
+    # EXIF orientation is applied by imdecode, the header size is not rotated
+    shape = (height, width) if (img.shape[0] >= img.shape[1]) == (height >= width) else (width, height)
+    scale = model_size / max(img.shape[:2])
+    if scale < 1:
+        img = cv2.resize(img, (max(1, round(img.shape[1] * scale)), max(1, round(img.shape[0] * scale))),
+                         interpolation=cv2.INTER_AREA)
+    return Frame(img, shape)
@@ -0,0 +1,309 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class JobQueueFull(Exception):
+    """Raised by JobQueue.submit when `max_pending` jobs are already waiting."""
+
+
+class Job:
+    """
+    One queued pipeline run.
+
+    The function run by the job receives the job as first argument and calls
+    `job.report(stage, values)` as stages complete, so pollers see partial results
+    before the final JSON is ready. `on_change(job)` is called after every change of state.
+    """
+
+    def __init__(self, job_id, on_change=None):
+        self.id = job_id
+        self.status = "queued"
+        self.partial = {}
+        self.stages = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+        self._on_change = on_change
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuilds a Job from its to_dict() state (a job run by another process)."""
+        job = cls(state["job_id"])
+        job.status = state["status"]
+        job.stages = list(state["stages"])
+        job.partial = dict(state.get("partial", {}))
+        job.result = state.get("result")
+        job.error = state.get("error")
+        job.created, job.started, job.finished = state["created"], state["started"], state["finished"]
+        return job
+
+    def report(self, stage, values):
+        """Records the output of a finished stage."""
+        with self._lock:
+            self.partial.update(values)
+            self.stages.append(stage)
+        self.changed()
+
+    def changed(self):
+        if self._on_change is not None:
+            self._on_change(self)
+
+    def to_dict(self):
+        with self._lock:
+            state = {
+                "job_id": self.id,
+                "status": self.status,
+                "stages": list(self.stages),
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+            }
+            if self.status == "done":
+                state["result"] = self.result
+            else:
+                state["partial"] = dict(self.partial)
+            if self.error is not None:
+                state["error"] = self.error
+            return state
+
+
+class JobQueue:
+    """
+    Bounded background worker pool running /process pipelines for the job API.
+
+    `submit` only queues the work and returns a Job, so the HTTP worker is free as soon
+    as the upload is stored. `max_workers` threads run the queued jobs; when `max_pending`
+    jobs are already waiting, submit raises JobQueueFull instead of letting the backlog
+    grow without limit. Finished jobs are kept for `ttl` seconds for polling, then dropped.
+
+    With `path`, the state of every job is also written to a SQLite file at each change,
+    and a job unknown to this process is looked up there: gunicorn workers share the file,
+    so a job can be polled from any worker, whichever one runs it. Every row records the
+    process running the job (its pid and a token telling it from an earlier process that
+    had the same pid): a queued or running job whose process has exited
+    (a worker killed or restarted by gunicorn) is marked failed when it is polled. The
+    file must therefore only be shared by processes of one host.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Number of jobs running at once, default is 2.
+
+    max_pending : int, optional
+        Maximum number of queued (not yet started) jobs, default is 64.
+
+    ttl : float, optional
+        Seconds a finished job stays available, default is 900.
+
+    path : str, optional
+        SQLite file of the shared job states. Default is None (this process only).
+    """
+
+    def __init__(self, max_workers=2, max_pending=64, ttl=900, path=None):
+        self.max_workers = max(1, int(max_workers))
+        self.ttl = ttl
+        self.path = path
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._workers = []
+        self._db = None
+        self._db_pid = None
+
+        self._submitted = 0
+        self._rejected = 0
+        self._failed = 0
+
+    # ------------------------------------------------------------
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queues `fn(job, *args, **kwargs)`, whose return value becomes the job result.
+
+        Returns
+        -------
+        Job
+
+        Raises
+        ------
+        JobQueueFull
+            If `max_pending` jobs are already queued.
+        """
+        self._ensure_workers()
+        self._expire()
+        job = Job(str(uuid.uuid4()), self._save if self.path else None)
+        # stored before it is queued, so it can be polled as soon as its id is returned
+        job.changed()
+        with self._lock:
+            try:
+                self._queue.put_nowait((job, fn, args, kwargs))
+            except queue.Full:
+                self._rejected += 1
+                self._delete(job.id)
+                raise JobQueueFull(f"{self._queue.maxsize} jobs already waiting")
+            self._jobs[job.id] = job
+            self._submitted += 1
+        return job
+
+    def get(self, job_id):
+        """Returns the Job with this id, or None if it is unknown or expired."""
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None and self.path:
+                job = self._load(job_id)
+            return job
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            return {
+                "workers": self.max_workers,
+                "queued": self._queue.qsize(),
+                "running": statuses.count("running"),
+                "kept": len(statuses),
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "failed": self._failed,
+            }
+
+    # ------------------------------------------------------------
+
+    def _ensure_workers(self):
+        # started lazily (and restarted after a fork, where threads do not survive)
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._run, name=f"job-worker-{len(self._workers)}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _run(self):
+        while True:
+            job, fn, args, kwargs = self._queue.get()
+            job.status = "running"
+            job.started = time.time()
+            job.changed()
+            try:
+                result = fn(job, *args, **kwargs)
+                with job._lock:
+                    job.result = result
+                    job.status = "done"
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                with job._lock:
+                    job.error = str(e)
+                    job.status = "failed"
+                with self._lock:
+                    self._failed += 1
+            finally:
+                job.finished = time.time()
+                job.changed()
+
+    def _expire(self):
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished is not None and now - job.finished > self.ttl]
+            for job_id in expired:
+                del self._jobs[job_id]
+            if expired:
+                self._execute("DELETE FROM jobs WHERE finished < ?", (now - self.ttl,))
+
+    # ------------------------------------------------------------
+
+    def _connection(self):
+        # one connection per process, opened lazily so it is never shared across a fork
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            with self._db:
+                self._db.execute("CREATE TABLE IF NOT EXISTS jobs "
+                                 "(id TEXT PRIMARY KEY, finished REAL, state TEXT, owner TEXT)")
+                if "owner" not in [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]:
+                    # file written before the owner was recorded
+                    self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _execute(self, statement, parameters):
+        if not self.path:
+            return
+        try:
+            db = self._connection()
+            with db:
+                db.execute(statement, parameters)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"Job state write failed: {e}")
+
+    def _save(self, job):
+        with self._lock:
+            self._write(job)
+
+    def _write(self, job):
+        # jobs are written by the process running them, or by the one finding them abandoned
+        try:
+            payload = json.dumps(job.to_dict())
+        except (TypeError, ValueError) as e:
+            print(f"Job state write failed: {e}")
+            return
+        self._execute("INSERT OR REPLACE INTO jobs (id, finished, state, owner) VALUES (?, ?, ?, ?)",
+                      (job.id, job.finished, payload, _process_owner()))
+
+    def _delete(self, job_id):
+        self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def _load(self, job_id):
+        try:
+            row = self._connection().execute(
+                "SELECT state, owner FROM jobs WHERE id = ? AND (finished IS NULL OR finished > ?)",
+                (job_id, time.time() - self.ttl),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Job state read failed: {e}")
+            return None
+        if row is None:
+            return None
+
+        job = Job.from_dict(json.loads(row[0]))
+        if job.status in ("queued", "running") and not _owner_alive(row[1]):
+            job.status = "failed"
+            job.error = "The worker running the job exited before it finished"
+            job.finished = time.time()
+            self._write(job)
+        return job
+
+
+_owner = (None, None)
+
+
+def _process_owner():
+    # "<pid>:<token>" of this process, the token is drawn again in a forked child
+    global _owner
+    if _owner[0] != os.getpid():
+        _owner = (os.getpid(), uuid.uuid4().hex[:12])
+    return f"{_owner[0]}:{_owner[1]}"
+
+
+def _owner_alive(owner):
+    if not owner:
+        # written before the owner was recorded
+        return True
+    pid = int(owner.split(":")[0])
+    if pid == os.getpid():
+        # same pid, other token: an earlier process (e.g. before a container restart)
+        return owner == _process_owner()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,295 @@
+import cv2
+import numpy as np
+
+
+# class_colors in BGR
+class_colors = {
+    0: (0, 0, 0),  # background
+    1: (0, 255, 0), # agriculture
+    2: (255, 255, 255),# Barren
+    3: (0, 0, 255),  # Urban
+    4: (255, 0, 0)    # Water
+}
+
+class_names = {
+    0: "Background",
+    1: "Agriculture",
+    2: "Barren",
+    3: "Urban",
+    4: "Water"
+}
+
+# value written for pixels whose color does not belong to any class
+UNLABELED = 255
+
+
+# ============================================================
+
+def _build_color_luts(low=10, high=240):
+    """
+    Builds the lookup tables used to decode a colored mask into class indices.
+
+    Every channel value is first mapped to a state: 0 (below `low`), 1 (above `high`)
+    or 2 (anything in between). The three channel states form a code in [0, 27)
+    which is then mapped to a class index, or UNLABELED if no class has that code.
+    These are the same thresholds used by the original per-pixel loop in get_Percentage.
+    """
+    channel_lut = np.full(256, 2, dtype=np.uint8)
+    channel_lut[:low] = 0
+    channel_lut[high + 1:] = 1
+
+    code_lut = np.full(27, UNLABELED, dtype=np.uint8)
+    for class_idx, color in class_colors.items():
+        b, g, r = (int(channel_lut[c]) for c in color)
+        code_lut[b * 9 + g * 3 + r] = class_idx
+
+    return channel_lut, code_lut
+
+
+_CHANNEL_LUT, _CODE_LUT = _build_color_luts()
+
+# class index -> BGR color, UNLABELED and unknown indices render as background
+_PALETTE = np.zeros((256, 3), dtype=np.uint8)
+for _class_idx, _color in class_colors.items():
+    _PALETTE[_class_idx] = _color
+
+# class index -> gray level of its color (same weights as cv2.COLOR_BGR2GRAY)
+_GRAY_LUT = cv2.cvtColor(_PALETTE.reshape(1, 256, 3), cv2.COLOR_BGR2GRAY).reshape(256)
+
+# ============================================================
+
+def bgr_to_class_index(mask_img):
+    """
+    Decodes a BGR mask painted with `class_colors` into a class index map.
+
+    Parameters
+    ----------
+    mask_img : numpy.ndarray
+        A (H, W, 3) uint8 mask image.
+
+    Returns
+    -------
+    class_map : numpy.ndarray
+        A (H, W) uint8 array holding the class index of every pixel,
+        or UNLABELED for pixels that match no class color.
+    """
+    states = _CHANNEL_LUT[mask_img]
+    code = states[:, :, 0] * 9
+    code += states[:, :, 1] * 3
+    code += states[:, :, 2]
+    return _CODE_LUT[code]
+
+# ============================================================
+
+def colorize(class_map):
+    """
+    Renders a class index map as a BGR image painted with `class_colors`.
+
+    This is only needed when writing the mask PNG, every analysis stage works
+    on the class index map directly.
+
+    Parameters
+    ----------
+    class_map : numpy.ndarray
+        A (H, W) uint8 class index map.
+
+    Returns
+    -------
+    mask_img : numpy.ndarray
+        A (H, W, 3) uint8 BGR image.
+    """
+    return _PALETTE[class_map]
+
+# ============================================================
+
+def to_gray(class_map):
+    """
+    Returns the grayscale image of the colorized class map without building the color image.
+
+    Parameters
+    ----------
+    class_map : numpy.ndarray
+        A (H, W) uint8 class index map.
+
+    Returns
+    -------
+    gray : numpy.ndarray
+        A (H, W) uint8 image, equal to cv2.cvtColor(colorize(class_map), cv2.COLOR_BGR2GRAY).
+    """
+    return cv2.LUT(class_map, _GRAY_LUT)
+
+# ============================================================
+
+def class_boundaries(class_map):
+    """
+    Marks the pixels where the class changes, straight from the class index map.
+
+    A pixel is a boundary pixel when its right or lower neighbour belongs to another class,
+    so every border between two regions is traced exactly once, one pixel wide, whatever
+    the colors of the classes.
+
+    Parameters
+    ----------
+    class_map : numpy.ndarray
+        A (H, W) uint8 class index map.
+
+    Returns
+    -------
+    edges : numpy.ndarray
+        A (H, W) uint8 image, 255 on boundaries and 0 elsewhere.
+    """
+    boundary = np.zeros(class_map.shape, dtype=bool)
+    np.not_equal(class_map[:, :-1], class_map[:, 1:], out=boundary[:, :-1])
+    boundary[:-1] |= class_map[:-1] != class_map[1:]
+    return boundary.view(np.uint8) * np.uint8(255)
+
+# ============================================================
+
+def as_class_map(mask):
+    """
+    Returns `mask` as a class index map.
+
+    Stages accept either the (H, W) uint8 class index map produced by get_mask or,
+    for older callers, a (H, W, 3) BGR mask which is decoded with bgr_to_class_index.
+    """
+    if mask.ndim == 3:
+        return bgr_to_class_index(mask)
+    return mask
+
+# ============================================================
+
+def class_histogram(class_map, n_classes=len(class_colors)):
+    """
+    Counts the pixels of every class in a class index map with a single bincount.
+
+    Parameters
+    ----------
+    class_map : numpy.ndarray
+        A uint8 class index map.
+
+    n_classes : int, optional
+        Number of classes to return counts for, default is the number of entries in `class_colors`.
+
+    Returns
+    -------
+    counts : numpy.ndarray
+        An array of length `n_classes` where counts[i] is the number of pixels of class i.
+        UNLABELED pixels are not counted.
+    """
+    counts = np.bincount(class_map.ravel(), minlength=UNLABELED + 1)
+    return counts[:n_classes]
+
+# ============================================================
+
+def class_percentages(counts, total_pixels):
+    """
+    Converts per-class pixel counts into the `percentage` dict returned by /process.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray
+        Per-class pixel counts as returned by class_histogram.
+
+    total_pixels : int
+        Number of pixels in the mask, including UNLABELED ones.
+
+    Returns
+    -------
+    class_percentage : dict
+        Class name -> fraction of the image (float between 0 and 1, rounded to 3 decimals).
+    """
+    total_pixels = max(int(total_pixels), 1)
+    return {
+        class_names[class_idx]: round(int(counts[class_idx]) / total_pixels, 3)
+        for class_idx in class_names
+    }
+
+# ============================================================
+
+def letterbox_window(mask_shape, frame_shape):
+    """
+    Where a frame lies inside the letterboxed input of the model (and so inside its masks).
+
+    YOLO scales a frame to fit its input and pads the rest: rectangular frames of a batch
+    with mixed shapes are padded to a square. Returns (top, bottom, left, right), rounded
+    like ultralytics.utils.ops.scale_masks.
+    """
+    mask_height, mask_width = mask_shape
+    frame_height, frame_width = frame_shape
+    gain = min(mask_height / frame_height, mask_width / frame_width)
+    pad_height = (mask_height - frame_height * gain) / 2
+    pad_width = (mask_width - frame_width * gain) / 2
+    return (int(round(pad_height - 0.1)), int(round(mask_height - pad_height + 0.1)),
+            int(round(pad_width - 0.1)), int(round(mask_width - pad_width + 0.1)))
+
+
+def rasterize_instances(masks, class_ids, confidences, shape, class_map=None, chunk_size=8, frame_shape=None):
+    """
+    Merges the instance masks of one prediction into a class index map.
+
+    The instances are merged at the resolution of the masks (the model resolution): every
+    pixel takes the class of the most confident instance covering it, and the merged map
+    is upsampled to `shape` once, instead of resizing and painting every instance at full
+    resolution. The merge works on `chunk_size` instances at a time, so memory stays
+    bounded for predictions with hundreds of instances.
+
+    Parameters
+    ----------
+    masks : numpy.ndarray
+        (N, h, w) instance masks, boolean or probabilities (thresholded at 0.5).
+
+    class_ids : numpy.ndarray
+        (N,) class index of every instance. Classes missing from `class_colors` are painted as background.
+
+    confidences : numpy.ndarray
+        (N,) detection confidence of every instance. Ties are won by the later instance.
+
+    shape : tuple
+        (height, width) of the original image.
+
+    class_map : numpy.ndarray, optional
+        A (H, W) uint8 map to paint into, pixels no instance covers are left untouched.
+        A new background map is created if not given.
+
+    chunk_size : int, optional
+        Instances merged per vectorized step, default is 8 (larger chunks fall out of the CPU cache).
+
+    frame_shape : tuple, optional
+        (height, width) of the frame given to the model (Results.orig_shape). The letterbox
+        padding around it is cropped from the masks before they are upsampled. Default is
+        None: the masks cover exactly the frame.
+
+    Returns
+    -------
+    class_map : numpy.ndarray
+        The (H, W) uint8 class index map.
+    """
+    if class_map is None:
+        class_map = np.zeros(shape, dtype=np.uint8)
+    count = len(masks)
+    if count == 0:
+        return class_map
+    if frame_shape is not None:
+        top, bottom, left, right = letterbox_window(masks.shape[1:], frame_shape[:2])
+        masks = masks[:, top:bottom, left:right]
+
+    # rank 1 is the least confident instance, 0 means no instance
+    ranks = np.empty(count, dtype=np.uint16)
+    ranks[np.argsort(confidences, kind="stable")] = np.arange(1, count + 1, dtype=np.uint16)
+    rank_map = np.zeros(masks.shape[1:], dtype=np.uint16)
+    for start in range(0, count, chunk_size):
+        covered = masks[start:start + chunk_size]
+        if covered.dtype != bool:
+            covered = covered > 0.5
+        np.maximum(rank_map, (covered * ranks[start:start + chunk_size, None, None]).max(axis=0), out=rank_map)
+
+    # rank -> class, UNLABELED where no instance is painted
+    rank_classes = np.full(count + 1, UNLABELED, dtype=np.uint8)
+    known = np.isin(class_ids, list(class_colors))
+    rank_classes[ranks] = np.where(known, class_ids, 0)
+    merged = rank_classes[rank_map]
+
+    if merged.shape != tuple(shape[:2]):
+        merged = cv2.resize(merged, (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST)
+    np.copyto(class_map, merged, where=merged != UNLABELED)
+    return class_map
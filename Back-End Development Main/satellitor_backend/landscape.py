@@ -0,0 +1,140 @@
+import cv2
+import numpy as np
+
+from satellitor_backend.landcover import class_names
+
+
+# ============================================================
+
+def class_patches(class_map, classes, connectivity=8, max_pixels=1 << 25):
+    """
+    Labels the patches (connected regions) of several classes with one connected
+    components pass.
+
+    The binary masks of the classes are placed side by side, one column
+    of background apart, so patches of different classes can never touch, and
+    cv2.connectedComponentsWithStats runs once on the combined image. The class of a patch
+    follows from its left column. The combined image (and its int32 labels) is bounded by
+    `max_pixels`: larger maps are labelled in as few groups of classes as fit.
+
+    Parameters
+    ----------
+    class_map : numpy.ndarray
+        A (H, W) uint8 class index map.
+
+    classes : list of int
+        Class indices to label.
+
+    connectivity : int, optional
+        4 or 8, default is 8 (like cv2.connectedComponents).
+
+    max_pixels : int, optional
+        Largest combined image labelled at once, default is 2**25 (7 classes of a 2048x2048 map).
+
+    Returns
+    -------
+    areas : dict
+        Class index -> int array of the pixel areas of its patches.
+    """
+    height, width = class_map.shape
+    areas = {}
+    # BBDT computes the statistics about twice as fast as the default algorithm (it only
+    # supports 8-connectivity, SAUF is used for 4)
+    algorithm = cv2.CCL_BBDT if connectivity == 8 else cv2.CCL_DEFAULT
+
+    group_size = max(1, max_pixels // (height * (width + 1)))
+    for start in range(0, len(classes), group_size):
+        group = classes[start:start + group_size]
+        combined = np.zeros((height, len(group) * (width + 1)), dtype=np.uint8)
+        for i, class_idx in enumerate(group):
+            offset = i * (width + 1)
+            np.equal(class_map, class_idx, out=combined[:, offset:offset + width].view(bool))
+        _, _, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(combined, connectivity, cv2.CV_32S, algorithm)
+
+        # label 0 is the background of the combined image
+        patch_class = stats[1:, cv2.CC_STAT_LEFT] // (width + 1)
+        patch_area = stats[1:, cv2.CC_STAT_AREA]
+        for i, class_idx in enumerate(group):
+            areas[class_idx] = patch_area[patch_class == i]
+    return areas
+
+
+def edge_counts(class_map, n_classes):
+    """
+    Counts, for every class, the pixel sides it shares with a pixel of another class
+    (4-neighbourhood, the image border is not an edge).
+    """
+    counts = np.zeros(n_classes, dtype=np.int64)
+    for a, b in ((class_map[:, :-1], class_map[:, 1:]), (class_map[:-1, :], class_map[1:, :])):
+        differ = a != b
+        counts += np.bincount(a[differ], minlength=256)[:n_classes]
+        counts += np.bincount(b[differ], minlength=256)[:n_classes]
+    return counts
+
+# ============================================================
+
+def landscape_metrics(class_map, n_classes=len(class_names), connectivity=8):
+    """
+    Patch metrics of every land class, computed from the class index map in one labelling pass.
+
+    Parameters
+    ----------
+    class_map : numpy.ndarray
+        The (H, W) uint8 class index map returned by get_mask.
+
+    n_classes : int, optional
+        Number of classes, default is the number of entries in `class_names`.
+
+    connectivity : int, optional
+        4 or 8, default is 8.
+
+    Returns
+    -------
+    metrics : dict
+        Class name -> {
+            "patches": number of patches,
+            "area": pixels of the class,
+            "mean_patch_area": mean patch size in pixels,
+            "patch_size": {"min", "p25", "median", "p75", "max"} patch sizes in pixels,
+            "largest_patch_index": largest patch / image area (0 to 1),
+            "edge_density": class edges (pixel sides) per image pixel,
+        }, background excluded.
+
+    Notes
+    -----
+    - Areas and edges are in pixels, multiply by the ground resolution of the capture to
+      get metric units.
+    - A class missing from the image has zero patches and zero for every metric.
+    """
+    total_pixels = max(int(class_map.size), 1)
+    areas = class_patches(class_map, list(range(1, n_classes)), connectivity)
+    edges = edge_counts(class_map, n_classes)
+
+    metrics = {}
+    for class_idx in range(1, n_classes):
+        patch_areas = areas[class_idx]
+        if len(patch_areas) == 0:
+            metrics[class_names[class_idx]] = {
+                "patches": 0, "area": 0, "mean_patch_area": 0.0,
+                "patch_size": {"min": 0, "p25": 0.0, "median": 0.0, "p75": 0.0, "max": 0},
+                "largest_patch_index": 0.0, "edge_density": 0.0,
+            }
+            continue
+
+        area = int(patch_areas.sum())
+        p25, median, p75 = np.percentile(patch_areas, [25, 50, 75])
+        metrics[class_names[class_idx]] = {
+            "patches": int(len(patch_areas)),
+            "area": area,
+            "mean_patch_area": round(area / len(patch_areas), 3),
+            "patch_size": {
+                "min": int(patch_areas.min()),
+                "p25": round(float(p25), 3),
+                "median": round(float(median), 3),
+                "p75": round(float(p75), 3),
+                "max": int(patch_areas.max()),
+            },
+            "largest_patch_index": round(float(patch_areas.max() / total_pixels), 6),
+            "edge_density": round(float(edges[class_idx] / total_pixels), 6),
+        }
+    return metrics
@@ -0,0 +1,276 @@
+"""
+Local model server: YOLO weights owned by a few dedicated processes, shared by all the
+gunicorn workers of the main backend.
+
+Start it next to gunicorn (from the backend root, same SATELLITOR_* settings):
+    SATELLITOR_MODEL_SERVER_SOCKET=/tmp/satellitor-model.sock python -m satellitor_backend.model_server
+
+With MODEL_SERVER_SOCKET set, the Flask workers do not load best.pt; `model` becomes a
+ModelServerClient. A request copies the decoded frames into a shared-memory segment of the
+client and sends only their layout (a short JSON header) over a Unix socket. A model
+process reads the frames in place, runs YOLO, writes the (H, W) uint8 class maps back into
+the same segment and answers. No frame or mask is pickled or sent through the socket.
+"""
+from multiprocessing import resource_tracker, shared_memory
+from collections import OrderedDict
+import atexit
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+
+HEADER = struct.Struct("!I")
+
+
+def _send(conn, message):
+    payload = json.dumps(message).encode()
+    conn.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("model server connection closed")
+        data += chunk
+    return data
+
+
+def _recv(conn):
+    (size,) = HEADER.unpack(_recv_exact(conn, HEADER.size))
+    return json.loads(_recv_exact(conn, size))
+
+
+def _layout(shapes):
+    """Byte offsets of the frames, then of their class maps, in a segment."""
+    offsets, position = [], 0
+    for height, width, channels in shapes:
+        offsets.append(position)
+        position += height * width * channels
+    mask_offsets = []
+    for height, width, _ in shapes:
+        mask_offsets.append(position)
+        position += height * width
+    return offsets, mask_offsets, position
+
+# ============================================================
+
+class ClassMapResult:
+    """
+    Prediction of one frame made by the model server: the class map is already rasterized.
+    result_to_class_map returns it as is, so it stands in for ultralytics Results.
+    """
+
+    masks = None
+
+    def __init__(self, class_map):
+        self.class_map = class_map
+
+
+class ModelServerClient:
+    """
+    Drop-in replacement of the YOLO model (`predict`) that runs inference on the model server.
+
+    Shared-memory segments are reused across calls: a small pool of free segments is kept
+    per client process, grown when a batch needs more room.
+
+    Parameters
+    ----------
+    socket_path : str
+        Unix socket of the model server (MODEL_SERVER_SOCKET setting).
+
+    timeout : float, optional
+        Seconds to wait for a batch, default is 300.
+
+    max_free_segments : int, optional
+        Free segments kept for reuse, default is 4.
+    """
+
+    def __init__(self, socket_path, timeout=300, max_free_segments=4):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.max_free_segments = max_free_segments
+        self._free = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        atexit.register(self.close)
+
+    def __call__(self, source, **kwargs):
+        return self.predict(source, **kwargs)
+
+    def predict(self, source, **kwargs):
+        """
+        Segments one frame or a list of BGR frames.
+
+        Returns
+        -------
+        list of ClassMapResult
+            One per frame, in input order.
+        """
+        frames = source if isinstance(source, list) else [source]
+        frames = [np.asarray(frame, dtype=np.uint8) for frame in frames]
+        if not frames:
+            return []
+        shapes = [(frame.shape[0], frame.shape[1], frame.shape[2] if frame.ndim == 3 else 1) for frame in frames]
+        offsets, mask_offsets, size = _layout(shapes)
+
+        segment = self._acquire(size)
+        try:
+            for frame, offset, shape in zip(frames, offsets, shapes):
+                np.ndarray(shape, dtype=np.uint8, buffer=segment.buf, offset=offset)[:] = frame.reshape(shape)
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.settimeout(self.timeout)
+                conn.connect(self.socket_path)
+                _send(conn, {"segment": segment.name, "shapes": shapes})
+                reply = _recv(conn)
+            if "error" in reply:
+                raise RuntimeError(f"Model server error: {reply['error']}")
+
+            return [
+                ClassMapResult(np.ndarray(shape[:2], dtype=np.uint8, buffer=segment.buf, offset=offset).copy())
+                for shape, offset in zip(shapes, mask_offsets)
+            ]
+        finally:
+            self._release(segment)
+
+    def close(self):
+        """Frees the pooled segments of this process."""
+        with self._lock:
+            free, self._free = (self._free, []) if self._pid == os.getpid() else ([], self._free)
+        for segment in free:
+            segment.close()
+            segment.unlink()
+
+    # ------------------------------------------------------------
+
+    def _acquire(self, size):
+        with self._lock:
+            if self._pid != os.getpid():
+                # segments of the parent process are not ours after a fork
+                self._free, self._pid = [], os.getpid()
+            for i, segment in enumerate(self._free):
+                if segment.size >= size:
+                    return self._free.pop(i)
+        return shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+    def _release(self, segment):
+        with self._lock:
+            if self._pid == os.getpid() and len(self._free) < self.max_free_segments:
+                self._free.append(segment)
+                return
+        segment.close()
+        segment.unlink()
+
+# ============================================================
+
+def _model_process(listener, index, weights, backend, int8, calibration_dir, threads):
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+        cpus = sorted(os.sched_getaffinity(0))
+        if len(cpus) >= (index + 1) * threads:
+            # each model process gets its own cores, so their thread pools do not compete
+            os.sched_setaffinity(0, cpus[index * threads:(index + 1) * threads])
+
+    from satellitor_backend.inference_backends import load_model
+    from satellitor_backend.yolov11_model import result_to_class_map
+
+    model = load_model(weights, backend, int8, calibration_dir)
+    segments = OrderedDict()
+    print(f"Model process {index} ready (pid {os.getpid()})")
+
+    while True:
+        conn, _ = listener.accept()
+        with conn:
+            try:
+                request = _recv(conn)
+                segment = segments.get(request["segment"])
+                if segment is None:
+                    segment = segments[request["segment"]] = shared_memory.SharedMemory(request["segment"])
+                    # the segment belongs to the client, this process must not unlink it when it exits
+                    resource_tracker.unregister(segment._name, "shared_memory")
+                    # attached segments stay mapped for reuse, the oldest are closed
+                    while len(segments) > 64:
+                        segments.popitem(last=False)[1].close()
+                segments.move_to_end(request["segment"])
+
+                shapes = [tuple(shape) for shape in request["shapes"]]
+                offsets, mask_offsets, _ = _layout(shapes)
+                frames = [np.ndarray(shape, dtype=np.uint8, buffer=segment.buf, offset=offset)
+                          for shape, offset in zip(shapes, offsets)]
+
+                start = time.perf_counter()
+                results = model.predict(frames, verbose=False)
+                for frame, shape, offset, result in zip(frames, shapes, mask_offsets, results):
+                    class_map = np.ndarray(shape[:2], dtype=np.uint8, buffer=segment.buf, offset=offset)
+                    class_map[:] = 0
+                    result_to_class_map(result, shape[:2], class_map, frame_shape=shape[:2])
+                _send(conn, {"ok": True, "inference_ms": round((time.perf_counter() - start) * 1000, 1)})
+            except Exception as e:
+                print(f"Model process {index}: {e}")
+                try:
+                    _send(conn, {"error": str(e)})
+                except OSError:
+                    pass
+
+
+def serve(socket_path, weights, backend="pytorch", int8=False, calibration_dir=None, processes=1, threads=0):
+    """
+    Runs the model server until interrupted.
+
+    All model processes accept connections on the same listening socket, so the kernel
+    hands each request to an idle one. Model processes that die are restarted.
+
+    Parameters
+    ----------
+    socket_path : str
+        Path of the Unix socket to listen on.
+
+    weights, backend, int8, calibration_dir :
+        As in inference_backends.load_model.
+
+    processes : int, optional
+        Number of model processes, default is 1.
+
+    threads : int, optional
+        Intra-op threads (and pinned cores) per model process, default is 0 (PyTorch default, no pinning).
+    """
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(128)
+
+    # forked before any model is loaded, so no PyTorch state crosses the fork
+    context = multiprocessing.get_context("fork")
+    args = (weights, backend, int8, calibration_dir, threads)
+    workers = {}
+    try:
+        while True:
+            for index in range(processes):
+                if index not in workers or not workers[index].is_alive():
+                    workers[index] = context.Process(target=_model_process, args=(listener, index, *args), daemon=True)
+                    workers[index].start()
+            time.sleep(1)
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+if __name__ == '__main__':
+    from satellitor_backend import app, model_path
+
+    if not app.config['MODEL_SERVER_SOCKET']:
+        raise SystemExit("Set SATELLITOR_MODEL_SERVER_SOCKET to the socket path to serve on")
+    serve(app.config['MODEL_SERVER_SOCKET'], model_path, app.config['INFERENCE_BACKEND'],
+          app.config['INFERENCE_INT8'], app.config['INFERENCE_CALIBRATION_DIR'],
+          app.config['MODEL_SERVER_PROCESSES'], app.config['MODEL_SERVER_THREADS'])
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import hashlib
+import threading
+import time
+
+
+class ResultCache:
+    """
+    /process responses keyed by the content of their input, so re-submitted captures are
+    answered without running the pipeline again.
+
+    The key is the SHA-256 of the uploaded bytes together with the coordinates rounded to
+    `decimals` places (4 places is ~11 m). Entries live at most `ttl` seconds and the least
+    recently used ones are evicted beyond `max_entries`. Identical submissions arriving while
+    the first one is still running wait for its result instead of starting their own run.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximum number of cached responses, default is 1024 (0 disables the cache).
+
+    ttl : float, optional
+        Seconds a response stays cached, default is 900. It should not exceed the lifetime of
+        the artifacts the response links to.
+
+    decimals : int, optional
+        Rounding of the coordinates in the key, default is 4.
+    """
+
+    def __init__(self, max_entries=1024, ttl=900, decimals=4):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.decimals = decimals
+        self._entries = OrderedDict()
+        self._running = {}
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._shared = 0
+
+    def key(self, image_data, latitude, longitude, options=None):
+        """`options` (e.g. the output encoding) are part of the key when given."""
+        digest = hashlib.sha256(image_data).hexdigest()
+        key = f"{digest}:{round(latitude, self.decimals)}:{round(longitude, self.decimals)}"
+        if options:
+            key += ":" + ",".join(f"{name}={value}" for name, value in sorted(options.items()))
+        return key
+
+    # ------------------------------------------------------------
+
+    def get_or_compute(self, key, compute, is_valid=None):
+        """
+        Returns (response, hit): the cached response for `key`, or the one of `compute()`.
+
+        Parameters
+        ----------
+        key : str
+            From `key(...)`.
+
+        compute : callable
+            Runs the pipeline and returns its response, only called on a miss.
+
+        is_valid : callable, optional
+            is_valid(response) -> bool, cached responses failing it (e.g. whose artifacts
+            expired) are dropped and recomputed.
+        """
+        if self.max_entries <= 0:
+            return compute(), False
+
+        with self._lock:
+            entry = self._entries.get(key)
+        # validated without the lock, is_valid may look up the artifacts on disk
+        if entry is not None:
+            expires, response = entry
+            if expires > time.time() and (is_valid is None or is_valid(response)):
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        self._entries.move_to_end(key)
+                    self._hits += 1
+                return response, True
+
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current is not entry:
+                # stored by a run that finished in the meantime
+                self._hits += 1
+                return current[1], True
+            if current is not None:
+                del self._entries[key]
+
+            future = self._running.get(key)
+            owner = future is None
+            if owner:
+                future = self._running[key] = Future()
+                self._misses += 1
+            else:
+                self._shared += 1
+
+        if not owner:
+            return future.result(), True
+
+        try:
+            response = compute()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._running.pop(key, None)
+
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        future.set_result(response)
+        return response, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "shared": self._shared,
+            }
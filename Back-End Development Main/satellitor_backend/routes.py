@@ -1,44 +1,236 @@
-from satellitor_backend import app
-from flask import request, jsonify, send_from_directory
-import os
+from satellitor_backend.application import app, scheduler, geo_cache, lookup_pool, suitability_map, job_queue, \
+    artifact_store, result_cache, worker_startup
+from satellitor_backend.artifacts import RESERVED_SUFFIXES
+from satellitor_backend.jobs import JobQueueFull
+from satellitor_backend.ingest import UploadRejected, check_upload, decode_upload
+from flask import request, jsonify, send_file, Response
+from werkzeug.exceptions import RequestEntityTooLarge
+import io
+import queue
 import uuid
-from satellitor_backend.yolov11_model import get_mask, detect_edges, get_land_properties, get_best_crops, \
-    get_Percentage, get_crops, get_fragmentation, get_fertilizer_recommendation, get_soil_data
-import time
-import threading
+from satellitor_backend.yolov11_model import get_mask, get_masks, detect_edges, get_land_properties, get_best_crops, \
+    get_Percentage, get_crops, get_fragmentation, get_landscape_metrics, get_fertilizer_recommendation, get_soil_data, \
+    fetch_site_data
+from satellitor_backend.encoding import MASK_FORMATS, VECTOR_FORMATS, encode_mask, encode_edges, mask_polygons, mask_rle, \
+    boundary_contours
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-INPUTS_FOLDER = os.path.join(BASE_DIR, 'inputs')
-OUTPUTS_FOLDER = os.path.join(BASE_DIR, 'outputs')
-os.makedirs(INPUTS_FOLDER, exist_ok=True)
-os.makedirs(OUTPUTS_FOLDER, exist_ok=True)
+def store_upload(unique_id, data, content_type=None):
+    """Keeps the uploaded file bytes as the "<unique_id>_input.png" artifact."""
+    artifact_store.put(f"{unique_id}_input.png", data, content_type or "image/png")
 
 
+def archive_upload(unique_id, data, content_type=None):
+    """
+    Stores the upload in the background when ARCHIVE_INPUTS is set.
+    Returns the Future of the write (to wait for before answering), None if inputs are not archived.
+    """
+    if not app.config['ARCHIVE_INPUTS']:
+        return None
+    return lookup_pool.submit(store_upload, unique_id, data, content_type)
+
+
+def input_url(unique_id):
+    """The normal_image URL of a capture, None when inputs are not archived."""
+    return f"/download/{unique_id}_input.png" if app.config['ARCHIVE_INPUTS'] else None
+
+
+def artifacts_available(response):
+    """True if every file a cached /process response links to can still be downloaded."""
+    return all(artifact_store.get(response[field].rsplit("/", 1)[-1]) is not None
+               for field in ("normal_image", "mask_image", "boundaries_image") if response[field])
+
+
+def read_upload(file):
+    """Reads an uploaded image and checks it against the UPLOAD_MAX_BYTES and UPLOAD_MAX_PIXELS limits."""
+    data = file.read()
+    check_upload(data, app.config['UPLOAD_MAX_BYTES'], app.config['UPLOAD_MAX_PIXELS'])
+    return data
+
+
+def decode_frame(data):
+    """Decodes uploaded image bytes in memory into an ingest.Frame, None if they are not an image."""
+    tile_threshold = app.config['INFERENCE_TILE_THRESHOLD'] if app.config['INFERENCE_TILE_SIZE'] else None
+    return decode_upload(data, app.config['INFERENCE_IMAGE_SIZE'], tile_threshold)
+
+
+def upload_error(e):
+    """Response to an upload refused by read_upload, or by MAX_CONTENT_LENGTH."""
+    if isinstance(e, RequestEntityTooLarge):
+        return jsonify({"error": "Request too large"}), 413
+    return jsonify({"error": str(e)}), e.status
+
+
+def output_options(form=None):
+    """
+    Mask encoding settings from the app config, overridden by the `mask_format`,
+    `mask_vector`, `mask_compression` and `boundary_vector` form fields when a request
+    form is given.
+    """
+    form = form or {}
+    options = {
+        "mask_format": form.get('mask_format', app.config['MASK_FORMAT']),
+        "mask_vector": form.get('mask_vector', app.config['MASK_VECTOR']) or None,
+        "compression": str(form.get('mask_compression', app.config['MASK_COMPRESSION'])),
+        "simplify": app.config['MASK_SIMPLIFY_TOLERANCE'],
+        "boundary_vector": str(form.get('boundary_vector', app.config['BOUNDARY_VECTOR'])).lower() in ("1", "true"),
+    }
+    if options["mask_format"] not in MASK_FORMATS:
+        raise ValueError(f"mask_format must be one of {list(MASK_FORMATS)}")
+    if options["mask_vector"] is not None and options["mask_vector"] not in VECTOR_FORMATS:
+        raise ValueError(f"mask_vector must be one of {VECTOR_FORMATS}")
+    if options["compression"].strip() not in [str(level) for level in range(10)]:
+        raise ValueError("mask_compression must be an integer from 0 to 9")
+    options["compression"] = int(options["compression"])
+    return options
+
+
+def store_mask(unique_id, class_map, output):
+    """Encodes a class map into the artifact store and returns its download URL."""
+    content_type, extension = MASK_FORMATS[output["mask_format"]]
+    name = f"{unique_id}_mask.{extension}"
+    artifact_store.put(name, encode_mask(class_map, output["mask_format"], output["compression"]), content_type)
+    return f"/download/{name}"
+
+def tiling_options():
+    """Tiled inference settings for get_mask / get_masks, from the app config."""
+    return {
+        "tile_size": app.config['INFERENCE_TILE_SIZE'],
+        "tile_overlap": app.config['INFERENCE_TILE_OVERLAP'],
+        "tile_threshold": app.config['INFERENCE_TILE_THRESHOLD'],
+    }
+
+
+def analyse_capture(unique_id, class_map, latitude, longitude, site=None, report=None, output=None):
+    """
+    Runs every stage after segmentation for one capture and builds its /process response.
+
+    Parameters
+    ----------
+    unique_id : str
+        Id used to name the input, mask and boundaries artifacts of this capture.
+
+    class_map : numpy.ndarray
+        The (H, W) uint8 class index map returned by get_mask.
+
+    latitude, longitude : float
+        Coordinates of the capture.
+
+    site : dict, optional
+        Soil and climate lookups already started with fetch_site_data.
+
+    report : callable, optional
+        Called as report(stage, values) as soon as each stage is done, `values` being the
+        response fields that stage produced (used by the job API for partial results).
+
+    output : dict, optional
+        Mask encoding settings from output_options(), default is the app config.
+
+    Returns
+    -------
+    dict
+        The JSON-serializable analysis of the capture.
+    """
+    response = {"longitude": longitude, "latitude": latitude}
+    output = output or output_options()
+
+    def stage_done(stage, values):
+        response.update(values)
+        if report is not None:
+            report(stage, values)
+
+    #getting edges (boundaries)
+    boundaries_img = detect_edges(class_map,None)
+    artifact_store.put(f"{unique_id}_boundaries.png", encode_edges(boundaries_img, output["compression"]), "image/png")
+    boundaries = {'boundaries_image': f"/download/{unique_id}_boundaries.png"}
+    if output["boundary_vector"]:
+        boundaries["boundary_contours"] = boundary_contours(class_map, output["simplify"])
+    stage_done("boundaries", boundaries)
+
+    if output["mask_vector"] == "polygons":
+        stage_done("vector", {"mask_polygons": mask_polygons(class_map, output["simplify"])})
+    elif output["mask_vector"] == "rle":
+        stage_done("vector", {"mask_rle": mask_rle(class_map)})
+    print("Done3")
+
+    percentage=get_Percentage(class_map,False)
+    stage_done("percentage", {"percentage": percentage})
+    print("Done2")
+
+    landscape = get_landscape_metrics(class_map)
+    _ , NFI =get_fragmentation(img_mask=class_map, metrics=landscape)
+    stage_done("fragmentation", {"normalized_FI": NFI, "landscape": landscape})
+
+    if site is None:
+        site = fetch_site_data(latitude, longitude)
+
+    ph_value, temperature, humidity, annual_mm = get_land_properties(lat=latitude,long=longitude,site=site)
+    stage_done("climate", {"ph": ph_value, "temperature": temperature, "humidity": humidity, "rainfall": annual_mm})
+    print("Done1")
+    best_crops=[]
+    normal_crops=[]
+    if percentage['Water'] <0.95:
+       best_crops=get_best_crops(ph=ph_value,temp=temperature,rainfall=annual_mm)
+       normal_crops=get_crops(ph=ph_value,temp=temperature,rainfall=annual_mm,bestList=best_crops)
+    stage_done("crops", {"normal_crops": normal_crops, "best_crops": best_crops})
+
+    phosphorus,potassium,nitrogen,soil_type,moisture=get_soil_data(latitude,longitude,site)
+    stage_done("soil", {"soil_type": soil_type, "nitrogen": nitrogen, "potassium": potassium,
+                        "moisture": moisture, "phosphorus": phosphorus})
+    fertilizer=get_fertilizer_recommendation(temperature,humidity,moisture,soil_type,nitrogen,phosphorus,potassium)
+    stage_done("fertilizer", {"fertilizer": fertilizer})
+    print("Done16")
+
+    #soil_type = nitrogen = potassium = moisture = phosphorus = fertilizer = None
+
+    response['normal_image'] = input_url(unique_id)
+    response['mask_image'] = f"/download/{unique_id}_mask.{MASK_FORMATS[output['mask_format']][1]}"
+    return response
+
+
+def run_capture(unique_id, image_data, latitude, longitude, report=None, output=None, archive=None):
+    """
+    Segments an uploaded capture and analyses it, the whole /process pipeline.
+    `image_data` are the uploaded file bytes, decoded in memory (see decode_frame).
+    `report` and `output` are passed to analyse_capture, `report` also gets the "mask" stage.
+    `archive` is the Future of archive_upload, waited for before the response is returned.
+    """
+    output = output or output_options()
+    # the remote lookups run while the image is segmented
+    site = fetch_site_data(latitude, longitude)
+
+    frame = decode_frame(image_data)
+    if frame is None:
+        raise ValueError("Could not read image")
+
+    #getting mask
+    class_map = get_mask(frame.image,None, output_shape=frame.shape, **tiling_options())
+    # later stages only use the class map, the decoded frame can be freed
+    del frame
+    mask_url = store_mask(unique_id, class_map, output)
+    if report is not None:
+        report("mask", {'normal_image': input_url(unique_id), 'mask_image': mask_url})
+
+    response = analyse_capture(unique_id, class_map, latitude, longitude, site, report, output)
+    if archive is not None:
+        archive.result()
+    return response
 
-def cleanup_files(folder, max_age_seconds=900):
-    while True:
-        print("Checking to Clean Up Files")
-        now = time.time()
-        for filename in os.listdir(folder):
-            if filename == "img.png":
-                continue
-            file_path = os.path.join(folder, filename)
-            if os.path.isfile(file_path):
-                file_age = now - os.path.getmtime(file_path)
-                if file_age > max_age_seconds:
-                    try:
-                        os.remove(file_path)
-                        print(f"Deleted {file_path} (age: {file_age}s)")
-                    except Exception as e:
-                        print(f"Error deleting {file_path}: {e}")
-        time.sleep(600)
-threading.Thread(target=cleanup_files, args=(INPUTS_FOLDER,), daemon=True).start()
-threading.Thread(target=cleanup_files, args=(OUTPUTS_FOLDER,), daemon=True).start()
 
 @app.route('/')
 def hello():
     return jsonify({"message":"hello, from main"})
 
+@app.route('/ready')
+def ready():
+    """Readiness of this worker: 200 once Earth Engine is initialized and the model warmed up, else 503."""
+    status = worker_startup.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+@app.route('/metrics')
+def metrics():
+    return jsonify({"inference": scheduler.stats(), "geo_cache": geo_cache.stats(), "jobs": job_queue.stats(),
+                    "artifacts": artifact_store.stats(), "results": result_cache.stats()})
+
 @app.route('/process', methods=['POST','GET'])
 def process():
     try:
@@ -53,81 +245,272 @@ def process():
             return jsonify({"error": "No image uploaded"},400)
 
         image = request.files['image']
+        image_data = read_upload(image)
+        output = output_options(data)
 
-        unique_id = str(uuid.uuid4())
-        input_path = os.path.join(INPUTS_FOLDER, f"{unique_id}_input.png")
-        image.save(input_path)
-
-        #getting mask
-        mask_path = os.path.join(OUTPUTS_FOLDER, f"{unique_id}_mask.png")
-        mask_img = get_mask(input_path,mask_path)
-
-        #getting edges (boundaries)
-        boundaries_path = os.path.join(OUTPUTS_FOLDER, f"{unique_id}_boundaries.png")
-        boundaries_img = detect_edges(mask_img,boundaries_path)
-        print("Done3")
-
-        percentage=get_Percentage(mask_img,False)
-        print("Done2")
-
-        ph_value, temperature, humidity, annual_mm = get_land_properties(lat=latitude,long=longitude)
-        print("Done1")
-        best_crops=[]
-        normal_crops=[]
-        if percentage['Water'] <0.95:
-           best_crops=get_best_crops(ph=ph_value,temp=temperature,rainfall=annual_mm)
-           normal_crops=get_crops(ph=ph_value,temp=temperature,rainfall=annual_mm,bestList=best_crops)
-
-        _ , NFI =get_fragmentation(img_mask=mask_img)
-
-        phosphorus,potassium,nitrogen,soil_type,moisture=get_soil_data(latitude,longitude)
-        fertilizer=get_fertilizer_recommendation(temperature,humidity,moisture,soil_type,nitrogen,phosphorus,potassium)
-        print("Done16")
-
-        #soil_type = nitrogen = potassium = moisture = phosphorus = fertilizer = None
-
-        return jsonify({
-            "longitude": longitude,
-            "latitude": latitude,
-            "percentage":percentage,
-            "ph": ph_value,
-            "temperature": temperature,
-            "humidity": humidity,
-            "rainfall": annual_mm,
-            "soil_type": soil_type,
-            "nitrogen": nitrogen,
-            "potassium": potassium,
-            "moisture": moisture,
-            "phosphorus": phosphorus,
-            "fertilizer": fertilizer,
-            "normal_crops": normal_crops,
-            "best_crops": best_crops,
-            "normalized_FI": NFI,
-
-
-
-            'normal_image':f"/download/{unique_id}_input.png",
-            'mask_image': f"/download/{unique_id}_mask.png",
-            'boundaries_image': f"/download/{unique_id}_boundaries.png"
-        })
+        def compute():
+            unique_id = str(uuid.uuid4())
+            archive = archive_upload(unique_id, image_data, image.mimetype)
+            return run_capture(unique_id, image_data, latitude, longitude, output=output, archive=archive)
+
+        # the same capture at the same place gets the response (and files) of its first run
+        key = result_cache.key(image_data, latitude, longitude, output)
+        response, hit = result_cache.get_or_compute(key, compute, artifacts_available)
+
+        response = jsonify(response)
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
+        return response
 
+    except (UploadRejected, RequestEntityTooLarge) as e:
+        return upload_error(e)
     except Exception as e:
         return jsonify({"error": "Something went wrong","details" : str(e)},400)
 
 
-@app.route("/download/<filename>", methods=['GET'])
-def download(filename):
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Job mode of /process: same form fields, but the upload is only stored and queued.
+
+    Returns 202 with {"job_id", "status_url"} right away; the pipeline runs on the job
+    worker pool and its progress is read from /jobs/<job_id>. Returns 503 when the job
+    queue is full.
+    """
     try:
-        path = os.path.join(OUTPUTS_FOLDER, filename)
-        if not os.path.exists(path):
-            path = os.path.join(INPUTS_FOLDER, filename)
-            if not os.path.exists(path):
-                return jsonify({"error": "File not found"},404)
-            return send_from_directory(INPUTS_FOLDER, filename)
+        latitude = request.form.get('latitude', type=float)
+        longitude = request.form.get('longitude', type=float)
+        if longitude is None or latitude is None:
+            return jsonify({"error": "No Longitude or Latitude uploaded"}), 400
+        if "image" not in request.files:
+            return jsonify({"error": "No image uploaded"}), 400
 
-        return send_from_directory(OUTPUTS_FOLDER, filename)
+        unique_id = str(uuid.uuid4())
+        image = request.files['image']
+        image_data = read_upload(image)
+
+        output = output_options(request.form)
+        archive = archive_upload(unique_id, image_data, image.mimetype)
+        job = job_queue.submit(lambda job: run_capture(unique_id, image_data, latitude, longitude, job.report, output,
+                                                       archive))
+        return jsonify({"job_id": job.id, "status_url": f"/jobs/{job.id}"}), 202
+
+    except (UploadRejected, RequestEntityTooLarge) as e:
+        return upload_error(e)
+    except JobQueueFull as e:
+        return jsonify({"error": "Too many queued jobs, retry later", "details": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": "Something went wrong","details" : str(e)}), 400
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Status of a job: "queued", "running", "done" or "failed", the stages finished so far
+    with their fields in "partial", and the /process response in "result" once done.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+def sse_event(event, data):
+    """Formats one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+
+@app.route('/process_stream', methods=['POST'])
+def process_stream():
+    """
+    Streaming variant of /process: same form fields, answered with server-sent events.
+
+    Events, in order: "job" (the id, the run can also be polled on /jobs/<job_id>), then
+    one event per stage as it completes with the response fields it produced: "mask"
+    (image URLs), "boundaries", "percentage", "fragmentation", "climate", "crops", "soil",
+    "fertilizer". The stream ends with "done" carrying the full /process response, or
+    "error". The pipeline runs on the job worker pool, 503 if it is full.
+    """
+    try:
+        latitude = request.form.get('latitude', type=float)
+        longitude = request.form.get('longitude', type=float)
+        if longitude is None or latitude is None:
+            return jsonify({"error": "No Longitude or Latitude uploaded"}), 400
+        if "image" not in request.files:
+            return jsonify({"error": "No image uploaded"}), 400
+
+        unique_id = str(uuid.uuid4())
+        image = request.files['image']
+        image_data = read_upload(image)
+
+        output = output_options(request.form)
+        archive = archive_upload(unique_id, image_data, image.mimetype)
+        events = queue.Queue()
+
+        def run(job):
+            def report(stage, values):
+                job.report(stage, values)
+                events.put((stage, values))
+            try:
+                result = run_capture(unique_id, image_data, latitude, longitude, report, output, archive)
+            except Exception as e:
+                events.put(("error", {"error": "Something went wrong", "details": str(e)}))
+                raise
+            events.put(("done", result))
+            return result
+
+        job = job_queue.submit(run)
+
+    except (UploadRejected, RequestEntityTooLarge) as e:
+        return upload_error(e)
+    except JobQueueFull as e:
+        return jsonify({"error": "Too many queued jobs, retry later", "details": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": "Something went wrong","details" : str(e)}), 400
+
+    def stream():
+        yield sse_event("job", {"job_id": job.id, "status_url": f"/jobs/{job.id}"})
+        while True:
+            try:
+                event, data = events.get(timeout=15)
+            except queue.Empty:
+                # keeps proxies from closing the connection while the job is queued
+                yield ": keep-alive\n\n"
+                continue
+            yield sse_event(event, data)
+            if event in ("done", "error"):
+                return
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
+@app.route('/process_batch', methods=['POST'])
+def process_batch():
+    """
+    Analyses several captures with batched YOLO inference.
+
+    Form fields: one or more `images` files, and either one `latitude`/`longitude`
+    pair shared by all images or one pair per image (in upload order).
+    Frames go through the shared inference scheduler, batched across requests up to the
+    INFERENCE_BATCH_SIZE setting.
+    Returns {"results": [...]} with one /process-style entry per image.
+    """
+    try:
+        images = request.files.getlist('images')
+        if not images:
+            return jsonify({"error": "No images uploaded"}), 400
+
+        latitudes = [float(v) for v in request.form.getlist('latitude')]
+        longitudes = [float(v) for v in request.form.getlist('longitude')]
+        if len(latitudes) == 1 and len(longitudes) == 1:
+            latitudes = latitudes * len(images)
+            longitudes = longitudes * len(images)
+        if len(latitudes) != len(images) or len(longitudes) != len(images):
+            return jsonify({"error": "Expected one Longitude and Latitude, or one pair per image"}), 400
+
+        output = output_options(request.form)
+
+        unique_ids = [str(uuid.uuid4()) for _ in images]
+        image_data = [read_upload(image) for image in images]
+        archives = [archive_upload(unique_id, data, image.mimetype)
+                    for unique_id, image, data in zip(unique_ids, images, image_data)]
+
+        sites = [fetch_site_data(latitude, longitude) for latitude, longitude in zip(latitudes, longitudes)]
+
+        def batched_class_maps():
+            # only one batch of uploads is decoded at a time
+            batch_size = scheduler.max_batch_size
+            for start in range(0, len(image_data), batch_size):
+                frames = [decode_frame(data) for data in image_data[start:start + batch_size]]
+                yield from get_masks([frame and frame.image for frame in frames], [None] * len(frames),
+                                     batch_size=batch_size, output_shapes=[frame and frame.shape for frame in frames],
+                                     **tiling_options())
+
+        results = []
+        for unique_id, latitude, longitude, site, class_map in zip(unique_ids, latitudes, longitudes, sites,
+                                                                   batched_class_maps()):
+            if class_map is None:
+                results.append({"longitude": longitude, "latitude": latitude, "error": "Could not read image"})
+                continue
+            try:
+                store_mask(unique_id, class_map, output)
+                results.append(analyse_capture(unique_id, class_map, latitude, longitude, site, output=output))
+            except Exception as e:
+                results.append({"longitude": longitude, "latitude": latitude,
+                                "error": "Something went wrong", "details": str(e)})
+
+        for archive in archives:
+            if archive is not None:
+                archive.result()
+        return jsonify({"results": results})
+
+    except (UploadRejected, RequestEntityTooLarge) as e:
+        return upload_error(e)
+    except Exception as e:
+        return jsonify({"error": "Something went wrong","details" : str(e)}), 400
+
+
+@app.route('/suitability', methods=['GET'])
+def suitability():
+    """
+    Reads the precomputed crop-suitability map.
+
+    Query parameters: either `latitude` and `longitude` for the classification of every
+    crop at a point, or `bbox=min_lon,min_lat,max_lon,max_lat` for the share of cells
+    where each crop is best / normal.
+    """
+    try:
+        bbox = request.args.get('bbox')
+        if bbox:
+            min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(','))
+            return jsonify(suitability_map.bbox(min_lon, min_lat, max_lon, max_lat))
+
+        latitude = request.args.get('latitude', type=float)
+        longitude = request.args.get('longitude', type=float)
+        if latitude is None or longitude is None:
+            return jsonify({"error": "Expected latitude and longitude, or bbox"}), 400
+        crops = suitability_map.point(latitude, longitude)
+        if crops is None:
+            return jsonify({"error": "Location outside the suitability map"}), 404
+        return jsonify({"latitude": latitude, "longitude": longitude, "crops": crops})
+
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": "Something went wrong","details" : str(e)}), 400
+
+
+@app.route("/download/<filename>", methods=['GET'])
+def download(filename):
+    """
+    Serves an artifact. Artifact names are unique and their content never changes, so
+    responses are cacheable as immutable, carry a strong ETag, and If-None-Match /
+    Range requests get 304 / 206 answers. Files of the disk store go out through the
+    server's file wrapper (sendfile), in-memory ones without copying their bytes.
+    """
+    try:
+        artifact = None if filename.endswith(RESERVED_SUFFIXES) else artifact_store.get(filename)
+        if artifact is None:
+            return jsonify({"error": "File not found"}), 404
+
+        options = {
+            "mimetype": artifact.content_type,
+            "conditional": True,
+            "etag": artifact.etag if artifact.etag is not None else True,
+            "last_modified": artifact.created,
+            "max_age": artifact_store.ttl,
+        }
+        if artifact.path is not None:
+            try:
+                response = send_file(artifact.path, **options)
+            except FileNotFoundError:
+                # expired and removed by another worker since the lookup
+                return jsonify({"error": "File not found"}), 404
+        else:
+            response = send_file(io.BytesIO(artifact.data), download_name=filename, **options)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
 
     except Exception as e:
-        return jsonify({"error": "Error fetching the file","details" : str(e)},400)
+        return jsonify({"error": "Error fetching the file","details" : str(e)}), 400
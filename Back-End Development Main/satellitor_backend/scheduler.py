@@ -0,0 +1,148 @@
+from collections import defaultdict
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+
+class InferenceScheduler:
+    """
+    Micro-batching front for a YOLO model shared by concurrent requests.
+
+    Frames submitted from any thread are queued. A single worker thread takes the first
+    queued frame, keeps collecting frames for up to `batch_window_ms` (or until
+    `max_batch_size` frames are waiting), runs one `model.predict` on the whole batch and
+    hands every caller the Results of its own frame.
+
+    `predict` mirrors `model.predict`, so the scheduler can be passed wherever a model is
+    expected (e.g. get_mask(..., model=scheduler)). Since only the worker thread touches the
+    model, callers no longer need to worry about the model not being thread-safe.
+
+    Parameters
+    ----------
+    model : ultralytics.YOLO
+        The segmentation model to run.
+
+    max_batch_size : int, optional
+        Maximum number of frames per forward pass, default is 8.
+
+    batch_window_ms : float, optional
+        How long the worker waits for more frames after the first one arrives, default is 10 ms.
+    """
+
+    def __init__(self, model, max_batch_size=8, batch_window_ms=10):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.batch_window = max(0.0, float(batch_window_ms)) / 1000
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        self._batches = 0
+        self._frames = 0
+        self._errors = 0
+        self._last_batch_size = 0
+        self._max_queue_depth = 0
+        self._batch_sizes = defaultdict(int)
+        self._queue_wait = 0.0
+        self._inference_time = 0.0
+
+    # ------------------------------------------------------------
+
+    def submit(self, img):
+        """
+        Queues one frame for inference.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Resolves to the ultralytics Results of this frame.
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((img, future, time.perf_counter()))
+
+        depth = self._queue.qsize()
+        with self._lock:
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def predict(self, source, timeout=None):
+        """
+        Runs inference on one frame or a list of frames through the batching queue.
+
+        Returns
+        -------
+        list of ultralytics.engine.results.Results
+            One Results per frame, in input order, like `model.predict`.
+        """
+        frames = source if isinstance(source, list) else [source]
+        futures = [self.submit(img) for img in frames]
+        return [future.result(timeout) for future in futures]
+
+    def stats(self):
+        """
+        Returns the scheduler metrics (queue depth, batch sizes and timings) as a dict.
+        """
+        with self._lock:
+            batches = max(self._batches, 1)
+            frames = max(self._frames, 1)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "frames": self._frames,
+                "errors": self._errors,
+                "last_batch_size": self._last_batch_size,
+                "mean_batch_size": round(self._frames / batches, 2),
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "mean_queue_wait_ms": round(self._queue_wait / frames * 1000, 2),
+                "mean_batch_inference_ms": round(self._inference_time / batches * 1000, 2),
+                "max_batch_size": self.max_batch_size,
+                "batch_window_ms": self.batch_window * 1000,
+            }
+
+    # ------------------------------------------------------------
+
+    def _ensure_worker(self):
+        # the worker is started lazily, so a scheduler created before a fork
+        # gets its own worker in every child process
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.perf_counter(), 0)))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        start = time.perf_counter()
+        try:
+            results = self.model.predict([img for img, _, _ in batch])
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - start
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+        with self._lock:
+            self._batches += 1
+            self._frames += len(batch)
+            self._last_batch_size = len(batch)
+            self._batch_sizes[len(batch)] += 1
+            self._queue_wait += sum(start - queued_at for _, _, queued_at in batch)
+            self._inference_time += elapsed
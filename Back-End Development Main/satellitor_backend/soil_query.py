@@ -0,0 +1,173 @@
+import ee
+import requests
+
+
+# Every Earth Engine dataset used by /process, as a function building its bands.
+# Bands are renamed "<source>_<band>" so they can all be stacked into one image.
+
+PH_BANDS = ["b0", "b10", "b30", "b60", "b100"]
+MONTHLY_BANDS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+ISDA_DEPTHS = ["mean_0_20", "mean_20_50"]
+SMAP_BANDS = ["soil_moisture_am", "soil_moisture_pm"]
+
+
+def _ph_image():
+    return ee.Image("OpenLandMap/SOL/SOL_PH-H2O_USDA-4C1A2A_M/v02") \
+        .select(PH_BANDS, [f"ph_{band}" for band in PH_BANDS])
+
+
+def _precipitation_image():
+    return ee.Image("OpenLandMap/CLM/CLM_PRECIPITATION_SM2RAIN_M/v01") \
+        .select(MONTHLY_BANDS) \
+        .reduce(ee.Reducer.sum()) \
+        .rename("precipitation_sum")
+
+
+def _isda_image(asset, source):
+    return ee.Image(f"ISDASOIL/Africa/v1/{asset}") \
+        .select(ISDA_DEPTHS, [f"{source}_{band}" for band in ISDA_DEPTHS])
+
+
+def _texture_image():
+    return ee.Image("ISDASOIL/Africa/v1/texture_class").select(["texture_0_20"])
+
+
+def _moisture_image(start_date='2022-07-01', end_date='2022-07-10'):
+    # SPL3SMP_E/005 - Soil Moisture (AM/PM), same window as get_moisture_levels
+    return ee.ImageCollection("NASA/SMAP/SPL3SMP_E/005") \
+        .filterDate(start_date, end_date) \
+        .select(SMAP_BANDS) \
+        .mean() \
+        .select(SMAP_BANDS, [f"moisture_{band}" for band in SMAP_BANDS])
+
+
+# names of the bands each source contributes to the stacked image, in band order
+SOURCE_BANDS = {
+    "ph": [f"ph_{band}" for band in PH_BANDS],
+    "precipitation": ["precipitation_sum"],
+    "phosphorus": [f"phosphorus_{band}" for band in ISDA_DEPTHS],
+    "potassium": [f"potassium_{band}" for band in ISDA_DEPTHS],
+    "nitrogen": [f"nitrogen_{band}" for band in ISDA_DEPTHS],
+    "texture": ["texture_0_20"],
+    "moisture": [f"moisture_{band}" for band in SMAP_BANDS],
+}
+
+SOURCE_IMAGES = {
+    "ph": _ph_image,
+    "precipitation": _precipitation_image,
+    "phosphorus": lambda: _isda_image("phosphorus_extractable", "phosphorus"),
+    "potassium": lambda: _isda_image("potassium_extractable", "potassium"),
+    "nitrogen": lambda: _isda_image("nitrogen_total", "nitrogen"),
+    "texture": _texture_image,
+    "moisture": _moisture_image,
+}
+
+# ============================================================
+
+def texture_name(texture_val):
+    """
+    Maps an iSDA USDA texture class (1-12) to "Clayey", "Loamy" or "Sandy", or None.
+    """
+    if texture_val is None:
+        return None
+    if 1 <= texture_val <= 3:
+        return "Clayey"
+    elif 4 <= texture_val <= 8 or texture_val == 10:
+        return "Loamy"
+    elif 11 <= texture_val <= 12 or texture_val == 9:
+        return "Sandy"
+    return None
+
+
+def _depth_mean(values, source):
+    top, sub = (values.get(f"{source}_{band}") for band in ISDA_DEPTHS)
+    if top is None or sub is None:
+        return None
+    return (top + sub) / 2
+
+
+def _ph(values):
+    bands = [values.get(f"ph_{band}") for band in PH_BANDS]
+    bands = [value for value in bands if value is not None]
+    if not bands:
+        return None
+    return sum(bands) / (len(bands) * 10)
+
+
+def _moisture(values):
+    am, pm = (values.get(f"moisture_{band}") for band in SMAP_BANDS)
+    if am is None or pm is None:
+        return None
+    return 100 * (am + pm) / 2
+
+
+# decoders turning the sampled band dict into the same values as the per-source getters
+DECODERS = {
+    "ph": _ph,
+    "precipitation": lambda values: values.get("precipitation_sum"),
+    "phosphorus": lambda values: _depth_mean(values, "phosphorus"),
+    "potassium": lambda values: _depth_mean(values, "potassium"),
+    "nitrogen": lambda values: _depth_mean(values, "nitrogen"),
+    "texture": lambda values: texture_name(values.get("texture_0_20")),
+    "moisture": _moisture,
+}
+
+# ============================================================
+
+def query_soil_climate(lat, long, sources=tuple(SOURCE_IMAGES)):
+    """
+    Samples all the requested Earth Engine datasets at a point with a single request.
+
+    The bands of every source are stacked into one multi-band image server-side and read with
+    one reduceRegion(first) call, then decoded locally. This replaces the dozen separate
+    sample()/getInfo() round trips of get_ph_level, get_annual_precipitation and the
+    get_*_levels functions, and returns the same values.
+
+    Parameters
+    ----------
+    lat : float
+        Latitude of the target location.
+
+    long : float
+        Longitude of the target location.
+
+    sources : iterable of str, optional
+        Which of "ph", "precipitation", "phosphorus", "potassium", "nitrogen", "texture"
+        and "moisture" to query, default is all of them.
+
+    Returns
+    -------
+    dict
+        Source name -> decoded value, None where the dataset has no data at this point.
+
+    Notes
+    -----
+    - Masked pixels come back as None for their own bands only, unlike sample() which drops
+      the whole point as soon as one band is masked (e.g. iSDA outside Africa).
+    - Sampling at 30 m picks the native pixel containing the point for the coarser datasets.
+    """
+    sources = list(sources)
+    point = ee.Geometry.Point([long, lat])
+    image = ee.Image.cat([SOURCE_IMAGES[source]() for source in sources])
+
+    values = image.reduceRegion(reducer=ee.Reducer.first(), geometry=point, scale=30).getInfo() or {}
+
+    return {source: DECODERS[source](values) for source in sources}
+
+# ============================================================
+
+def query_climate(lat, long):
+    """
+    Annual average temperature (°C) and relative humidity (%) from the NASA POWER climatology endpoint.
+
+    Returns
+    -------
+    list
+        [temperature, humidity]
+    """
+    nasa_api = f"https://power.larc.nasa.gov/api/temporal/climatology/point?parameters=T2M,RH2M&latitude={lat}&longitude={long}&format=JSON&community=ag"
+    climate_data = requests.get(nasa_api, timeout=60).json()
+
+    temperature = climate_data["properties"]["parameter"]["T2M"]["ANN"]
+    humidity = climate_data["properties"]["parameter"]["RH2M"]["ANN"]
+    return [temperature, humidity]
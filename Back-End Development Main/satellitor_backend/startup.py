@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+import traceback
+
+
+class Startup:
+    """
+    Per-process startup steps that must not run in a gunicorn master before forking.
+
+    Heavy, fork-safe resources (YOLO weights, crops.json, the fertilizer pickle) are loaded
+    when the app is built (satellitor_backend.application), so with `preload_app` they are
+    loaded once in the master and shared copy-on-write by the workers. What is not
+    fork-safe or belongs to a worker (the Earth Engine session, a warm-up inference that
+    starts the PyTorch thread pools) is registered here with `add_step` and run once per
+    process, in a background thread started by `start()`. /ready reports 200 only when
+    every step succeeded.
+    """
+
+    def __init__(self):
+        self._steps = []
+        self._status = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._started = None
+        self._finished = None
+
+    def add_step(self, name, fn):
+        """Registers fn() to run, in registration order, when a process starts."""
+        self._steps.append((name, fn))
+
+    def start(self):
+        """Runs the steps in a background thread, once per process (safe to call on every request)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._status = {name: "pending" for name, _ in self._steps}
+            self._started = time.time()
+            self._finished = None
+            threading.Thread(target=self._run, name="startup", daemon=True).start()
+
+    def run_now(self, *names):
+        """
+        Runs the named steps in the calling thread, for command-line tools that use the app
+        without serving requests. Unlike start(), a failing step raises.
+        """
+        for name, fn in self._steps:
+            if name in names:
+                fn()
+
+    def ready(self):
+        return self._pid == os.getpid() and all(status == "ok" for status in self._status.values())
+
+    def status(self):
+        with self._lock:
+            return {
+                "ready": self.ready(),
+                "pid": os.getpid(),
+                "steps": dict(self._status),
+                "startup_seconds": round(self._finished - self._started, 3) if self._finished else None,
+            }
+
+    # ------------------------------------------------------------
+
+    def _run(self):
+        for name, fn in self._steps:
+            self._status[name] = "running"
+            start = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                traceback.print_exc()
+                self._status[name] = f"error: {e}"
+                continue
+            self._status[name] = "ok"
+            print(f"Startup step {name} done in {time.perf_counter() - start:.2f}s (pid {os.getpid()})")
+        self._finished = time.time()
+
+# ============================================================
+
+def init_earth_engine(service_account, key_file):
+    """Initializes Earth Engine with the service account email and its credentials file."""
+    import ee
+    credentials = ee.ServiceAccountCredentials(service_account, key_file)
+    ee.Initialize(credentials)
+
+
+def warm_up(model, size=640):
+    """
+    Runs one inference on a blank frame, so the first request does not pay for the lazy
+    initialization of the inference runtime (thread pools, kernels, memory arenas).
+    """
+    import numpy as np
+    model.predict(np.zeros((size, size, 3), dtype=np.uint8))
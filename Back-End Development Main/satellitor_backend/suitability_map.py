@@ -0,0 +1,474 @@
+"""
+Precomputed crop-suitability map of a region.
+
+Build the tiles once with the configured SOIL_DATA_SOURCE, from the backend root:
+    python -m satellitor_backend.suitability_map MIN_LON MIN_LAT MAX_LON MAX_LAT [--resolution 0.01] [--tile-size 256]
+
+The region is split into a regular lat/lon grid. Every cell gets a climate, pH and
+precipitation value, all crops of crops.json are scored with CropTable, and the scores
+are written as uint8 GeoTIFF tiles (one band per crop) next to an index.json. The
+/suitability endpoint then answers point and bounding box queries from those tiles.
+
+With Earth Engine as data source the session is opened before sampling, remote values are
+fetched once per cell of each dataset's native grid through the geo cache (a 0.5° NASA
+POWER cell covers 2500 map cells at 0.01°), and the build stops without an index.json if
+the lookups of most cells of a tile fail.
+
+Rebuilding a map that is being served is safe: tiles and index.json are written to
+temporary files and moved into place, so a server never maps a half-written tile, and
+SuitabilityMap reloads the index (and reopens the tiles) when index.json changes.
+"""
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import threading
+
+import numpy as np
+
+from satellitor_backend.crop_suitability import CONDITIONS
+from satellitor_backend.geo_cache import GeoCache
+from satellitor_backend.geotiff import GeoTiff, write_geotiff
+
+logger = logging.getLogger(__name__)
+
+# Score of a crop in a cell: bit n (n = 0, 1, 2 for temp, ph, rainfall) is set when the
+# condition is in the optimal range, bit n + 3 when it is in the tolerated range.
+# NODATA marks cells where the soil/climate lookup failed.
+OPTIMAL_BITS = {condition: 1 << n for n, condition in enumerate(CONDITIONS)}
+TOLERATED_BITS = {condition: 1 << (n + 3) for n, condition in enumerate(CONDITIONS)}
+NODATA = 255
+
+MAP_SOURCES = ["climate", "ph", "precipitation"]
+# remote lookups of a cell: NASA POWER for the climate, one composite Earth Engine query for the soil
+MAP_QUERIES = [["climate"], ["ph", "precipitation"]]
+
+
+def suitability_scores(table, ph, temp, rainfall):
+    """
+    Scores every crop at many locations.
+
+    Parameters
+    ----------
+    table : CropTable
+        The compiled crop catalog.
+
+    ph, temp, rainfall : array-like
+        Values of the locations, ph -1 when unknown, NaN where the lookup failed.
+
+    Returns
+    -------
+    numpy.ndarray
+        (locations, crops) uint8 scores, see OPTIMAL_BITS / TOLERATED_BITS.
+    """
+    optimal = table.conditions(ph, temp, rainfall, table.optimal)
+    tolerated = table.conditions(ph, temp, rainfall, table.tolerated)
+    scores = np.zeros(optimal["temp"].shape, dtype=np.uint8)
+    for condition in CONDITIONS:
+        scores |= optimal[condition] * np.uint8(OPTIMAL_BITS[condition])
+        scores |= tolerated[condition] * np.uint8(TOLERATED_BITS[condition])
+
+    missing = np.isnan(np.asarray(temp, dtype=float)) & np.isnan(np.asarray(rainfall, dtype=float))
+    scores[missing.reshape(-1)] = NODATA
+    return scores
+
+
+def decode_score(score):
+    """
+    Turns a score back into the get_best_crops / get_crops classification.
+
+    Returns
+    -------
+    dict or None
+        {"suitability": "best" | "normal" | None, "isTemp", "isPh", "isRainfall"}, the flags
+        of the optimal ranges for best crops and of the tolerated ranges otherwise.
+        None for NODATA.
+    """
+    score = int(score)
+    if score == NODATA:
+        return None
+    optimal = {condition: bool(score & bit) for condition, bit in OPTIMAL_BITS.items()}
+    tolerated = {condition: bool(score & bit) for condition, bit in TOLERATED_BITS.items()}
+    if sum(optimal.values()) >= 2:
+        suitability, flags = "best", optimal
+    else:
+        suitability = "normal" if sum(tolerated.values()) >= 2 else None
+        flags = tolerated
+    return {
+        "suitability": suitability,
+        "isTemp": flags["temp"],
+        "isPh": flags["ph"],
+        "isRainfall": flags["rainfall"],
+    }
+
+# ============================================================
+
+def _sample_cell(data_source, lat, long):
+    try:
+        values = data_source.sample(lat, long, MAP_SOURCES)
+        temperature = values["climate"][0]
+        ph, rainfall = values["ph"], values["precipitation"]
+    except Exception as e:
+        logger.warning("no data at (%s, %s): %s", lat, long, e)
+        return math.nan, math.nan, math.nan
+    return (
+        -1 if ph is None else ph,
+        math.nan if temperature is None else temperature,
+        math.nan if rainfall is None else rainfall,
+    )
+
+
+class SuitabilityBuildError(RuntimeError):
+    """Raised by build_suitability_tiles when too many cells could not be sampled."""
+
+
+def _lookup(data_source, geo_cache, sources, lat, long):
+    # cached values of `sources` at (lat, long), the missing ones fetched with one query
+    values, missing = {}, []
+    for source in sources:
+        found, value = geo_cache.lookup(source, lat, long)
+        if found:
+            values[source] = value
+        else:
+            missing.append(source)
+    if missing:
+        try:
+            fetched = data_source.sample(lat, long, missing)
+        except Exception as e:
+            logger.warning("no %s data at (%s, %s): %s", ", ".join(missing), lat, long, e)
+            return None
+        for source in missing:
+            geo_cache.put(source, lat, long, fetched[source])
+            values[source] = fetched[source]
+    return values
+
+
+def sample_points(data_source, points, geo_cache=None, executor=None):
+    """
+    Samples the climate, pH and precipitation of many locations.
+
+    A local data source is read point by point. A remote one is queried once per cell of
+    the native grid of its datasets (see geo_cache.GEO_SOURCES): the points are grouped by
+    their cache keys, and each group is looked up in `geo_cache` and fetched on a miss
+    from one of its points.
+
+    Parameters
+    ----------
+    data_source : DataSource
+        Where the values come from.
+
+    points : list of tuple
+        (lat, long) of the locations.
+
+    geo_cache : GeoCache, optional
+        Cache of the remote values, default is a new in-memory cache.
+
+    executor : concurrent.futures.Executor, optional
+        Runs the remote lookups concurrently.
+
+    Returns
+    -------
+    ph, temp, rainfall : numpy.ndarray
+        Values of the locations, ph -1 when unknown, NaN where the lookup failed.
+
+    failed : numpy.ndarray
+        True for the locations where a lookup failed.
+    """
+    if not data_source.remote:
+        ph, temp, rainfall = np.array([_sample_cell(data_source, lat, long) for lat, long in points],
+                                      dtype=float).reshape(-1, 3).T
+        return ph, temp, rainfall, np.isnan(temp) & np.isnan(rainfall)
+
+    geo_cache = geo_cache if geo_cache is not None else GeoCache()
+    groups = []
+    for sources in MAP_QUERIES:
+        cells = {}
+        keys = [tuple(geo_cache.key(source, lat, long) for source in sources) for lat, long in points]
+        for key, point in zip(keys, points):
+            cells.setdefault(key, point)
+        groups.append((sources, keys, cells))
+
+    lookups = [(sources, point) for sources, _, cells in groups for point in cells.values()]
+    run = lambda lookup: _lookup(data_source, geo_cache, lookup[0], *lookup[1])
+    values = iter(list(executor.map(run, lookups) if executor is not None else map(run, lookups)))
+
+    ph = np.full(len(points), -1.0)
+    temp = np.full(len(points), np.nan)
+    rainfall = np.full(len(points), np.nan)
+    failed = np.zeros(len(points), dtype=bool)
+    for sources, keys, cells in groups:
+        cell_values = dict(zip(cells, itertools.islice(values, len(cells))))
+        for i, key in enumerate(keys):
+            value = cell_values[key]
+            if value is None:
+                failed[i] = True
+            elif "climate" in sources:
+                temp[i] = np.nan if value["climate"][0] is None else value["climate"][0]
+            else:
+                ph[i] = -1 if value["ph"] is None else value["ph"]
+                rainfall[i] = np.nan if value["precipitation"] is None else value["precipitation"]
+    return ph, temp, rainfall, failed
+
+
+def build_suitability_tiles(table, data_source, bounds, resolution, directory, tile_size=256, executor=None,
+                            max_failed=0.5, geo_cache=None):
+    """
+    Samples a region on a regular grid and writes its crop-suitability tiles.
+
+    Parameters
+    ----------
+    table : CropTable
+        The compiled crop catalog.
+
+    data_source : DataSource
+        Where the climate, pH and precipitation of every cell come from.
+
+    bounds : tuple
+        (min_lon, min_lat, max_lon, max_lat) of the region.
+
+    resolution : float
+        Cell size in degrees.
+
+    directory : str
+        Output folder, receives index.json and tile_<row>_<col>.tif files.
+
+    tile_size : int, optional
+        Cells per tile side, default is 256.
+
+    executor : concurrent.futures.Executor, optional
+        Runs the cell lookups concurrently, useful for remote data sources.
+
+    max_failed : float, optional
+        Share of the cells of a tile whose lookups may fail before the build is aborted,
+        default is 0.5.
+
+    geo_cache : GeoCache, optional
+        Cache of the remote values (see sample_points), default is a new in-memory cache.
+
+    Returns
+    -------
+    dict
+        The index written to index.json.
+
+    Raises
+    ------
+    SuitabilityBuildError
+        If more than `max_failed` of the cells of a tile could not be sampled. No
+        index.json is left in `directory`, so the partial map is not served.
+
+    Notes
+    -----
+    Every tile is written to a temporary file and moved over the previous one with
+    os.replace, and index.json is written last the same way: servers that still map an old
+    tile keep reading its (unlinked) file until they reload the index.
+    """
+    min_lon, min_lat, max_lon, max_lat = bounds
+    rows = math.ceil((max_lat - min_lat) / resolution - 1e-9)
+    cols = math.ceil((max_lon - min_lon) / resolution - 1e-9)
+    os.makedirs(directory, exist_ok=True)
+    # the index of a previous build would point at tiles being rewritten
+    index_path = os.path.join(directory, "index.json")
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    tiles = []
+    for tile_row in range(math.ceil(rows / tile_size)):
+        for tile_col in range(math.ceil(cols / tile_size)):
+            r0, c0 = tile_row * tile_size, tile_col * tile_size
+            r1, c1 = min(r0 + tile_size, rows), min(c0 + tile_size, cols)
+
+            # cell centres, row by row from the north
+            lats = max_lat - (np.arange(r0, r1) + 0.5) * resolution
+            lons = min_lon + (np.arange(c0, c1) + 0.5) * resolution
+            points = [(lat, lon) for lat in lats.tolist() for lon in lons.tolist()]
+            ph, temp, rainfall, failed = sample_points(data_source, points, geo_cache, executor)
+
+            failed = float(failed.mean())
+            if failed > max_failed:
+                raise SuitabilityBuildError(f"lookups failed for {failed:.0%} of the cells of tile "
+                                            f"{tile_row}_{tile_col}, check the data source")
+            scores = suitability_scores(table, ph, temp, rainfall)
+            data = scores.T.reshape(len(table.names), r1 - r0, c1 - c0)
+
+            name = f"tile_{tile_row}_{tile_col}.tif"
+            tile_bounds = (min_lon + c0 * resolution, max_lat - r1 * resolution,
+                           min_lon + c1 * resolution, max_lat - r0 * resolution)
+            _write_replace(os.path.join(directory, name), lambda path: write_geotiff(path, data, tile_bounds, NODATA))
+            tiles.append(name)
+            logger.info("wrote %s (%dx%d cells)", name, r1 - r0, c1 - c0)
+
+    index = {
+        "bounds": [min_lon, max_lat - rows * resolution, min_lon + cols * resolution, max_lat],
+        "resolution": resolution,
+        "tile_size": tile_size,
+        "shape": [rows, cols],
+        "crops": list(table.names),
+        "tiles": tiles,
+    }
+
+    def write_index(path):
+        with open(path, "w") as f:
+            json.dump(index, f, indent=2)
+    _write_replace(index_path, write_index)
+    return index
+
+
+def _write_replace(path, write):
+    # write(tmp_path), then move the file over `path` in one step
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# ============================================================
+
+class SuitabilityMap:
+    """
+    Point and bounding box queries over the tiles written by build_suitability_tiles.
+
+    The tile holding a point is found from the grid arithmetic of index.json, and only that
+    tile's bytes for the requested cells are read (tiles are memory-mapped), so a point query
+    costs the same whatever the size of the region. When index.json changes (the map was
+    rebuilt), the index is reloaded and the mapped tiles are dropped.
+
+    Parameters
+    ----------
+    directory : str
+        Folder of index.json and the tiles (SUITABILITY_MAP_DIR setting).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = None
+        self._index_version = None
+        self._tiles = {}
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        path = os.path.join(self.directory, "index.json")
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No suitability map in {self.directory}, build it first") from None
+        # index.json is replaced, not rewritten, by a build: a new inode or mtime is a new map
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version != self._index_version:
+            with open(path) as f:
+                index = json.load(f)
+            with self._lock:
+                self._index, self._index_version = index, version
+                self._tiles = {}
+        return self._index
+
+    def point(self, lat, long):
+        """
+        Returns {crop name: decode_score(...)} at (lat, long), or None outside the map.
+        """
+        index = self.index
+        cell = self._cell(index, lat, long)
+        if cell is None:
+            return None
+        scores = self.window(cell[0], cell[0] + 1, cell[1], cell[1] + 1)[0, 0]
+        return {crop: decode_score(score) for crop, score in zip(index["crops"], scores)}
+
+    def bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """
+        Summarises a bounding box: per crop, the share of cells (with data) where it is best / normal.
+        """
+        index = self.index
+        map_min_lon, _, _, map_max_lat = index["bounds"]
+        resolution = index["resolution"]
+        row0 = int(math.floor((map_max_lat - max_lat) / resolution))
+        row1 = int(math.ceil((map_max_lat - min_lat) / resolution))
+        col0 = int(math.floor((min_lon - map_min_lon) / resolution))
+        col1 = int(math.ceil((max_lon - map_min_lon) / resolution))
+        scores = self.window(row0, row1, col0, col1).reshape(-1, len(index["crops"]))
+
+        valid = scores[:, 0] != NODATA
+        scores = scores[valid]
+        optimal = sum(((scores & OPTIMAL_BITS[c]) > 0).astype(np.uint8) for c in CONDITIONS)
+        tolerated = sum(((scores & TOLERATED_BITS[c]) > 0).astype(np.uint8) for c in CONDITIONS)
+        best = optimal >= 2
+        normal = (tolerated >= 2) & ~best
+        cells = max(len(scores), 1)
+        return {
+            "cells": int(valid.size),
+            "cells_with_data": int(len(scores)),
+            "crops": {
+                crop: {"best": round(float(best[:, i].sum()) / cells, 3),
+                       "normal": round(float(normal[:, i].sum()) / cells, 3)}
+                for i, crop in enumerate(index["crops"])
+            },
+        }
+
+    def window(self, row0, row1, col0, col1):
+        """
+        Returns the (rows, cols, crops) scores of a window of the grid, NODATA outside the map.
+        """
+        index = self.index
+        rows, cols = index["shape"]
+        tile_size = index["tile_size"]
+        window = np.full((max(row1 - row0, 0), max(col1 - col0, 0), len(index["crops"])), NODATA, dtype=np.uint8)
+        r0, r1 = max(row0, 0), min(row1, rows)
+        c0, c1 = max(col0, 0), min(col1, cols)
+        if r0 >= r1 or c0 >= c1:
+            return window
+
+        for tile_row in range(r0 // tile_size, (r1 - 1) // tile_size + 1):
+            for tile_col in range(c0 // tile_size, (c1 - 1) // tile_size + 1):
+                y0, x0 = tile_row * tile_size, tile_col * tile_size
+                ys0, ys1 = max(r0, y0), min(r1, y0 + tile_size)
+                xs0, xs1 = max(c0, x0), min(c1, x0 + tile_size)
+                tile = self._tile(tile_row, tile_col)
+                window[ys0 - row0:ys1 - row0, xs0 - col0:xs1 - col0] = tile.read(ys0 - y0, ys1 - y0, xs0 - x0, xs1 - x0)
+        return window
+
+    # ------------------------------------------------------------
+
+    def _cell(self, index, lat, long):
+        min_lon, min_lat, max_lon, max_lat = index["bounds"]
+        if not (min_lon <= long < max_lon and min_lat < lat <= max_lat):
+            return None
+        resolution = index["resolution"]
+        rows, cols = index["shape"]
+        return (min(int((max_lat - lat) / resolution), rows - 1),
+                min(int((long - min_lon) / resolution), cols - 1))
+
+    def _tile(self, tile_row, tile_col):
+        with self._lock:
+            tile = self._tiles.get((tile_row, tile_col))
+            if tile is None:
+                path = os.path.join(self.directory, f"tile_{tile_row}_{tile_col}.tif")
+                tile = self._tiles[(tile_row, tile_col)] = GeoTiff(path)
+            return tile
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="Suitability map: %(message)s")
+    from satellitor_backend.application import app, crop_table, data_source, geo_cache, lookup_pool, worker_startup
+
+    parser = argparse.ArgumentParser(description="Build the crop-suitability tiles of a region.")
+    parser.add_argument("bounds", nargs=4, type=float, metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"))
+    parser.add_argument("--resolution", type=float, default=0.01, help="cell size in degrees (default 0.01)")
+    parser.add_argument("--tile-size", type=int, default=256, help="cells per tile side (default 256)")
+    parser.add_argument("--output", default=app.config['SUITABILITY_MAP_DIR'], help="output folder")
+    parser.add_argument("--max-failed", type=float, default=0.5,
+                        help="share of failed cells in a tile that aborts the build (default 0.5)")
+    args = parser.parse_args()
+
+    if data_source.remote:
+        # opened in the background by the gunicorn workers, the build needs it before sampling
+        worker_startup.run_now("earth_engine")
+    try:
+        build_suitability_tiles(crop_table, data_source, tuple(args.bounds), args.resolution, args.output,
+                                args.tile_size, lookup_pool if data_source.remote else None, args.max_failed,
+                                geo_cache)
+    except SuitabilityBuildError as e:
+        raise SystemExit(f"Suitability map not built: {e}")
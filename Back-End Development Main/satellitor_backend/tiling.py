@@ -0,0 +1,127 @@
+import numpy as np
+
+
+# ============================================================
+
+def tile_positions(length, tile_size, overlap):
+    """
+    Start offsets of overlapping tiles covering [0, length).
+
+    Tiles advance by tile_size - overlap and the last tile is aligned to the end,
+    so every tile has the full tile_size unless the image itself is smaller.
+    """
+    if length <= tile_size:
+        return [0]
+    stride = max(tile_size - overlap, 1)
+    return list(range(0, length - tile_size, stride)) + [length - tile_size]
+
+
+def feather_weights(height, width, overlap, feather=(True, True, True, True)):
+    """
+    Blending weights of a tile: 255 in the middle, ramping down to 1 over `overlap` pixels at the edges.
+
+    `feather` tells, for the (top, bottom, left, right) edges, whether that edge is shared
+    with a neighbouring tile. Edges lying on the image border keep the full weight.
+
+    Returns
+    -------
+    numpy.ndarray
+        A (height, width) uint16 array.
+    """
+    ramp = max(overlap, 1)
+    top, bottom, left, right = feather
+
+    def ramp_1d(n, start, end):
+        distance = np.full(n, ramp)
+        if start:
+            distance = np.minimum(distance, np.arange(1, n + 1))
+        if end:
+            distance = np.minimum(distance, np.arange(n, 0, -1))
+        return np.maximum(distance * 255 // ramp, 1).astype(np.uint16)
+
+    return np.minimum(ramp_1d(height, top, bottom)[:, None], ramp_1d(width, left, right)[None, :])
+
+
+# ============================================================
+
+class TileStitcher:
+    """
+    Stitches per-tile class maps back into one class map with overlap blending.
+
+    Every tile votes for the class of each of its pixels with its feather weight, so in
+    overlaps the tile that sees a pixel further away from its own border wins (edges on the
+    image border are not feathered). Tiles are consumed one row of tiles at a time: once a
+    row is done, every image row above the start of the next tile row is final and is
+    written to `class_map`. Only one tile row of votes is kept (n_classes x tile_size x width
+    uint16), so the working memory does not grow with the image height.
+
+    Parameters
+    ----------
+    height, width : int
+        Size of the full image.
+
+    tile_size : int
+        Side of the (square) tiles.
+
+    overlap : int
+        Number of pixels shared by neighbouring tiles.
+
+    n_classes : int
+        Number of classes in the tile class maps.
+
+    Example
+    -------
+    >>> stitcher = TileStitcher(h, w, 640, 128, 5)
+    >>> for windows in stitcher.tile_rows():
+    ...     for y0, x0, y1, x1 in windows:
+    ...         stitcher.add(segment(img[y0:y1, x0:x1]), y0, x0)
+    >>> class_map = stitcher.class_map
+    """
+
+    def __init__(self, height, width, tile_size, overlap, n_classes):
+        self.tile_size = int(tile_size)
+        self.overlap = max(0, min(int(overlap), self.tile_size // 2))
+        self.n_classes = n_classes
+        self.class_map = np.zeros((height, width), dtype=np.uint8)
+
+        self._rows = tile_positions(height, self.tile_size, self.overlap)
+        self._cols = tile_positions(width, self.tile_size, self.overlap)
+        self._votes = np.zeros((n_classes, min(self.tile_size, height), width), dtype=np.uint16)
+        self._origin = 0
+        self._weights = {}
+
+    def tile_rows(self):
+        """
+        Yields, for every row of tiles, the list of (y0, x0, y1, x1) windows in that row.
+        The row is finalized when the caller asks for the next one.
+        """
+        height, width = self.class_map.shape
+        for i, y0 in enumerate(self._rows):
+            y1 = min(y0 + self.tile_size, height)
+            yield [(y0, x0, y1, min(x0 + self.tile_size, width)) for x0 in self._cols]
+            next_row = self._rows[i + 1] if i + 1 < len(self._rows) else height
+            self._finalize(next_row)
+
+    def add(self, tile_map, y0, x0):
+        """
+        Adds the votes of one tile class map whose top-left corner is (y0, x0) in the image.
+        """
+        th, tw = tile_map.shape
+        height, width = self.class_map.shape
+        key = (th, tw, y0 > 0, y0 + th < height, x0 > 0, x0 + tw < width)
+        weights = self._weights.get(key)
+        if weights is None:
+            weights = self._weights[key] = feather_weights(th, tw, self.overlap, key[2:])
+
+        top = y0 - self._origin
+        for class_idx in range(self.n_classes):
+            self._votes[class_idx, top:top + th, x0:x0 + tw] += np.where(tile_map == class_idx, weights, 0)
+
+    def _finalize(self, next_row):
+        final_rows = next_row - self._origin
+        self.class_map[self._origin:next_row] = self._votes[:, :final_rows].argmax(axis=0)
+
+        kept = self._votes.shape[1] - final_rows
+        self._votes[:, :kept] = self._votes[:, final_rows:]
+        self._votes[:, kept:] = 0
+        self._origin = next_row
@@ -1,11 +1,15 @@
-from collections import defaultdict
-import requests
-from satellitor_backend import model,crops
+from satellitor_backend.application import model,crop_table,scheduler,geo_cache,lookup_pool,data_source,fertilizer_model
+from satellitor_backend.landcover import class_colors, class_names, class_histogram, class_percentages, \
+    colorize, as_class_map, rasterize_instances, class_boundaries
+from satellitor_backend.tiling import TileStitcher
+from satellitor_backend.landscape import class_patches, landscape_metrics
+from satellitor_backend.soil_query import query_climate
+from satellitor_backend.data_sources import EarthEngineSource, ALL_SOURCES
 import cv2
 import numpy as np
 import ee
-import pickle
 import os
+from concurrent.futures import Future
 from datetime import datetime
 
 
@@ -14,16 +18,6 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 
-# class_colors in BGR
-class_colors = {
-    0: (0, 0, 0),  # background
-    1: (0, 255, 0), # agriculture
-    2: (255, 255, 255),# Barren
-    3: (0, 0, 255),  # Urban
-    4: (255, 0, 0)    # Water
-}
-
-
 # ============================================================
 
 def yolo_mask(img, model=model):
@@ -80,71 +74,253 @@ def assign_colors(mask_img):
 
 # ============================================================
 
-def get_mask(img_path,output_path, model=model):
+def get_mask(img_path,output_path, model=scheduler, tile_size=None, tile_overlap=128, tile_threshold=2048,
+             output_shape=None):
     """
-    Applies segmentation masks from a YOLO model to an input image and saves the result.
+    Applies segmentation masks from a YOLO model to an input image and saves the colorized result.
 
     Parameters:
     -----------
-    img_path : str
-        Path to the input image file.
+    img_path : str or numpy.ndarray
+        Path to the input image file, or the already decoded BGR image.
 
-    output_path : str
-        Path to save the output image with segmentation masks applied.
+    output_path : str or None
+        Path to save the colorized mask image (painted with `class_colors`), None to skip writing it.
 
     model : callable, optional
-        A YOLO segmentation model used for inference. Defaults to a globally defined 'model'.
+        A YOLO segmentation model used for inference. Defaults to the shared InferenceScheduler,
+        which batches this frame with the ones of concurrent requests.
+
+    tile_size : int, optional
+        Enables tiled inference (see get_tiled_class_map) with tiles of this size. Default is None (disabled).
+
+    tile_overlap : int, optional
+        Overlap between neighbouring tiles in pixels, default is 128.
+
+    tile_threshold : int, optional
+        Only images whose longer side exceeds this many pixels are tiled, default is 2048.
+
+    output_shape : tuple, optional
+        (height, width) of the class map when the image is a downscaled frame of the capture
+        (see ingest.decode_upload), default is the size of the image.
 
     Returns:
     --------
-    mask_img : numpy.ndarray or None
-        The image with segmentation masks applied, or None if the input image could not be read.
+    class_map : numpy.ndarray or None
+        A (H, W) uint8 class index map, or None if the input image could not be read.
+        This is the mask representation consumed by get_Percentage, get_fragmentation and detect_edges.
 
     Notes:
     ------
-    - The function uses a predefined dictionary `class_colors` to assign colors based on class ID.
-    - If the model does not detect any masks, the saved image will remain black.
+    - The class map is only turned into colors (see `class_colors`) when the PNG is written.
+    - Detections with a class ID missing from `class_colors` are painted as background.
+    - If the model does not detect any masks, the whole map is background and the saved image will remain black.
     - Prints a message when mask processing is completed or if there's an error reading the image.
 
     Example:
     --------
     >>> get_mask("input.jpg", "masked_output.jpg", model=my_yolo_model)
     """
-    img = cv2.imread(img_path)
+    img = cv2.imread(img_path) if isinstance(img_path, str) else img_path
     if img is None:
         print("Error: Image not found!")
         return
 
-    mask_img = np.zeros_like(img)
+    if tile_size and max(img.shape[:2]) > tile_threshold:
+        class_map = get_tiled_class_map(img, model, tile_size, tile_overlap)
+    else:
+        results = model.predict(img)
 
-    results = model.predict(img)
+        shape = tuple(output_shape or img.shape[:2])
+        class_map = np.zeros(shape, dtype=np.uint8)
+        for result in results:
+            result_to_class_map(result, shape, class_map, frame_shape=img.shape[:2])
 
-    for result in results:
-        if result.masks is not None:
-            masks = result.masks.data.cpu().numpy()
-            class_ids = result.boxes.cls.cpu().numpy().astype(int)
+    if output_path is not None:
+        cv2.imwrite(output_path, colorize(class_map))
+    print("Mask processing completed!")
+    return class_map
 
-            for i, mask in enumerate(masks):
-                mask = cv2.resize(mask, (img.shape[1], img.shape[0]))
-                mask = (mask > 0.5).astype(np.uint8)
-                color = class_colors.get(class_ids[i], (0, 0, 0))
-                mask_img[mask == 1] = color
+# ============================================================
 
-    cv2.imwrite(output_path, mask_img)
-    print("Mask processing completed!")
-    return mask_img
+def get_tiled_class_map(img, model=scheduler, tile_size=640, overlap=128, batch_size=8):
+    """
+    Segments a large image with a sliding window instead of letting YOLO downscale it.
+
+    The image is split into overlapping tiles of `tile_size` pixels, the tiles are run through
+    the model `batch_size` at a time, and their class maps are stitched back with overlap
+    blending (see satellitor_backend.tiling.TileStitcher).
+
+    Parameters
+    ----------
+    img : numpy.ndarray
+        The full resolution BGR image.
+
+    model : callable, optional
+        A YOLO segmentation model used for inference. Defaults to the shared InferenceScheduler.
+
+    tile_size : int, optional
+        Side of the square tiles, default is 640 (the model input size).
+
+    overlap : int, optional
+        Number of pixels shared by neighbouring tiles, default is 128.
+
+    batch_size : int, optional
+        Number of tiles per forward pass, default is 8.
+
+    Returns
+    -------
+    class_map : numpy.ndarray
+        The (H, W) uint8 class index map of the whole image.
+
+    Notes
+    -----
+    - Apart from the returned map, memory use is bounded by one row of tiles, whatever the image size.
+    """
+    height, width = img.shape[:2]
+    stitcher = TileStitcher(height, width, tile_size, overlap, len(class_colors))
+
+    for windows in stitcher.tile_rows():
+        for start in range(0, len(windows), batch_size):
+            chunk = windows[start:start + batch_size]
+            tiles = [np.ascontiguousarray(img[y0:y1, x0:x1]) for y0, x0, y1, x1 in chunk]
+            results = model.predict(tiles)
+            for (y0, x0, y1, x1), result in zip(chunk, results):
+                tile_shape = (y1 - y0, x1 - x0)
+                stitcher.add(result_to_class_map(result, tile_shape, frame_shape=tile_shape), y0, x0)
+
+    print(f"Tiled inference completed ({height}x{width})!")
+    return stitcher.class_map
+
+# ============================================================
+
+def result_to_class_map(result, shape, class_map=None, frame_shape=None):
+    """
+    Paints the instance masks of one YOLO result into a class index map.
+
+    Overlapping instances resolve to the most confident one (see landcover.rasterize_instances).
+
+    Parameters
+    ----------
+    result : ultralytics.engine.results.Results or model_server.ClassMapResult
+        The prediction for a single image.
+
+    shape : tuple
+        (height, width) of the original image.
+
+    class_map : numpy.ndarray, optional
+        A (H, W) uint8 map to paint into. A new background map is created if not given.
+
+    frame_shape : tuple, optional
+        (height, width) of the frame the model was given, default is `result.orig_shape`.
+        YOLO letterboxes it into the model input (to a square when frames of different
+        shapes are batched together), the frame is cropped out of the masks before they
+        are resized to `shape`.
+
+    Returns
+    -------
+    class_map : numpy.ndarray
+        The (H, W) uint8 class index map.
+    """
+    if getattr(result, "class_map", None) is not None:
+        # already rasterized by the model server (see model_server.ClassMapResult)
+        painted = result.class_map
+        if painted.shape != tuple(shape[:2]):
+            painted = cv2.resize(painted, (shape[1], shape[0]), interpolation=cv2.INTER_NEAREST)
+        if class_map is None:
+            return painted
+        np.copyto(class_map, painted, where=painted > 0)
+        return class_map
+
+    if class_map is None:
+        class_map = np.zeros(shape, dtype=np.uint8)
+
+    if result.masks is not None:
+        # thresholded before leaving the device, a boolean mask is 4x smaller to copy
+        masks = (result.masks.data > 0.5).cpu().numpy()
+        class_ids = result.boxes.cls.cpu().numpy().astype(int)
+        confidences = result.boxes.conf.cpu().numpy()
+        rasterize_instances(masks, class_ids, confidences, shape, class_map,
+                            frame_shape=frame_shape or getattr(result, "orig_shape", None))
+
+    return class_map
+
+# ============================================================
+
+def get_masks(img_paths, output_paths, model=scheduler, batch_size=8,
+              tile_size=None, tile_overlap=128, tile_threshold=2048, output_shapes=None):
+    """
+    Batched version of get_mask: runs the images through YOLO `batch_size` at a time.
+
+    Parameters
+    ----------
+    img_paths : list of str or numpy.ndarray
+        Paths to the input image files, or already decoded BGR images.
+
+    output_paths : list of str or None
+        Paths to save the colorized mask of each image, in the same order as `img_paths`
+        (None entries are not written).
+
+    model : callable, optional
+        A YOLO segmentation model used for inference. Defaults to the shared InferenceScheduler.
+
+    batch_size : int, optional
+        Number of images per forward pass, default is 8.
+
+    tile_size, tile_overlap, tile_threshold : optional
+        Tiled inference settings, as in get_mask. Tiled images are segmented on their own.
+
+    output_shapes : list of tuple, optional
+        Class map size of each image, as `output_shape` in get_mask (None entries use the image size).
+
+    Yields
+    ------
+    class_map : numpy.ndarray or None
+        The (H, W) uint8 class index map of each image, in input order,
+        or None if that image could not be read.
+
+    Notes
+    -----
+    - Only one batch of decoded images is held in memory at a time.
+    """
+    batch_size = max(1, int(batch_size))
+    for start in range(0, len(img_paths), batch_size):
+        chunk_outputs = output_paths[start:start + batch_size]
+        chunk_shapes = (output_shapes or [None] * len(img_paths))[start:start + batch_size]
+        imgs = [cv2.imread(path) if isinstance(path, str) else path for path in img_paths[start:start + batch_size]]
+
+        tiled = [img is not None and bool(tile_size) and max(img.shape[:2]) > tile_threshold for img in imgs]
+        valid_imgs = [img for img, is_tiled in zip(imgs, tiled) if img is not None and not is_tiled]
+        results = iter(model.predict(valid_imgs) if valid_imgs else [])
+
+        for img, is_tiled, output_path, shape in zip(imgs, tiled, chunk_outputs, chunk_shapes):
+            if img is None:
+                print("Error: Image not found!")
+                yield None
+                continue
+
+            if is_tiled:
+                class_map = get_tiled_class_map(img, model, tile_size, tile_overlap, batch_size)
+            else:
+                class_map = result_to_class_map(next(results), tuple(shape or img.shape[:2]), frame_shape=img.shape[:2])
+            if output_path is not None:
+                cv2.imwrite(output_path, colorize(class_map))
+            yield class_map
+
+        print(f"Batch of {len(valid_imgs)} masks completed!")
 
 # ============================================================
 
 def get_Percentage(mask_img,show_in_console):
     """
        Calculates the percentage of each land class (e.g., Agriculture, Urban, etc.)
-       present in a segmented mask image based on predefined RGB color values.
+       present in a segmentation mask.
 
        Parameters
        ----------
        mask_img : numpy.ndarray
-           The mask image generated by the segmentation model, with each class represented by a specific color.
+           The (H, W) class index map returned by get_mask, or a BGR mask image
+           with each class represented by a specific color.
 
        show_in_console : bool
            If True, prints the percentage of each detected class to the console.
@@ -153,41 +329,29 @@ def get_Percentage(mask_img,show_in_console):
        -------
        class_percentage : dict
            A dictionary containing the percentage (as a float between 0 and 1) of each class:
-           'Background', 'Agriculture', 'Barren', 'Forest', 'Urban', and 'Water'.
+           'Background', 'Agriculture', 'Barren', 'Urban', and 'Water'.
 
        Notes
        -----
-       - Colors are matched with a tolerance threshold using hardcoded RGB ranges:
+       - For BGR masks, colors are matched with a tolerance threshold using hardcoded BGR ranges
+         (each channel either below 10 or above 240):
            * Background: near black (0, 0, 0)
            * Agriculture: green (0, 255, 0)
            * Barren: white (255, 255, 255)
-           * Forest: dark green (0, 127, 0)
-           * Urban: blue (0, 0, 255)
-           * Water: red (255, 0, 0)
+           * Urban: red (0, 0, 255)
+           * Water: blue (255, 0, 0)
+       - Pixels are decoded with lookup tables and counted with a single bincount
+         (see satellitor_backend.landcover), there is no per-pixel Python loop.
 
     """
-    px = mask_img.reshape(-1, 3)
-    class_count = defaultdict(int)
-
-    for pixel in px:
-        if pixel[0] < 10 and pixel[1] < 10 and pixel[2] < 10:
-            class_count["Background"] += 1
-        elif pixel[0] < 10 and pixel[1] > 240 and pixel[2] < 10:
-            class_count["Agriculture"] += 1
-        elif pixel[0] > 240 and pixel[1] > 240 and pixel[2] > 240:
-            class_count["Barren"] += 1
-        elif pixel[0] < 10 and pixel[1] < 10 and pixel[2] > 240:
-            class_count["Urban"] += 1
-        elif pixel[0] > 240 and pixel[1] < 10 and pixel[2] < 10:
-            class_count["Water"] += 1
-
-    class_percentage = {"Background":0.0,"Agriculture":0.0,"Barren":0.0,"Urban":0.0,"Water":0.0}
-
+    total_pixels = mask_img.shape[0] * mask_img.shape[1]
+    counts = class_histogram(as_class_map(mask_img))
+    class_percentage = class_percentages(counts, total_pixels)
 
-    for class_name, count in class_count.items():
-        class_percentage[class_name] = round(count / px.shape[0],3)
-        if show_in_console:
-            print(f"{class_name}: {round(count / px.shape[0] * 100,1)}%")
+    if show_in_console:
+        for class_idx, class_name in class_names.items():
+            if counts[class_idx]:
+                print(f"{class_name}: {round(counts[class_idx] / total_pixels * 100,1)}%")
 
     return class_percentage
 
@@ -237,7 +401,7 @@ def rgb_to_class_index(img_mask, color_map, tolerance=10):
     return class_mask
 
 
-def get_fragmentation(img_mask, class_colors=class_colors):
+def get_fragmentation(img_mask, class_colors=class_colors, metrics=None):
     """
         Computes the fragmentation index for each land class in a segmentation mask image.
 
@@ -247,11 +411,15 @@ def get_fragmentation(img_mask, class_colors=class_colors):
         Parameters
         ----------
         img_mask : numpy.ndarray
-            The RGB segmentation mask image.
+            The (H, W) class index map returned by get_mask, or an RGB segmentation mask image.
 
         class_colors : dict
             Dictionary mapping class indices to RGB color values (default is global `class_colors`).
 
+        metrics : dict, optional
+            The result of get_landscape_metrics for the same mask, reused instead of labelling
+            the patches again.
+
         Returns
         -------
         fragmentation_index : dict
@@ -264,85 +432,95 @@ def get_fragmentation(img_mask, class_colors=class_colors):
         -----
         - Class with index 0 (usually background) is ignored in calculation.
         - If a class doesn't appear in the image, both indices will be zero for it.
+        - RGB masks are decoded with rgb_to_class_index first, class index maps are used as they are.
+        - All classes are labelled in one pass (see landscape.class_patches).
 
     """
-    class_mask = rgb_to_class_index(img_mask, class_colors)
+    classes = [class_idx for class_idx in class_colors.keys() if class_idx != 0]
+
+    if metrics is not None:
+        patches = {class_idx: metrics[class_names[class_idx]]["patches"] for class_idx in classes}
+        areas = {class_idx: metrics[class_names[class_idx]]["area"] for class_idx in classes}
+    else:
+        if img_mask.ndim == 3:
+            class_mask = rgb_to_class_index(img_mask, class_colors)
+        else:
+            class_mask = img_mask
+        patch_areas = class_patches(class_mask, classes)
+        patches = {class_idx: len(patch_areas[class_idx]) for class_idx in classes}
+        areas = {class_idx: int(patch_areas[class_idx].sum()) for class_idx in classes}
 
     fragmentation_index = {}
     normalized_FI = {}
 
-    for class_idx in class_colors.keys():
-        # Ignore background
-        if class_idx == 0:
-            continue
-
-        # Create a binary mask for the current class
-        binary_mask = (class_mask == class_idx).astype(np.uint8)
-
-        # -------------------------------------------------------------------------------------
-
-        area = np.sum(binary_mask)
-
-        if area == 0:
+    for class_idx in classes:
+        if areas[class_idx] == 0:
             fragmentation_index[class_idx] = 0
             normalized_FI[class_idx] = 0
             continue
 
-        # -------------------------------------------------------------------------------------
+        fragmentation_index[class_idx] = patches[class_idx]
+        normalized_FI[class_idx] = float(patches[class_idx] / areas[class_idx])
 
-        # Find connected components
-        num_labels, _ = cv2.connectedComponents(binary_mask)
+    return fragmentation_index,normalized_FI
 
-        # -------------------------------------------------------------------------------------
-        normalized_FI[class_idx] = float((num_labels - 1) / area)
-        # -------------------------------------------------------------------------------------
+# ============================================================
 
-        # save FI (subtract 1 because background is counted)
-        fragmentation_index[class_idx] = num_labels - 1
+def get_landscape_metrics(img_mask):
+    """
+        Patch metrics of every land class: patch count, patch size distribution, mean patch
+        area, largest patch index and edge density (see landscape.landscape_metrics).
 
-    return fragmentation_index,normalized_FI
+        Parameters
+        ----------
+        img_mask : numpy.ndarray
+            The (H, W) class index map returned by get_mask, or a BGR colored mask.
+
+        Returns
+        -------
+        metrics : dict
+            Class name -> metrics, background excluded.
+    """
+    return landscape_metrics(as_class_map(img_mask))
 
 
 # ============================================================
 
 def detect_edges(mask_img ,output_path):
     """
-       Applies edge detection on a segmentation mask image and saves the result.
+       Extracts the boundaries between land classes of a segmentation mask and saves the result.
 
        Parameters
        ----------
        mask_img : numpy.ndarray
-           The input image (can be grayscale or BGR colored mask).
+           The (H, W) class index map returned by get_mask, or a BGR colored mask.
 
-       output_path : str
-           Path to save the output image showing the detected edges.
+       output_path : str or None
+           Path to save the output image showing the detected edges, None to skip writing it.
 
        Returns
        -------
        edges : numpy.ndarray
-           A binary image (single-channel) showing the detected edges using Canny edge detection.
+           A binary image (single-channel, 0 or 255) of the class boundaries.
 
        Notes
        -----
-       - If the input image is in color, it will be converted to grayscale first.
-       - Applies Gaussian blur before Canny edge detection to reduce noise.
-       - Edge detection thresholds are fixed at (50, 150) for Canny.
+       - Boundaries come from neighbour differences in the class index map (see
+         landcover.class_boundaries): they are exact and one pixel wide, and classes whose
+         colors have the same gray level are still separated.
+       - Colored masks are decoded into a class index map first.
+       - Use encoding.boundary_contours for the boundaries as simplified vector contours.
     """
-    if len(mask_img.shape) > 2:
-        gray = cv2.cvtColor(mask_img, cv2.COLOR_BGR2GRAY)
-    else:
-        gray = mask_img
-
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    edges = cv2.Canny(blurred, 50, 150)
+    edges = class_boundaries(as_class_map(mask_img))
 
-    cv2.imwrite(output_path, edges)
+    if output_path is not None:
+        cv2.imwrite(output_path, edges)
     return edges
 
 
 # ============================================================
 
-def get_land_properties(lat,long):
+def get_land_properties(lat,long,site=None):
     """
        Retrieves land properties for a given geographic coordinate using remote sensing APIs.
 
@@ -354,6 +532,9 @@ def get_land_properties(lat,long):
        long : float
            Longitude of the target location.
 
+       site : dict, optional
+           Lookups already started with fetch_site_data for this location. Started here if not given.
+
 
        Returns
        -------
@@ -370,16 +551,138 @@ def get_land_properties(lat,long):
        - Soil pH values are averaged from depths: 0, 10, 30, 60, 100 cm using the "OpenLandMap/SOL" dataset.
        - Precipitation data is retrieved as the sum of monthly values from "OpenLandMap/CLM".
        - Temperature and humidity data are fetched from NASA POWER API (climatology endpoint).
+       - The values come from the configured data source (Earth Engine / NASA POWER, or local rasters).
+       - Remote lookups go through `geo_cache`, keyed by the coordinates snapped to the dataset grid.
+       - The lookups run concurrently on `lookup_pool` (see fetch_site_data).
        - The function prints status updates to the console for tracking.
 
        """
+    if site is None:
+        site = fetch_site_data(lat, long)
+
+    print("Getting land PH...")
+    ph_value = site["ph"].result()
+    if ph_value is None:
+        ph_value = -1
+    print("Land PH calculated!")
 
-    print("Getting land points...")
-    point = ee.Geometry.Point([long,lat])
-    print("Land Points have been retrieved")
+    print("Getting land Precipitation...")
+    annual_mm = site["precipitation"].result()
+    print(f"Annual precipitation (mm/year): {annual_mm}")
 
+    temperature, humidity = site["climate"].result()
 
-    print("Getting land PH...")
+    print(f"Location: ({lat}, {long})")
+    print(f"Soil pH (0-5cm depth): {ph_value}")
+    print(f"Annual Avg Temperature: {temperature}°C")
+    print(f"Annual Avg Humidity: {humidity}%")
+    print(f"Annual Rainfall: {annual_mm} mm")
+
+    return  ph_value, temperature, humidity, annual_mm
+
+
+def fetch_site_data(lat, long, executor=lookup_pool):
+    """
+    Starts every soil and climate lookup for a location concurrently.
+
+    The values come from the configured `data_source` (SOIL_DATA_SOURCE setting). With the
+    local raster backend they are read right away, without network I/O. With Earth Engine,
+    values already in `geo_cache` are returned as completed futures, and values of a cell
+    already being fetched (another image or request at the same place) share that lookup's
+    future (see GeoCache.get_or_submit). The other Earth Engine values are read with one
+    composite query (see soil_query.query_soil_climate) and the NASA POWER climatology with
+    one HTTP request; both are submitted at once to `executor` (a bounded thread pool
+    shared by all requests). The caller can keep working, e.g. run the segmentation, while
+    they are in flight, and pass the returned dict to get_land_properties and get_soil_data.
+
+    Parameters
+    ----------
+    lat : float
+        Latitude of the target location.
+
+    long : float
+        Longitude of the target location.
+
+    executor : concurrent.futures.Executor, optional
+        Where the lookups run, default is the shared `lookup_pool`.
+
+    Returns
+    -------
+    dict
+        Lookup name ("ph", "precipitation", "climate", "phosphorus", "potassium", "nitrogen",
+        "texture", "moisture") -> concurrent.futures.Future of its (cached) value.
+    """
+    site = {}
+    if not data_source.remote:
+        for name, value in data_source.sample(lat, long, ALL_SOURCES).items():
+            site[name] = Future()
+            site[name].set_result(value)
+        return site
+
+    def submit(missing):
+        futures = {}
+        if "climate" in missing:
+            futures["climate"] = executor.submit(_fetch_climate, lat, long)
+        soil = [name for name in missing if name != "climate"]
+        if soil:
+            query = executor.submit(_fetch_soil_climate, lat, long, soil)
+            futures.update(_split_future(query, soil))
+        return futures
+
+    return geo_cache.get_or_submit(ALL_SOURCES, lat, long, submit)
+
+
+def _fetch_climate(lat, long):
+    climate = data_source.sample(lat, long, ["climate"])["climate"]
+    geo_cache.put("climate", lat, long, climate)
+    return climate
+
+
+def _fetch_soil_climate(lat, long, sources):
+    try:
+        values = data_source.sample(lat, long, sources)
+    except Exception as e:
+        if not isinstance(data_source, EarthEngineSource):
+            raise
+        # fall back to one request per source, with their original error handling
+        print(f"Composite soil query failed, sampling sources one by one: {e}")
+        point = ee.Geometry.Point([long,lat])
+        getters = {
+            "ph": get_ph_level,
+            "precipitation": get_annual_precipitation,
+            "phosphorus": get_phosphorus_levels,
+            "potassium": get_potassium_levels,
+            "nitrogen": get_nitrogen_levels,
+            "texture": get_texture_levels,
+            "moisture": get_moisture_levels,
+        }
+        values = {name: getters[name](point) for name in sources}
+
+    for name, value in values.items():
+        geo_cache.put(name, lat, long, value)
+    return values
+
+
+def _split_future(future, names):
+    # one future per source, resolved from the dict returned by `future`
+    parts = {name: Future() for name in names}
+
+    def resolve(done):
+        error = done.exception()
+        for name, part in parts.items():
+            if error is not None:
+                part.set_exception(error)
+            else:
+                part.set_result(done.result()[name])
+
+    future.add_done_callback(resolve)
+    return parts
+
+
+def get_ph_level(point):
+    """
+    Average soil pH over the 0, 10, 30, 60 and 100 cm depth bands of OpenLandMap, or None if no band has data.
+    """
     ph_dataset = ee.Image("OpenLandMap/SOL/SOL_PH-H2O_USDA-4C1A2A_M/v02")
 
     bands=["b0","b10","b30","b60","b100"]
@@ -392,13 +695,14 @@ def get_land_properties(lat,long):
         except:
             continue
     if b_num == 0:
-        ph_value = -1
-    else:
-        ph_value = ph_value/(b_num*10)
-    print("Land PH calculated!")
+        return None
+    return ph_value/(b_num*10)
 
 
-    print("Getting land Precipitation...")
+def get_annual_precipitation(point):
+    """
+    Annual precipitation (mm/year) as the sum of the OpenLandMap monthly bands.
+    """
     d= ee.Image("OpenLandMap/CLM/CLM_PRECIPITATION_SM2RAIN_M/v01")
 
     monthly_bands = ['jan', 'feb', 'mar', 'apr', 'may', 'jun','jul', 'aug', 'sep', 'oct', 'nov', 'dec']
@@ -407,23 +711,14 @@ def get_land_properties(lat,long):
 
     sample = annual_precip.sample(region=point, scale=1000).first()
 
-    annual_mm = sample.get('sum').getInfo()
-    print(f"Annual precipitation (mm/year): {annual_mm}")
-
-    nasa_api = f"https://power.larc.nasa.gov/api/temporal/climatology/point?parameters=T2M,RH2M&latitude={lat}&longitude={long}&format=JSON&community=ag"
-    climate_data = requests.get(nasa_api).json()
+    return sample.get('sum').getInfo()
 
 
-    temperature = climate_data["properties"]["parameter"]["T2M"]["ANN"]
-    humidity = climate_data["properties"]["parameter"]["RH2M"]["ANN"]
-
-    print(f"Location: ({lat}, {long})")
-    print(f"Soil pH (0-5cm depth): {ph_value}")
-    print(f"Annual Avg Temperature: {temperature}°C")
-    print(f"Annual Avg Humidity: {humidity}%")
-    print(f"Annual Rainfall: {annual_mm} mm")
-
-    return  ph_value, temperature, humidity, annual_mm
+def get_climate(lat, long):
+    """
+    Annual average temperature (°C) and relative humidity (%) from the NASA POWER climatology endpoint.
+    """
+    return query_climate(lat, long)
 
 # ============================================================
 
@@ -449,42 +744,7 @@ def get_crops(ph,temp,rainfall,bestList):
             - crop_notes (str): Notes indicating which criteria need attention.
             - crop_data (dict): Full crop properties from the original 'crops' dictionary.
     """
-    best_crops=[]
-    for crop_name,crop_prop in crops.items():
-        isPh = False
-        isTemp = False
-        isRainfall = False
-        crop_notes = ""
-
-        if crop_prop['temp_min'] <= temp <= crop_prop['temp_max']:
-            isTemp = True
-        else:
-            crop_notes += "Needs attention to Temperature."
-
-
-        if ph != -1:
-            if crop_prop['ph_min'] <= ph <= crop_prop['ph_max']:
-                isPh = True
-            else:
-                crop_notes += "Needs attention to soil pH."
-        else:
-            crop_notes += " pH not provided in this land. "
-
-        if crop_prop['rainfall_min'] <= rainfall <= crop_prop['rainfall_max']:
-            isRainfall = True
-        else:
-            crop_notes += f" Needs attention to irrigation. Optimal rainfall: {crop_prop['rainfall_opt_min']} mm/year to {crop_prop['rainfall_opt_max']} mm/year. "
-
-        if (isTemp + isPh + isRainfall) >= 2 and all(crop_name != crop['crop_name'] for crop in bestList):
-            best_crops.append({
-                "crop_name": crop_name,
-                "isTemp": isTemp,
-                "isPh": isPh,
-                "isRainfall": isRainfall,
-                "crop_notes": crop_notes.strip(),
-                "crop_data": crop_prop
-            })
-    return best_crops
+    return crop_table.normal_crops(ph, temp, rainfall, exclude={crop['crop_name'] for crop in bestList})
 
 # ============================================================
 
@@ -510,43 +770,7 @@ def get_best_crops(ph,temp,rainfall):
                - crop_notes (str): Warnings or recommendations based on which conditions are not ideal.
                - crop_data (dict): The full crop properties from the original 'crops' dataset.
     """
-    best_crops=[]
-    for crop_name,crop_prop in crops.items():
-        isPh = False
-        isTemp = False
-        isRainfall = False
-        crop_notes = ""
-
-        if crop_prop['temp_opt_min'] <= temp <= crop_prop['temp_opt_max']:
-            isTemp = True
-        else:
-            crop_notes += "Needs attention to Temperature."
-
-
-
-        if ph != -1:
-            if crop_prop['ph_opt_min'] <= ph <= crop_prop['ph_opt_max']:
-                isPh = True
-            else:
-                crop_notes += "Needs attention to soil pH."
-        else:
-            crop_notes += " pH not provided in this land. "
-
-        if crop_prop['rainfall_opt_min'] <= rainfall <= crop_prop['rainfall_opt_max']:
-            isRainfall = True
-        else:
-            crop_notes += f" Needs attention to irrigation. Optimal rainfall: {crop_prop['rainfall_opt_min']} mm/year to {crop_prop['rainfall_opt_max']} mm/year. "
-
-        if (isTemp + isPh + isRainfall) >= 2:
-            best_crops.append({
-                "crop_name": crop_name,
-                "isTemp": isTemp,
-                "isPh": isPh,
-                "isRainfall": isRainfall,
-                "crop_notes": crop_notes.strip(),
-                "crop_data": crop_prop
-            })
-    return best_crops
+    return crop_table.best_crops(ph, temp, rainfall)
 
 # ============================================================
 
@@ -656,23 +880,25 @@ def get_texture_levels(point):
     except Exception:
         return None
 
-def get_soil_data(lat, lon):
-    point = ee.Geometry.Point(lon, lat)
+def get_soil_data(lat, lon, site=None):
+    # the lookups run concurrently, see fetch_site_data
+    if site is None:
+        site = fetch_site_data(lat, lon)
 
     # Load Phosphorus Image
-    phosphorus = get_phosphorus_levels(point)
+    phosphorus = site["phosphorus"].result()
 
     # Load Potassium Image
-    potassium = get_potassium_levels(point)
+    potassium = site["potassium"].result()
 
     # Load Nitrogen Image
-    nitrogen = get_nitrogen_levels(point)
+    nitrogen = site["nitrogen"].result()
 
     # Load Soil Texture Image
-    texture = get_texture_levels(point)
+    texture = site["texture"].result()
 
     # Get Soil Moisture for a specific date
-    moisture = get_moisture_levels(point)
+    moisture = site["moisture"].result()
 
     return phosphorus,potassium,nitrogen,texture,moisture
 
@@ -684,31 +910,25 @@ def get_fertilizer_recommendation(Temperature,
                                   Nitrogen,
                                   Phosphorus,
                                   Potassium):
-    print(f"Inputs:\nTemp={Temperature}, Humidity={Humadity}, Moisture={Moisture}, Soil={Soil_Type}, N={Nitrogen}, P={Phosphorus}, K={Potassium}")
-    if (Nitrogen is None or Potassium is None or Soil_Type == "Other"):
-        print("Early exit due to invalid input.")
-        return None
-
+    """
+    Recommends a fertilizer with the shared `fertilizer_model` (unpickled once, see fertilizer.FertilizerModel).
+    Returns None if an input is missing, the soil type is "Other", or the prediction fails.
+    """
     try:
-        path = os.path.join(BASE_DIR, 'artifacts', 'fertilizer.pkl')
-        print(f"Loading model from: {path}")
-        with open(path, "rb") as f:
-            model = pickle.load(f)
-            encode_ferti = pickle.load(f)
-            encode_soil = pickle.load(f)
-
-        print("Encoders loaded.")
-        soil_type_encoded = encode_soil.transform([Soil_Type])
-        print(f"Encoded soil type: {soil_type_encoded}")
-
-        prediction_input = [[Temperature, Humadity, Moisture, soil_type_encoded[0], Nitrogen, Phosphorus, Potassium]]
-        fertilizer = model.predict(prediction_input)
-        print(f"Raw model prediction: {fertilizer}")
+        return fertilizer_model.predict(Temperature, Humadity, Moisture, Soil_Type, Nitrogen, Phosphorus, Potassium)
+    except Exception as e:
+        print(f"Exception occurred: {e}")
+        return None
 
-        fertilizer_label = encode_ferti.inverse_transform(fertilizer)
-        print(f"Predicted fertilizer label: {fertilizer_label}")
-        return fertilizer_label[0]
 
+def get_fertilizer_recommendations(rows):
+    """
+    Batched get_fertilizer_recommendation: one classifier call for many
+    (Temperature, Humadity, Moisture, Soil_Type, Nitrogen, Phosphorus, Potassium) rows.
+    Returns one fertilizer name (or None) per row.
+    """
+    try:
+        return fertilizer_model.predict_many(rows)
     except Exception as e:
         print(f"Exception occurred: {e}")
-        return None
\ No newline at end of file
+        return [None] * len(rows)